@@ -0,0 +1,163 @@
+"""
+Module lưu trữ bản ghi âm để fine-tune model
+Mỗi bản ghi được giảm về 16 kHz, nén FLAC (WAV nếu thiếu soundfile) và đặt tên theo hash nội dung;
+việc ghi đĩa chạy trên thread nền với hàng đợi giới hạn nên không bao giờ chặn thread ghi âm/pipeline
+"""
+
+import os
+import json
+import wave
+import queue
+import hashlib
+import logging
+import threading
+from datetime import datetime
+import numpy as np
+from config import ARCHIVE_DIR, ARCHIVE_SAMPLE_RATE, ARCHIVE_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# soundfile (libsndfile) là tùy chọn: thiếu thì lưu WAV 16 kHz
+try:
+    import soundfile
+    FLAC_AVAILABLE = True
+except (ImportError, OSError):
+    soundfile = None
+    FLAC_AVAILABLE = False
+
+LOWPASS_TAPS = 63
+
+
+def resample(samples, rate, target_rate=ARCHIVE_SAMPLE_RATE):
+    """
+    Đổi tần số lấy mẫu (lọc thông thấp windowed-sinc rồi nội suy tuyến tính)
+
+    Args:
+        samples (np.ndarray): Mẫu int16
+        rate (int): Tần số gốc
+        target_rate (int): Tần số đích
+
+    Returns:
+        np.ndarray: Mẫu int16 ở tần số đích
+    """
+    if rate == target_rate or len(samples) == 0:
+        return np.asarray(samples, dtype=np.int16)
+
+    signal = samples.astype(np.float32)
+    if target_rate < rate:
+        cutoff = 0.45 * target_rate / rate  # Tần số cắt chuẩn hóa, chừa dải chuyển tiếp
+        n = np.arange(LOWPASS_TAPS) - (LOWPASS_TAPS - 1) / 2
+        taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(LOWPASS_TAPS)
+        signal = np.convolve(signal, taps / taps.sum(), mode="same")
+
+    duration = len(samples) / rate
+    positions = np.arange(int(duration * target_rate)) * (rate / target_rate)
+    resampled = np.interp(positions, np.arange(len(signal)), signal)
+    return np.clip(np.round(resampled), -32768, 32767).astype(np.int16)
+
+
+class ArchiveWriter:
+    """Thread nền nén và lưu bản ghi âm theo tên hash nội dung"""
+
+    def __init__(self, archive_dir=ARCHIVE_DIR, sample_rate=ARCHIVE_SAMPLE_RATE, queue_size=ARCHIVE_QUEUE_SIZE):
+        """
+        Khởi tạo ArchiveWriter
+
+        Args:
+            archive_dir (str): Thư mục lưu trữ
+            sample_rate (int): Tần số lấy mẫu khi lưu
+            queue_size (int): Số bản ghi chờ tối đa (quá giới hạn thì bỏ bản ghi mới)
+        """
+        self.archive_dir = archive_dir
+        self.sample_rate = sample_rate
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name="audio-archive", daemon=True)
+        self.thread.start()
+
+    def submit(self, samples, rate, metadata=None):
+        """
+        Đưa bản ghi vào hàng đợi lưu trữ (không chặn)
+
+        Args:
+            samples (np.ndarray): Mẫu int16 (được sao chép, bộ đệm gốc có thể dùng lại ngay)
+            rate (int): Tần số lấy mẫu
+            metadata (dict): Thông tin kèm theo (ví dụ transcript), lưu thành file .json
+
+        Returns:
+            bool: False nếu hàng đợi đầy và bản ghi bị bỏ
+        """
+        if len(samples) == 0:
+            return False
+        try:
+            self.queue.put_nowait((np.array(samples, dtype=np.int16, copy=True), rate, metadata))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"Hàng đợi lưu trữ âm thanh đầy, bỏ bản ghi ({self.dropped} bản đã bỏ)")
+            return False
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            except Exception as e:
+                logger.error(f"Lỗi lưu trữ bản ghi âm: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _write(self, samples, rate, metadata):
+        """Giảm tần số, nén và ghi file (bỏ qua nếu nội dung đã tồn tại)"""
+        samples = resample(samples, rate, self.sample_rate)
+        digest = hashlib.sha1(samples.tobytes()).hexdigest()[:20]
+        directory = os.path.join(self.archive_dir, datetime.now().strftime("%Y-%m-%d"))
+        os.makedirs(directory, exist_ok=True)
+
+        extension = "flac" if FLAC_AVAILABLE else "wav"
+        path = os.path.join(directory, f"{digest}.{extension}")
+        if not os.path.exists(path):
+            temp_path = f"{path}.tmp"
+            if FLAC_AVAILABLE:
+                soundfile.write(temp_path, samples, self.sample_rate, format="FLAC", subtype="PCM_16")
+            else:
+                with wave.open(temp_path, "wb") as wf:
+                    wf.setnchannels(1)
+                    wf.setsampwidth(2)
+                    wf.setframerate(self.sample_rate)
+                    wf.writeframes(samples)
+            os.replace(temp_path, path)
+            logger.info(f"Đã lưu trữ bản ghi: {path}")
+
+        if metadata:
+            with open(os.path.join(directory, f"{digest}.json"), "w", encoding="utf-8") as f:
+                json.dump(metadata, f, ensure_ascii=False)
+
+    def flush(self):
+        """Chờ ghi xong các bản ghi đang chờ"""
+        self.queue.join()
+
+    def close(self, timeout=5.0):
+        """Ghi nốt hàng đợi rồi dừng thread nền"""
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self.thread.join(timeout)
+
+
+# Writer dùng chung, tạo khi gọi lần đầu
+_shared_writer = None
+_shared_writer_lock = threading.Lock()
+
+
+def get_archive_writer():
+    """Lấy ArchiveWriter dùng chung (thread-safe, khởi tạo lười)"""
+    global _shared_writer
+    if _shared_writer is None:
+        with _shared_writer_lock:
+            if _shared_writer is None:
+                _shared_writer = ArchiveWriter()
+    return _shared_writer
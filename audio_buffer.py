@@ -0,0 +1,95 @@
+"""
+Module bộ đệm âm thanh cấp phát trước (NumPy) cho ghi âm và pre-roll
+"""
+
+import numpy as np
+
+
+class RingBuffer:
+    """Bộ đệm vòng int16 có dung lượng cố định, không cấp phát lại khi ghi"""
+
+    def __init__(self, capacity, dtype=np.int16, overwrite=False):
+        """
+        Khởi tạo RingBuffer
+
+        Args:
+            capacity (int): Số mẫu tối đa
+            dtype: Kiểu dữ liệu mẫu
+            overwrite (bool): True - ghi đè mẫu cũ nhất khi đầy (pre-roll);
+                              False - dừng nhận khi đầy (giới hạn thời lượng ghi âm)
+        """
+        self.capacity = int(capacity)
+        self.data = np.zeros(self.capacity, dtype=dtype)
+        self.overwrite = overwrite
+        self.write_pos = 0  # Vị trí ghi tiếp theo
+        self.size = 0       # Số mẫu hợp lệ
+
+    @property
+    def full(self):
+        return self.size >= self.capacity
+
+    def clear(self):
+        self.write_pos = 0
+        self.size = 0
+
+    def write(self, samples):
+        """
+        Ghi mẫu vào bộ đệm
+
+        Args:
+            samples (np.ndarray): Mẫu âm thanh
+
+        Returns:
+            int: Số mẫu đã ghi (có thể ít hơn len(samples) khi đầy và không ghi đè)
+        """
+        count = len(samples)
+        if not self.overwrite:
+            count = min(count, self.capacity - self.size)
+            self.data[self.size:self.size + count] = samples[:count]
+            self.size += count
+            self.write_pos = self.size % self.capacity
+            return count
+
+        if count >= self.capacity:
+            self.data[:] = samples[-self.capacity:]
+            self.write_pos = 0
+            self.size = self.capacity
+            return count
+
+        end = self.write_pos + count
+        if end <= self.capacity:
+            self.data[self.write_pos:end] = samples
+        else:
+            split = self.capacity - self.write_pos
+            self.data[self.write_pos:] = samples[:split]
+            self.data[:count - split] = samples[split:]
+        self.write_pos = end % self.capacity
+        self.size = min(self.size + count, self.capacity)
+        return count
+
+    def view(self):
+        """
+        Các mẫu hợp lệ theo thứ tự thời gian
+
+        Returns:
+            np.ndarray: View không sao chép khi dữ liệu chưa quấn vòng, bản sao khi đã quấn vòng
+        """
+        if self.size < self.capacity or self.write_pos == 0:
+            return self.data[:self.size]
+        return np.concatenate((self.data[self.write_pos:], self.data[:self.write_pos]))
+
+
+def rms_level(samples):
+    """
+    Mức âm lượng RMS chuẩn hóa về [0, 1] của một khối mẫu int16
+
+    Args:
+        samples (np.ndarray): Mẫu âm thanh int16
+
+    Returns:
+        float: Mức âm lượng
+    """
+    if len(samples) == 0:
+        return 0.0
+    values = samples.astype(np.float32)
+    return min(1.0, float(np.sqrt(np.mean(values * values))) / 32768.0)
@@ -0,0 +1,163 @@
+"""
+Module phiên thiết bị âm thanh dùng chung suốt vòng đời ứng dụng
+Giữ một PyAudio và một input stream (chế độ callback) luôn sẵn sàng, phát từng khối mẫu
+cho các bên đăng ký (ghi âm, wake word...) và giữ một đoạn pre-roll ngắn
+"""
+
+import logging
+import threading
+import numpy as np
+import pyaudio
+from audio_buffer import RingBuffer
+from config import (
+    AUDIO_CHUNK,
+    AUDIO_FORMAT,
+    AUDIO_CHANNELS,
+    AUDIO_RATE,
+    AUDIO_KEEP_STREAM_WARM,
+    AUDIO_PREROLL_MS
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AudioSession:
+    """Sở hữu PyAudio và input stream, dùng lại giữa các lần ghi âm"""
+
+    def __init__(self, rate=AUDIO_RATE, channels=AUDIO_CHANNELS, chunk=AUDIO_CHUNK,
+                 keep_warm=AUDIO_KEEP_STREAM_WARM, preroll_ms=AUDIO_PREROLL_MS):
+        """
+        Khởi tạo AudioSession (chưa mở thiết bị)
+
+        Args:
+            rate (int): Tần số lấy mẫu
+            channels (int): Số kênh
+            chunk (int): Số frame mỗi khối
+            keep_warm (bool): Giữ stream chạy liên tục giữa các lần ghi âm
+            preroll_ms (int): Độ dài đoạn âm thanh giữ lại trước khi bắt đầu ghi
+        """
+        self.rate = rate
+        self.channels = channels
+        self.chunk = chunk
+        self.keep_warm = keep_warm
+        self.format = getattr(pyaudio, AUDIO_FORMAT)
+        self.preroll = RingBuffer(rate * channels * preroll_ms // 1000, overwrite=True)
+
+        self._pyaudio = None
+        self._stream = None
+        self._listeners = []
+        # _device_lock: mở/đóng thiết bị; _lock: danh sách listener và pre-roll (dùng trong callback)
+        self._device_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    @property
+    def sample_size(self):
+        """Số byte mỗi mẫu"""
+        return pyaudio.get_sample_size(self.format)
+
+    @property
+    def is_active(self):
+        return self._stream is not None and self._stream.is_active()
+
+    def open(self):
+        """Khởi tạo PyAudio/stream nếu chưa có và bắt đầu nhận âm thanh"""
+        with self._device_lock:
+            if self._pyaudio is None:
+                self._pyaudio = pyaudio.PyAudio()
+            if self._stream is None:
+                self._stream = self._pyaudio.open(format=self.format,
+                                                  channels=self.channels,
+                                                  rate=self.rate,
+                                                  input=True,
+                                                  frames_per_buffer=self.chunk,
+                                                  stream_callback=self._callback)
+                logger.info("Đã mở input stream")
+            elif not self._stream.is_active():
+                with self._lock:
+                    self.preroll.clear()  # Bỏ âm thanh cũ từ lần ghi trước
+                self._stream.start_stream()
+
+    def warm_up(self):
+        """Mở thiết bị sẵn (gọi ở background khi khởi động), không ném lỗi"""
+        try:
+            self.open()
+            if not self.keep_warm:
+                self._pause_if_idle()
+        except Exception as e:
+            logger.error(f"Lỗi khởi tạo thiết bị âm thanh: {e}")
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        """Callback của PortAudio: lưu pre-roll và chuyển khối mẫu cho các listener"""
+        samples = np.frombuffer(in_data, dtype=np.int16)
+        with self._lock:
+            self.preroll.write(samples)
+            listeners = tuple(self._listeners)
+        for listener in listeners:
+            try:
+                listener(samples)
+            except Exception as e:
+                logger.error(f"Lỗi listener âm thanh: {e}")
+        return None, pyaudio.paContinue
+
+    def subscribe(self, listener, with_preroll=False):
+        """
+        Đăng ký nhận các khối mẫu (listener được gọi từ thread của PortAudio, phải xử lý nhanh)
+
+        Args:
+            listener (callable): Hàm nhận np.ndarray int16
+            with_preroll (bool): Trả về đoạn pre-roll ngay trước thời điểm đăng ký
+
+        Returns:
+            np.ndarray: Bản sao pre-roll (rỗng nếu không yêu cầu)
+        """
+        self.open()
+        with self._lock:
+            preroll = self.preroll.view().copy() if with_preroll else np.zeros(0, dtype=np.int16)
+            self._listeners.append(listener)
+        return preroll
+
+    def unsubscribe(self, listener):
+        """Hủy đăng ký; dừng stream khi không còn ai nghe (nếu không giữ stream chạy)"""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+        if not self.keep_warm:
+            self._pause_if_idle()
+
+    def _pause_if_idle(self):
+        with self._device_lock:
+            with self._lock:
+                idle = not self._listeners
+            if idle and self._stream is not None and self._stream.is_active():
+                self._stream.stop_stream()
+
+    def close(self):
+        """Đóng stream và giải phóng PyAudio"""
+        with self._device_lock:
+            if self._stream is not None:
+                try:
+                    self._stream.stop_stream()
+                    self._stream.close()
+                except Exception:
+                    pass
+                self._stream = None
+            if self._pyaudio is not None:
+                self._pyaudio.terminate()
+                self._pyaudio = None
+        with self._lock:
+            self._listeners.clear()
+
+
+# Phiên dùng chung, tạo khi gọi lần đầu
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+
+def get_audio_session():
+    """Lấy AudioSession dùng chung (thread-safe, khởi tạo lười)"""
+    global _shared_session
+    if _shared_session is None:
+        with _shared_session_lock:
+            if _shared_session is None:
+                _shared_session = AudioSession()
+    return _shared_session
@@ -1,68 +1,87 @@
 import os
-import pyaudio
+import queue
 import wave
+import tempfile
 import speech_recognition as sr  
-import threading
-import time
 from PyQt6.QtCore import QThread, pyqtSignal
-from search_processor import SearchProcessor
+from audio_buffer import RingBuffer, rms_level
+from audio_session import get_audio_session
+from audio_archive import get_archive_writer
+from speech_race import SpeechRace, GoogleBackend
+from cancellation import CancelledError
+from config import (
+    AUDIO_CHUNK,
+    AUDIO_CHANNELS,
+    AUDIO_RATE,
+    AUDIO_RECORD_SECONDS,
+    AUDIO_LEVEL_INTERVAL_MS,
+    TEMP_AUDIO_DIR,
+    ARCHIVE_ENABLED
+)
 
 class RecordingWorker(QThread):
+    """Ghi âm vào bộ đệm cấp phát trước, tự dừng khi đạt AUDIO_RECORD_SECONDS (dùng lại cho mọi lần ghi)"""
     recording_finished = pyqtSignal(str)
     error = pyqtSignal(str)
     recording_time_update = pyqtSignal(int)
+    level_update = pyqtSignal(float)
+    max_duration_reached = pyqtSignal()
     
     def __init__(self):
         super().__init__()
         self.is_recording = False
+        self.discard = False
         self.recording_time = 0
+        self.buffer = RingBuffer(AUDIO_RATE * AUDIO_RECORD_SECONDS * AUDIO_CHANNELS)
+    
+    @property
+    def samples(self):
+        """Các mẫu đã ghi (view không sao chép của bộ đệm)"""
+        return self.buffer.view()
+    
+    def begin(self):
+        """Bắt đầu một lần ghi mới trên cùng worker (bộ đệm được dùng lại)"""
+        self.is_recording = True
+        self.discard = False
+        self.start()
     
     def run(self):
         try:
-            self.is_recording = True
             self.recording_time = 0
-            
-            # Audio recording parameters
-            CHUNK = 1024
-            FORMAT = pyaudio.paInt16
-            CHANNELS = 1
-            RATE = 44100
-            
-            p = pyaudio.PyAudio()
-            
-            stream = p.open(format=FORMAT,
-                          channels=CHANNELS,
-                          rate=RATE,
-                          input=True,
-                          frames_per_buffer=CHUNK)
-            
-            frames = []
-            
-            # Start timer thread
-            timer_thread = threading.Thread(target=self._update_timer)
-            timer_thread.daemon = True
-            timer_thread.start()
-            
-            # Record until stopped manually
-            while self.is_recording:
-                try:
-                    data = stream.read(CHUNK, exception_on_overflow=False)
-                    frames.append(data)
-                except Exception as e:
-                    print(f"Recording chunk error: {e}")
-                    continue
-            
-            stream.stop_stream()
-            stream.close()
-            p.terminate()
-            
-            # Save to temporary file
-            temp_filename = "temp_recording.wav"
+            self.buffer.clear()
+            level_every = max(1, AUDIO_RATE * AUDIO_LEVEL_INTERVAL_MS // (1000 * AUDIO_CHUNK))
+            
+            # Stream của phiên âm thanh dùng chung đã mở sẵn: chỉ cần đăng ký nhận khối mẫu,
+            # đoạn pre-roll giữ lại âm tiết đầu nói ngay lúc nhấn nút
+            session = get_audio_session()
+            chunks = queue.Queue()
+            listener = chunks.put
+            self.buffer.write(session.subscribe(listener, with_preroll=True))
+            
+            # Thời gian và mức âm lượng tính theo số mẫu đã ghi, ngay trong vòng đọc
+            self.recording_time_update.emit(0)
+            
+            # Record until stopped manually or the buffer is full
+            try:
+                self._capture(chunks, level_every)
+            finally:
+                session.unsubscribe(listener)
+            self.level_update.emit(0.0)
+            if self.discard:
+                return
+            
+            # Lưu trữ bản nén ở background (không chặn thread ghi âm)
+            if ARCHIVE_ENABLED:
+                get_archive_writer().submit(self.samples, AUDIO_RATE)
+            
+            # Save to temporary file (tên riêng cho mỗi lần ghi để các phiên không ghi đè nhau)
+            fd, temp_filename = tempfile.mkstemp(prefix="recording_", suffix=".wav", dir=TEMP_AUDIO_DIR)
+            os.close(fd)
             wf = wave.open(temp_filename, 'wb')
-            wf.setnchannels(CHANNELS)
-            wf.setsampwidth(p.get_sample_size(FORMAT))
-            wf.setframerate(RATE)
-            wf.writeframes(b''.join(frames))
+            wf.setnchannels(AUDIO_CHANNELS)
+            wf.setsampwidth(session.sample_size)
+            wf.setframerate(AUDIO_RATE)
+            wf.writeframes(self.samples)
             wf.close()
             
             self.recording_finished.emit(temp_filename)
@@ -70,71 +89,65 @@ class RecordingWorker(QThread):
         except Exception as e:
             self.error.emit(f"Lỗi khi ghi âm: {str(e)}")
     
-    def _update_timer(self):
-        """Cập nhật timer"""
+    def _capture(self, chunks, level_every):
+        """Vòng ghi âm: chép từng khối vào bộ đệm, phát thời gian và mức âm lượng"""
+        chunk_count = 0
         while self.is_recording:
-            self.recording_time_update.emit(self.recording_time)
-            time.sleep(1)
-            self.recording_time += 1
+            try:
+                chunk = chunks.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            
+            self.buffer.write(chunk)
+            chunk_count += 1
+            
+            if chunk_count % level_every == 0:
+                self.level_update.emit(rms_level(chunk))
+            
+            seconds = self.buffer.size // (AUDIO_RATE * AUDIO_CHANNELS)
+            if seconds != self.recording_time:
+                self.recording_time = seconds
+                self.recording_time_update.emit(seconds)
+            
+            if self.buffer.full:
+                self.is_recording = False
+                self.max_duration_reached.emit()
     
-    def stop_recording(self):
+    def stop_recording(self, discard=False):
+        """
+        Dừng ghi âm
+
+        Args:
+            discard (bool): Bỏ bản ghi (không lưu file, không phát recording_finished)
+        """
+        self.discard = discard
         self.is_recording = False
 
-class AudioWorker(QThread):
-    finished = pyqtSignal(str, str)
-    error = pyqtSignal(str)
-    
-    def __init__(self, audio_path):
-        super().__init__()
-        self.audio_path = audio_path
-        # Khởi tạo SearchProcessor
-        self.search_processor = SearchProcessor()
+def transcribe_google(audio_path, token=None):
+    """Nhận diện giọng nói bằng Google - fallback khi Whisper không dùng được (các ngôn ngữ chạy song song)"""
+    if not audio_path:
+        return "Không có file âm thanh"
     
-    def run(self):
-        try:
-            # Sử dụng SearchProcessor để xử lý toàn bộ request
-            transcribed_text, formatted_results = self.search_processor.process_search_request(self.audio_path)
-            
-            # Emit kết quả
-            self.finished.emit(transcribed_text, formatted_results)
-            
-        except Exception as e:
-            self.error.emit(f"Lỗi xử lý: {str(e)}")
-        finally:
-            # Đóng kết nối
-            if hasattr(self, 'search_processor'):
-                self.search_processor.close()
+    recognizer = sr.Recognizer()
+    recognizer.energy_threshold = 300
+    recognizer.dynamic_energy_threshold = False
     
-    def transcribe(self, audio_path):
-        """Nhận diện giọng nói - fallback method"""
-        if not audio_path:
-            return "Không có file âm thanh"
+    race = SpeechRace([GoogleBackend(recognizer)])
+    try:
+        # File ghi âm đã hoàn chỉnh: không cần hiệu chỉnh nhiễu nền mỗi lần gọi
+        with sr.AudioFile(audio_path) as source:
+            audio = recognizer.record(source)
         
-        recognizer = sr.Recognizer()
-        recognizer.energy_threshold = 300
-        recognizer.dynamic_energy_threshold = True
-        recognizer.pause_threshold = 0.8
-        recognizer.phrase_threshold = 0.3
-        recognizer.non_speaking_duration = 0.5
+        text, confidence, source_name = race.run(audio, token=token)
+        if text:
+            print(f"[TRANSCRIBE] Success with {source_name} ({confidence:.2f}): '{text}'")
+            return text
         
-        try:
-            with sr.AudioFile(audio_path) as source:
-                recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                audio = recognizer.record(source)
-            
-            # Thử nhiều ngôn ngữ
-            languages = [('vi-VN', 'Vietnamese'), ('en-US', 'English'), ('vi', 'Vietnamese (fallback)')]
-            
-            for lang_code, lang_name in languages:
-                try:
-                    text = recognizer.recognize_google(audio, language=lang_code)
-                    if text and len(text.strip()) > 0:
-                        print(f"[TRANSCRIBE] Success with {lang_name}: '{text}'")
-                        return text
-                except (sr.UnknownValueError, sr.RequestError):
-                    continue
-            
-            return "Không nhận diện được giọng nói. Vui lòng thử lại với giọng rõ hơn."
-            
-        except Exception as e:
-            return f"Lỗi xử lý âm thanh: {str(e)}"
\ No newline at end of file
+        return "Không nhận diện được giọng nói. Vui lòng thử lại với giọng rõ hơn."
+        
+    except CancelledError:
+        return ""
+    except Exception as e:
+        return f"Lỗi xử lý âm thanh: {str(e)}"
+    finally:
+        race.close()
@@ -0,0 +1,210 @@
+"""
+Module quản lý tình trạng mượn/trả sách trong bảng phụ book_availability
+Tách khỏi bảng books để cập nhật lưu thông không ghi lại các dòng catalog lớn
+"""
+
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+AVAILABILITY_TABLE = "book_availability"
+# Tham chiếu cột availability của books (có thể kèm bí danh bảng), không khớp book_availability
+AVAILABILITY_COLUMN_PATTERN = re.compile(r"\b(?:(\w+)\.)?availability\b", re.IGNORECASE)
+FROM_PATTERN = re.compile(r"\bFROM\b", re.IGNORECASE)
+# Chuỗi SQL trong nháy đơn ('' là nháy thoát) - không viết lại bên trong
+STRING_LITERAL_PATTERN = re.compile(r"('(?:[^']|'')*')")
+
+
+def ensure_availability_table(conn):
+    """
+    Tạo bảng availability và khởi tạo dữ liệu từ cột books.availability ("10/10")
+
+    Args:
+        conn (sqlite3.Connection): Kết nối database
+
+    Returns:
+        bool: True nếu bảng sẵn sàng
+    """
+    try:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (AVAILABILITY_TABLE,)
+        ).fetchone()
+
+        with conn:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {AVAILABILITY_TABLE} (
+                    book_id INTEGER PRIMARY KEY,
+                    available INTEGER NOT NULL DEFAULT 0,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            # Sách mới thêm vào catalog nhận số lượng ban đầu từ cột availability
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS books_availability_ai AFTER INSERT ON books
+                BEGIN
+                    INSERT OR IGNORE INTO {AVAILABILITY_TABLE} (book_id, available, total)
+                    SELECT NEW.id,
+                           CAST(substr(NEW.availability, 1, instr(NEW.availability, '/') - 1) AS INTEGER),
+                           CAST(substr(NEW.availability, instr(NEW.availability, '/') + 1) AS INTEGER)
+                    WHERE instr(NEW.availability, '/') > 0;
+                END
+            """)
+            # Sửa cột availability trong catalog (nhập lại dữ liệu) ghi đè số lượng hiện tại
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS books_availability_au AFTER UPDATE OF availability ON books
+                WHEN instr(NEW.availability, '/') > 0
+                BEGIN
+                    INSERT INTO {AVAILABILITY_TABLE} (book_id, available, total)
+                    SELECT NEW.id,
+                           CAST(substr(NEW.availability, 1, instr(NEW.availability, '/') - 1) AS INTEGER),
+                           CAST(substr(NEW.availability, instr(NEW.availability, '/') + 1) AS INTEGER)
+                    WHERE NEW.id IS NOT NULL
+                    ON CONFLICT(book_id) DO UPDATE SET available = excluded.available,
+                        total = excluded.total, updated_at = CURRENT_TIMESTAMP;
+                END
+            """)
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS books_availability_ad AFTER DELETE ON books
+                BEGIN
+                    DELETE FROM {AVAILABILITY_TABLE} WHERE book_id = OLD.id;
+                END
+            """)
+
+            if not exists:
+                conn.execute(f"""
+                    INSERT OR IGNORE INTO {AVAILABILITY_TABLE} (book_id, available, total)
+                    SELECT id,
+                           CAST(substr(availability, 1, instr(availability, '/') - 1) AS INTEGER),
+                           CAST(substr(availability, instr(availability, '/') + 1) AS INTEGER)
+                    FROM books
+                    WHERE id IS NOT NULL AND instr(availability, '/') > 0
+                """)
+                logger.info("Đã khởi tạo bảng availability từ catalog")
+        return True
+    except Exception as e:
+        logger.error(f"Lỗi khởi tạo bảng availability: {e}")
+        return False
+
+
+def set_availability(conn, book_id, available, total=None):
+    """
+    Cập nhật số sách còn lại (và tổng số nếu có)
+
+    Args:
+        conn (sqlite3.Connection): Kết nối database
+        book_id (int): Id sách
+        available (int): Số sách còn trong thư viện
+        total (int): Tổng số bản, None để giữ nguyên
+
+    Returns:
+        bool: True nếu cập nhật thành công
+    """
+    with conn:
+        if total is None:
+            cursor = conn.execute(
+                f"UPDATE {AVAILABILITY_TABLE} SET available = ?, updated_at = CURRENT_TIMESTAMP "
+                f"WHERE book_id = ? AND ? BETWEEN 0 AND total",
+                (available, book_id, available)
+            )
+        else:
+            cursor = conn.execute(
+                f"INSERT INTO {AVAILABILITY_TABLE} (book_id, available, total) VALUES (?, ?, ?) "
+                f"ON CONFLICT(book_id) DO UPDATE SET available = excluded.available, "
+                f"total = excluded.total, updated_at = CURRENT_TIMESTAMP",
+                (book_id, available, total)
+            )
+    return cursor.rowcount > 0
+
+
+def checkout(conn, book_id):
+    """
+    Ghi nhận mượn một bản sách
+
+    Returns:
+        bool: False nếu sách đã hết
+    """
+    with conn:
+        cursor = conn.execute(
+            f"UPDATE {AVAILABILITY_TABLE} SET available = available - 1, updated_at = CURRENT_TIMESTAMP "
+            f"WHERE book_id = ? AND available > 0",
+            (book_id,)
+        )
+    return cursor.rowcount > 0
+
+
+def checkin(conn, book_id):
+    """
+    Ghi nhận trả một bản sách
+
+    Returns:
+        bool: False nếu số bản đã đủ
+    """
+    with conn:
+        cursor = conn.execute(
+            f"UPDATE {AVAILABILITY_TABLE} SET available = available + 1, updated_at = CURRENT_TIMESTAMP "
+            f"WHERE book_id = ? AND available < total",
+            (book_id,)
+        )
+    return cursor.rowcount > 0
+
+
+def rewrite_availability_predicates(sql):
+    """
+    Đổi các tham chiếu cột books.availability sau FROM (WHERE, ORDER BY...) thành tình trạng
+    hiện tại trong bảng phụ; cột availability trong SELECT được attach_availability cập nhật
+
+    Args:
+        sql (str): SQL query
+
+    Returns:
+        str: SQL query đã viết lại
+    """
+    match = FROM_PATTERN.search(sql)
+    if not match:
+        return sql
+
+    def current(column):
+        # Cột id không qualify khớp với bảng ngoài (bảng phụ chỉ có book_id)
+        book_id = f"{column.group(1)}.id" if column.group(1) else "id"
+        return f"(SELECT available || '/' || total FROM {AVAILABILITY_TABLE} WHERE book_id = {book_id})"
+
+    # Phần tử lẻ sau khi tách là chuỗi trong nháy (vd LIKE '%availability%'), giữ nguyên
+    parts = STRING_LITERAL_PATTERN.split(sql[match.end():])
+    for i in range(0, len(parts), 2):
+        parts[i] = AVAILABILITY_COLUMN_PATTERN.sub(current, parts[i])
+    return sql[:match.end()] + "".join(parts)
+
+
+def attach_availability(conn, results):
+    """
+    Ghép tình trạng hiện tại vào kết quả tìm kiếm lúc đọc (batch theo id)
+
+    Args:
+        conn (sqlite3.Connection): Kết nối database
+        results (list): Danh sách dict kết quả, cập nhật tại chỗ
+
+    Returns:
+        list: results
+    """
+    book_ids = [
+        row["id"] for row in results
+        if isinstance(row, dict) and row.get("id") is not None and "availability" in row
+    ]
+    if not book_ids:
+        return results
+
+    placeholders = ", ".join("?" for _ in book_ids)
+    current = {
+        book_id: f"{available}/{total}"
+        for book_id, available, total in conn.execute(
+            f"SELECT book_id, available, total FROM {AVAILABILITY_TABLE} WHERE book_id IN ({placeholders})",
+            book_ids
+        )
+    }
+    for row in results:
+        if isinstance(row, dict) and "availability" in row and row.get("id") in current:
+            row["availability"] = current[row["id"]]
+    return results
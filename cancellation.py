@@ -0,0 +1,251 @@
+"""
+Module hủy tác vụ hợp tác (cooperative cancellation)
+Một CancellationToken đi theo pipeline; khi bị hủy, các callback đã đăng ký sẽ ngắt ngay
+truy vấn SQLite (Connection.interrupt), vòng sinh token của Whisper (StoppingCriteria)
+và ngắt các lời gọi HTTP đang chạy (shutdown socket)
+"""
+
+import socket
+import logging
+import threading
+import weakref
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class CancelledError(Exception):
+    """Tác vụ đã bị hủy"""
+
+
+class CancellationToken:
+    """Cờ hủy dùng chung giữa UI và worker, kèm callback chạy ngay khi hủy"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def is_cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        """Hủy: đặt cờ và gọi các callback đã đăng ký (từ thread gọi cancel)"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks = list(self._callbacks)
+            self._callbacks.clear()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Lỗi callback hủy: {e}")
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise CancelledError()
+
+    def wait(self, timeout=None):
+        """Chờ tới khi bị hủy; trả về True nếu đã hủy"""
+        return self._event.wait(timeout)
+
+    @contextmanager
+    def on_cancel(self, callback):
+        """
+        Đăng ký callback trong phạm vi khối with (gọi ngay nếu token đã bị hủy)
+
+        Args:
+            callback (callable): Hàm không tham số, phải chạy nhanh và an toàn khi gọi từ thread khác
+        """
+        with self._lock:
+            registered = not self._event.is_set()
+            if registered:
+                self._callbacks.append(callback)
+        if not registered:
+            callback()
+        try:
+            yield self
+        finally:
+            with self._lock:
+                if callback in self._callbacks:
+                    self._callbacks.remove(callback)
+
+
+# Token không bao giờ bị hủy, dùng khi người gọi không truyền token
+NEVER_CANCELLED = CancellationToken()
+
+
+@contextmanager
+def interrupt_on_cancel(token, *connections):
+    """
+    Ngắt truy vấn SQLite đang chạy khi token bị hủy
+
+    sqlite3.Connection.interrupt() an toàn khi gọi từ thread khác; truy vấn bị ngắt
+    ném OperationalError('interrupted') và được đổi thành CancelledError
+
+    Args:
+        token (CancellationToken): Token hủy
+        connections: Các sqlite3.Connection
+    """
+    def interrupt():
+        for conn in connections:
+            try:
+                conn.interrupt()
+            except Exception:
+                pass
+
+    with token.on_cancel(interrupt):
+        try:
+            yield
+        except Exception as e:
+            if token.is_cancelled:
+                raise CancelledError() from e
+            raise
+
+
+def stopping_criteria(token):
+    """
+    StoppingCriteriaList cho model.generate của transformers: dừng sinh token ngay khi bị hủy
+
+    Args:
+        token (CancellationToken): Token hủy
+
+    Returns:
+        StoppingCriteriaList: Truyền vào generate(stopping_criteria=...)
+    """
+    import torch
+    from transformers import StoppingCriteria, StoppingCriteriaList
+
+    class CancelledCriteria(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            return torch.full((input_ids.shape[0],), token.is_cancelled, dtype=torch.bool,
+                              device=input_ids.device)
+
+    return StoppingCriteriaList([CancelledCriteria()])
+
+
+def abortable_http_client(**kwargs):
+    """
+    httpx.Client có request đang chờ phản hồi ngắt được từ thread khác (truyền cho OpenAI(http_client=...))
+
+    Client.close() không ngắt được recv đang chặn ở thread khác: socket chỉ thực sự đóng khi
+    lời gọi trả về. Ở đây mỗi kết nối được ghi lại cùng thread dùng nó gần nhất; abort(thread)
+    shutdown() các socket đó (recv trả về ngay, server nhận FIN) và từ chối kết nối mới của
+    thread đó (SDK tự thử lại khi lỗi kết nối). Kết nối keep-alive của thread khác không bị ảnh hưởng.
+
+    Args:
+        kwargs: Tham số cho httpx.Client (timeout...)
+
+    Returns:
+        tuple: (httpx.Client, abort(thread))
+    """
+    import httpx
+    import httpcore
+
+    aborted = weakref.WeakSet()
+    streams = {}  # stream -> thread dùng gần nhất
+    lock = threading.Lock()
+
+    class TrackedStream(httpcore.NetworkStream):
+        def __init__(self, stream):
+            self.stream = stream
+            self._claim()
+
+        def _claim(self):
+            thread = threading.current_thread()
+            with lock:
+                if thread in aborted:
+                    raise httpcore.ReadError("request aborted")
+                streams[self] = thread
+
+        def read(self, max_bytes, timeout=None):
+            self._claim()
+            return self.stream.read(max_bytes, timeout)
+
+        def write(self, buffer, timeout=None):
+            self._claim()
+            self.stream.write(buffer, timeout)
+
+        def close(self):
+            with lock:
+                streams.pop(self, None)
+            self.stream.close()
+
+        def start_tls(self, ssl_context, server_hostname=None, timeout=None):
+            self.stream = self.stream.start_tls(ssl_context, server_hostname, timeout)
+            return self
+
+        def get_extra_info(self, info):
+            return self.stream.get_extra_info(info)
+
+    class TrackingBackend(httpcore.SyncBackend):
+        def connect_tcp(self, *args, **kwargs):
+            if threading.current_thread() in aborted:
+                raise httpcore.ConnectError("request aborted")
+            return TrackedStream(super().connect_tcp(*args, **kwargs))
+
+    def abort(thread):
+        with lock:
+            aborted.add(thread)
+            owned = [stream for stream, owner in streams.items() if owner is thread]
+        for stream in owned:
+            try:
+                stream.get_extra_info("socket").shutdown(socket.SHUT_RDWR)
+            except (OSError, AttributeError):
+                pass
+
+    transport = httpx.HTTPTransport()
+    # httpx không nhận network backend qua tham số; pool chỉ dùng backend khi mở kết nối mới
+    transport._pool._network_backend = TrackingBackend()
+    return httpx.Client(transport=transport, **kwargs), abort
+
+
+def run_cancellable(token, func, *args, abort=None, **kwargs):
+    """
+    Chạy một lời gọi chặn (HTTP) và trả về ngay khi token bị hủy
+
+    SDK đồng bộ không có cách hủy request đang chờ phản hồi, nên lời gọi chạy trên một
+    daemon thread; khi hủy, abort(thread) ngắt request của thread đó (xem abortable_http_client).
+    Không có abort thì thread bị bỏ lại chạy nốt (giới hạn bởi timeout của request),
+    kết quả bị bỏ qua và không giữ ứng dụng lại khi thoát
+
+    Args:
+        token (CancellationToken): Token hủy
+        func (callable): Lời gọi chặn
+        abort (callable): Hàm nhận thread đang chạy func, ngắt I/O của thread đó khi bị hủy
+
+    Returns:
+        Kết quả của func
+
+    Raises:
+        CancelledError: Nếu token bị hủy trước khi có kết quả
+    """
+    token.raise_if_cancelled()
+    done = threading.Event()
+    outcome = {}
+
+    def call():
+        try:
+            outcome['result'] = func(*args, **kwargs)
+        except BaseException as e:
+            outcome['error'] = e
+        finally:
+            done.set()
+
+    thread = threading.Thread(target=call, name="cancellable-call", daemon=True)
+
+    def cancel():
+        done.set()
+        if abort:
+            abort(thread)
+
+    thread.start()
+    with token.on_cancel(cancel):
+        done.wait()
+    token.raise_if_cancelled()
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['result']
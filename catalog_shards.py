@@ -0,0 +1,261 @@
+"""
+Module catalog phân mảnh: mỗi chi nhánh/khoa là một file SQLite riêng
+Truy vấn chạy song song trên tất cả shard bằng thread pool rồi gộp và xếp hạng kết quả
+"""
+
+import os
+import re
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import MAX_SEARCH_RESULTS
+from facets import ensure_facet_tables, get_facet_counts, FACET_TABLE
+from availability import ensure_availability_table, attach_availability
+from ranking import BM25Index, split_limit, is_rankable_query, fill_top_keys
+from shard_merge import ShardQuery
+
+logger = logging.getLogger(__name__)
+
+FACET_QUERY_PATTERN = re.compile(rf"\b{FACET_TABLE}\b", re.IGNORECASE)
+FACET_FILTER_PATTERN = re.compile(r"\bfacet\s*=\s*'([^']+)'", re.IGNORECASE)
+
+
+class CatalogShard:
+    """Một shard catalog (một file SQLite)"""
+
+    def __init__(self, path, name=None):
+        """
+        Khởi tạo CatalogShard
+
+        Args:
+            path (str): Đường dẫn file SQLite
+            name (str): Tên shard, mặc định là tên file
+        """
+        self.path = path
+        self.name = name or os.path.splitext(os.path.basename(path))[0]
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        # sqlite3.Connection không an toàn khi dùng đồng thời từ nhiều thread
+        self.lock = threading.Lock()
+        ensure_facet_tables(self.conn)
+        ensure_availability_table(self.conn)
+
+    def execute(self, sql, params=()):
+        """
+        Thực hiện truy vấn trên shard
+
+        Returns:
+            tuple: (column_names, rows)
+        """
+        with self.lock:
+            cursor = self.conn.execute(sql, params)
+            rows = cursor.fetchall()
+            column_names = [description[0] for description in cursor.description] if cursor.description else []
+        return column_names, rows
+
+    def attach_availability(self, results):
+        """Ghép tình trạng mượn/trả hiện tại của shard vào kết quả"""
+        with self.lock:
+            return attach_availability(self.conn, results)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class ShardedCatalog:
+    """Catalog gồm nhiều shard, truy vấn song song"""
+
+    def __init__(self, shard_paths, max_workers=None):
+        """
+        Khởi tạo ShardedCatalog
+
+        Args:
+            shard_paths (list): Danh sách đường dẫn file SQLite
+            max_workers (int): Số thread tối đa, mặc định theo số shard và số core
+        """
+        self.shards = [CatalogShard(path) for path in shard_paths]
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or min(len(self.shards), os.cpu_count() or 1) or 1,
+            thread_name_prefix="catalog-shard"
+        )
+
+        # Chỉ mục BM25 chung để điểm số giữa các shard so sánh được với nhau
+        self.ranker = BM25Index()
+        for shard in self.shards:
+            with shard.lock:
+                self.ranker.add_connection(shard.conn, key_func=lambda book_id, name=shard.name: (name, book_id))
+        logger.info(f"Đã mở {len(self.shards)} shard catalog, {self.ranker.doc_count} sách")
+
+    @property
+    def primary_connection(self):
+        """Kết nối của shard đầu tiên (dùng cho kiểm tra kết nối)"""
+        return self.shards[0].conn if self.shards else None
+
+    @property
+    def connections(self):
+        """Kết nối của tất cả shard (để ngắt truy vấn khi hủy)"""
+        return [shard.conn for shard in self.shards]
+
+    def run_on_shard(self, name, func, *args):
+        """
+        Chạy func(conn, *args) trên kết nối của shard theo tên, giữ khóa của shard
+        (kết nối được dùng chung với các thread truy vấn)
+
+        Args:
+            name (str): Tên shard, None khi chỉ có một shard
+            func (callable): Hàm nhận kết nối SQLite làm tham số đầu
+        """
+        shard = self._shard(name)
+        with shard.lock:
+            return func(shard.conn, *args)
+
+    def _shard(self, name):
+        if name is None and len(self.shards) == 1:
+            return self.shards[0]
+        for shard in self.shards:
+            if shard.name == name:
+                return shard
+        raise ValueError(f"Không tìm thấy shard: {name}")
+
+    def _map(self, func):
+        """Chạy func trên tất cả shard song song, giữ thứ tự shard"""
+        return list(self.executor.map(func, self.shards))
+
+    def _to_dicts(self, shard, column_names, rows):
+        results = []
+        for row in rows:
+            result_dict = dict(zip(column_names, row))
+            result_dict["shard"] = shard.name
+            results.append(result_dict)
+        return shard.attach_availability(results)
+
+    def query(self, sql_query, query_text=None):
+        """
+        Thực hiện truy vấn trên tất cả shard
+
+        Args:
+            sql_query (str): SQL query
+            query_text (str): Văn bản yêu cầu, dùng để xếp hạng kết quả
+
+        Returns:
+            list: Danh sách dict kết quả (có thêm trường 'shard')
+        """
+        if query_text:
+            ranked = self._ranked_query(sql_query, query_text)
+            if ranked is not None:
+                return ranked
+
+        if FACET_QUERY_PATTERN.search(sql_query):
+            return self._facet_query(sql_query)
+
+        plan = ShardQuery.parse(sql_query)
+        if plan is None:
+            # Câu truy vấn không gộp được (UNION, HAVING, COUNT(DISTINCT)...): nối kết quả các shard
+            logger.warning(f"Không gộp được kết quả giữa các shard, nối kết quả: {sql_query}")
+            per_shard = self._map(lambda shard: self._to_dicts(shard, *shard.execute(sql_query)))
+            return [row for rows in per_shard for row in rows]
+
+        if plan.aggregate:
+            column_names, rows = plan.merge_aggregates(self._map(lambda shard: shard.execute(plan.shard_sql)))
+            return [dict(zip(column_names, row)) for row in rows]
+
+        return plan.merge_rows(self._map(lambda shard: self._to_dicts(shard, *shard.execute(plan.shard_sql))))
+
+    def _facet_query(self, sql_query):
+        """
+        Truy vấn bảng facet: số lượng được cộng giữa các shard (xem get_facet_counts)
+
+        Returns:
+            list: Danh sách dict {facet, value, count}
+        """
+        match = FACET_FILTER_PATTERN.search(sql_query)
+        _, limit = split_limit(sql_query, None)
+        counts = self.get_facet_counts(match.group(1) if match else None, limit)
+        return [
+            {"facet": name, "value": value, "count": count}
+            for name, values in counts.items()
+            for value, count in values
+        ]
+
+    def _ranked_query(self, sql_query, query_text):
+        """
+        Lấy ứng viên song song trên các shard, xếp hạng chung và chỉ đọc k dòng tốt nhất
+
+        Returns:
+            list: Kết quả đã xếp hạng, None nếu không áp dụng được xếp hạng
+        """
+        if not is_rankable_query(sql_query):
+            return None
+
+        inner_sql, limit = split_limit(sql_query, MAX_SEARCH_RESULTS)
+        if not inner_sql:
+            return None
+
+        def candidates(shard):
+            _, rows = shard.execute(f"SELECT id FROM ({inner_sql})")
+            return [(shard.name, row[0]) for row in rows]
+
+        try:
+            candidate_keys = [key for keys in self._map(candidates) for key in keys]
+        except sqlite3.Error:
+            return None  # Truy vấn không có cột id
+
+        if not candidate_keys:
+            return []
+
+        ranked = self.ranker.search(query_text, limit, candidates=set(candidate_keys))
+        top_keys = fill_top_keys(ranked, candidate_keys, limit)
+
+        wanted = {}
+        for name, book_id in top_keys:
+            wanted.setdefault(name, []).append(book_id)
+
+        def fetch(shard):
+            ids = wanted.get(shard.name)
+            if not ids:
+                return []
+            placeholders = ", ".join("?" for _ in ids)
+            column_names, rows = shard.execute(
+                f"SELECT * FROM ({inner_sql}) WHERE id IN ({placeholders})", ids
+            )
+            return self._to_dicts(shard, column_names, rows)
+
+        rows_by_key = {}
+        for rows in self._map(fetch):
+            for row in rows:
+                rows_by_key.setdefault((row["shard"], row["id"]), row)
+
+        return [rows_by_key[key] for key in top_keys if key in rows_by_key]
+
+    def get_facet_counts(self, facet=None, limit=None):
+        """
+        Cộng số lượng facet của tất cả shard
+
+        Returns:
+            dict: {facet: [(value, count), ...]}
+        """
+        totals = {}
+        for counts in self._map(lambda shard: self._shard_facets(shard, facet)):
+            for name, values in counts.items():
+                merged = totals.setdefault(name, {})
+                for value, count in values:
+                    merged[value] = merged.get(value, 0) + count
+
+        return {
+            name: sorted(values.items(), key=lambda item: (-item[1], item[0]))[:limit]
+            for name, values in totals.items()
+        }
+
+    def _shard_facets(self, shard, facet):
+        with shard.lock:
+            return get_facet_counts(shard.conn, facet)
+
+    def close(self):
+        """Đóng tất cả shard"""
+        self.executor.shutdown(wait=False)
+        for shard in self.shards:
+            try:
+                shard.close()
+            except Exception:
+                pass
@@ -7,6 +7,10 @@ import os
 # Database configuration
 DATABASE_PATH = r"C:\Users\LOQ\OneDrive\Tài liệu\Visual Studio 2022\NewUI\data_fix"
 
+# Catalog shards: danh sách file SQLite (mỗi chi nhánh/khoa một file)
+# Để trống để dùng một database duy nhất tại DATABASE_PATH
+CATALOG_SHARDS = []
+
 # Whisper model configuration
 WHISPER_MODEL_NAME = "openai/whisper-small"
 WHISPER_MODEL_PATH = None  # Set to None to use default model
@@ -20,11 +24,29 @@ AUDIO_FORMAT = "paInt16"  # pyaudio.paInt16
 AUDIO_CHANNELS = 1
 AUDIO_RATE = 44100
 AUDIO_RECORD_SECONDS = 30  # Maximum recording time
+AUDIO_LEVEL_INTERVAL_MS = 50  # Chu kỳ cập nhật thanh mức âm lượng khi ghi âm
+AUDIO_KEEP_STREAM_WARM = True  # Giữ input stream chạy giữa các lần ghi âm (bắt đầu ghi tức thì)
+AUDIO_PREROLL_MS = 300  # Âm thanh giữ lại ngay trước khi nhấn ghi âm (không mất âm tiết đầu)
+
+# Speech recognition race (các backend/ngôn ngữ chạy song song)
+SPEECH_LANGUAGES = ['vi-VN', 'en-US', 'vi']  # Theo thứ tự ưu tiên
+SPEECH_RACE_DEADLINE = 8.0  # seconds
+SPEECH_MIN_CONFIDENCE = 0.6
+
+# Wake word configuration ("thư viện ơi" - mẫu ghi bằng: python wake_word.py)
+WAKE_WORD_ENABLED = False
+WAKE_WORD_TEMPLATE_DIR = "wake_word"
+WAKE_WORD_THRESHOLD = 12.0  # Khoảng cách DTW tối đa, chỉnh theo mẫu đã ghi
+WAKE_WORD_ENERGY_THRESHOLD = 0.02  # Mức RMS tối thiểu được coi là có tiếng nói
+WAKE_WORD_MIN_SECONDS = 0.4
+WAKE_WORD_MAX_SECONDS = 2.0
+WAKE_WORD_TRAILING_SILENCE_MS = 250
 
 # UI configuration
 WINDOW_TITLE = "📚 Tìm Kiếm Thư Viện Bằng Giọng Nói"
 WINDOW_WIDTH = 800
 WINDOW_HEIGHT = 600
+RESULTS_BATCH_SIZE = 50  # Số kết quả được thêm vào danh sách mỗi lần
 
 # Logging configuration
 LOG_LEVEL = "INFO"
@@ -57,16 +79,92 @@ DATABASE_SCHEMA = {
         "url"
     ]
 }
+# Trường nặng: không đọc trong truy vấn tìm kiếm, chỉ tải theo id khi mở rộng một kết quả
+RESULT_HEAVY_FIELDS = ["summary", "url"]
+
+# Language identification configuration
+LANG_ID_CACHE_SIZE = 4096
+LANG_ID_MIN_MARGIN = 1.0  # Điểm chênh lệch tối thiểu để không cần dùng langdetect
+
+# Diacritic restoration configuration (mô hình bigram âm tiết chạy trên máy)
+DIACRITIC_MIN_CONFIDENCE = 0.8  # Dưới ngưỡng này mới gọi OpenAI để sửa câu
+DIACRITIC_BIGRAM_WEIGHT = 0.8
+DIACRITIC_CONFUSION_PENALTY = 0.05  # Xác suất tiên nghiệm cho ứng viên do ASR nhầm phụ âm
+DIACRITIC_MIN_BIGRAM_COUNT = 1  # Âm tiết được khôi phục cần ít nhất một bigram kề bên đã gặp trong dữ liệu
+DIACRITIC_UNSUPPORTED_PENALTY = 0.5  # Hệ số độ tin cậy cho âm tiết chỉ dựa vào unigram (tên riêng...)
+
+# Offline translation configuration
+TRANSLATION_CACHE_SIZE = 2048
+ONLINE_TRANSLATION_FALLBACK = False  # Dùng googletrans khi bảng offline không dịch hết câu
 
 # Search configuration
 MAX_SEARCH_RESULTS = 20
 SEARCH_TIMEOUT = 30  # seconds
+WORKER_STOP_TIMEOUT_MS = 50  # Thời gian chờ worker thoát sau khi hủy (không bao giờ terminate)
+SPECULATIVE_SEARCH = True  # Tìm kiếm khi có văn bản nhận diện, trước khi người dùng xác nhận
+SPECULATIVE_SEARCH_DELAY_MS = 1200  # Chỉ chạy trước khi văn bản không bị sửa trong khoảng này (mỗi lần chạy gọi OpenAI)
+
+# Facet configuration (bảng thống kê tính sẵn)
+FACET_FIELDS = [
+    "subject",
+    "department",
+    "document_type",
+    "publication_year",
+    "storage_location"
+]
+FACET_YEAR_BUCKET = 5  # Số năm trong mỗi nhóm publication_year
+FACET_UNKNOWN_VALUE = "Không rõ"
+
+# Ranking configuration (BM25 nhiều trường)
+RANKING_FIELD_WEIGHTS = {
+    "title": 3.0,
+    "author": 2.0,
+    "keywords": 2.0,
+    "subject": 1.5,
+    "summary": 0.5
+}
+RANKING_BM25_K1 = 1.2
+RANKING_BM25_B = 0.75
+
+# Search-as-you-type configuration (gợi ý khi đang gõ)
+SUGGEST_MAX_RESULTS = 5
+SUGGEST_DEBOUNCE_MS = 16  # ~1 frame
 
 # File paths
 TEMP_AUDIO_DIR = "temp_audio"
 LOG_DIR = "logs"
+CACHE_DIR = "cache"
+QUERY_LOG_PATH = os.path.join(LOG_DIR, "queries.log")
+QUERY_LOG_MAX_BYTES = 1024 * 1024  # Log câu yêu cầu được xoay vòng (giữ một bản .1) khi vượt kích thước này
+OPENAI_HEALTH_PATH = os.path.join(CACHE_DIR, "openai_health.json")
+OPENAI_HEALTH_TTL = 6 * 3600  # Giây; kiểm tra OpenAI thành công được dùng lại khi khởi động
+OPENAI_HEALTH_TIMEOUT = 5  # seconds
+
+# Recording archive configuration (dữ liệu fine-tune model)
+ARCHIVE_ENABLED = True
+ARCHIVE_DIR = "archive"
+ARCHIVE_SAMPLE_RATE = 16000
+ARCHIVE_QUEUE_SIZE = 16  # Số bản ghi chờ nén tối đa
+
+# Text-to-speech configuration
+TTS_BACKEND = "gtts"  # "gtts" (cần mạng) hoặc "espeak" (espeak-ng, chạy offline)
+TTS_LANG = "vi"
+TTS_VOICE = "com"  # gTTS tld
+TTS_ESPEAK_VOICE = "vi"
+TTS_ESPEAK_SPEED = 160  # Từ/phút
+TTS_PLAYBACK_CHUNK = 1024  # Số frame mỗi lần ghi ra loa (dừng phát trong tối đa một khối)
+TTS_CACHE_DIR = os.path.join(CACHE_DIR, "tts")
+TTS_CACHE_MAX_BYTES = 50 * 1024 * 1024
+TTS_READ_RESULTS = True  # Đọc kết quả tìm kiếm thành tiếng
+TTS_MAX_SENTENCE_CHARS = 160  # Câu dài hơn được chia tại dấu phẩy
+TTS_LOOKAHEAD = 2  # Số câu được tổng hợp trước trong khi câu hiện tại đang phát
+
+# Spelling index configuration (SymSpell từ vốn từ catalog)
+SPELL_INDEX_PATH = os.path.join(CACHE_DIR, "spell_index.pkl")
+SPELL_MAX_EDIT_DISTANCE = 2
+SPELL_PREFIX_LENGTH = 7
 
 # Create directories if they don't exist
-for directory in [TEMP_AUDIO_DIR, LOG_DIR]:
+for directory in [TEMP_AUDIO_DIR, LOG_DIR, CACHE_DIR]:
     if not os.path.exists(directory):
         os.makedirs(directory)
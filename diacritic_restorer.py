@@ -0,0 +1,417 @@
+"""
+Module khôi phục dấu tiếng Việt và sửa lỗi đồng âm của ASR ngay trên máy
+Mô hình bigram âm tiết học từ catalog (tiêu đề, chủ đề, từ khóa, khoa) và log câu yêu cầu,
+giải mã bằng Viterbi; độ tin cậy lấy từ xác suất hậu nghiệm (forward-backward), giảm với
+âm tiết không có bigram nào hỗ trợ (tên riêng ghép từ các âm tiết quen thuộc)
+"""
+
+import os
+import re
+import math
+import sqlite3
+import logging
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from config import (
+    DATABASE_PATH,
+    QUERY_LOG_PATH,
+    QUERY_LOG_MAX_BYTES,
+    DIACRITIC_BIGRAM_WEIGHT,
+    DIACRITIC_CONFUSION_PENALTY,
+    DIACRITIC_MIN_BIGRAM_COUNT,
+    DIACRITIC_UNSUPPORTED_PENALTY
+)
+from lang_id import strip_diacritics, VIETNAMESE_SYLLABLE
+
+logger = logging.getLogger(__name__)
+
+SYLLABLE_PATTERN = re.compile(r"[^\W\d_]+", re.UNICODE)
+TOKEN_PATTERN = re.compile(r"(\w+)", re.UNICODE)
+SENTENCE_BREAK = re.compile(r"[,.;:!?()\[\]\"\n]+|\s-+\s|--+")
+BOUNDARY = "<s>"
+
+# Câu yêu cầu thường gặp - đảm bảo các từ chức năng luôn có trong mô hình
+SEED_CORPUS = """
+tìm sách về lập trình
+tôi muốn tìm sách về kiến trúc
+tôi cần tìm giáo trình
+tìm cho tôi sách tham khảo
+có sách nào về văn học không
+sách của tác giả
+sách xuất bản năm
+sách mới nhất về kinh tế
+thư viện có bao nhiêu cuốn sách
+tôi muốn mượn sách
+cho tôi xem tài liệu về lịch sử
+sách hay nhất về khoa học
+tìm tài liệu nghiên cứu về công nghệ thông tin
+sách dành cho sinh viên ngành quản trị kinh doanh
+giáo trình tiếng anh cho người mới bắt đầu
+sách dạy nấu ăn
+tìm quyển sách về nghệ thuật điện ảnh
+tìm luận văn thạc sĩ
+sách kỹ năng sống
+sách về tâm lý học
+cuốn sách này còn không
+"""
+
+# Nhầm lẫn thường gặp của ASR tiếng Việt (trên dạng không dấu): phụ âm đầu và phụ âm cuối
+INITIAL_CONFUSIONS = [
+    ("d", "gi"), ("d", "r"), ("gi", "r"), ("ch", "tr"), ("s", "x"),
+    ("l", "n"), ("v", "d"), ("c", "k"), ("g", "gh"), ("ng", "ngh"),
+]
+FINAL_CONFUSIONS = [("n", "ng"), ("n", "m"), ("t", "c"), ("nh", "n"), ("ch", "t")]
+
+
+def _normalize(text):
+    return unicodedata.normalize("NFC", text).lower()
+
+
+def _has_diacritics(word):
+    return strip_diacritics(word) != word
+
+
+def _split_syllable(plain):
+    """Tách âm tiết không dấu thành (phụ âm đầu, vần, phụ âm cuối)"""
+    match = re.match(r"^(ngh|ng|nh|ch|gh|gi|kh|ph|qu|th|tr|[bcdghklmnprstvx])?([aeiouy]+)(ng|nh|ch|[cmnpt])?$", plain)
+    if not match:
+        return None
+    return match.group(1) or "", match.group(2), match.group(3) or ""
+
+
+def confusable_keys(plain):
+    """
+    Các dạng không dấu có thể bị ASR nhận nhầm thành `plain`
+
+    Args:
+        plain (str): Âm tiết không dấu
+
+    Returns:
+        set: Các dạng không dấu khác (không gồm chính nó)
+    """
+    parts = _split_syllable(plain)
+    if not parts:
+        return set()
+    initial, rhyme, final = parts
+    keys = set()
+    for a, b in INITIAL_CONFUSIONS:
+        for source, target in ((a, b), (b, a)):
+            if initial == source:
+                keys.add(target + rhyme + final)
+    for a, b in FINAL_CONFUSIONS:
+        for source, target in ((a, b), (b, a)):
+            if final == source:
+                keys.add(initial + rhyme + target)
+    keys.discard(plain)
+    return keys
+
+
+def _sentences(text):
+    """Các đoạn âm tiết liên tiếp (chữ thường, NFC), ngắt tại dấu câu"""
+    for part in SENTENCE_BREAK.split(_normalize(text)):
+        syllables = SYLLABLE_PATTERN.findall(part)
+        if syllables:
+            yield syllables
+
+
+class DiacriticRestorer:
+    """Mô hình bigram âm tiết có dấu, tra cứu theo dạng không dấu"""
+
+    def __init__(self, bigram_weight=DIACRITIC_BIGRAM_WEIGHT, confusion_penalty=DIACRITIC_CONFUSION_PENALTY,
+                 min_bigram_count=DIACRITIC_MIN_BIGRAM_COUNT, unsupported_penalty=DIACRITIC_UNSUPPORTED_PENALTY):
+        """
+        Khởi tạo DiacriticRestorer
+
+        Args:
+            bigram_weight (float): Trọng số nội suy giữa bigram và unigram
+            confusion_penalty (float): Xác suất tiên nghiệm cho ứng viên do nhầm lẫn ASR
+            min_bigram_count (int): Số lần gặp tối thiểu để một bigram kề bên hỗ trợ lựa chọn
+            unsupported_penalty (float): Hệ số độ tin cậy cho lựa chọn không có bigram hỗ trợ
+        """
+        self.bigram_weight = bigram_weight
+        self.confusion_log_penalty = math.log(confusion_penalty)
+        self.min_bigram_count = min_bigram_count
+        self.unsupported_penalty = unsupported_penalty
+        self.unigrams = Counter()
+        self.bigrams = Counter()
+        self.context_totals = Counter()
+        self.forms = defaultdict(set)  # dạng không dấu -> các dạng có dấu
+        self.total = 0
+
+    def train(self, texts):
+        """
+        Cập nhật mô hình từ các đoạn văn bản có dấu
+
+        Args:
+            texts (iterable): Tiêu đề, chủ đề, câu yêu cầu...
+        """
+        for text in texts:
+            if not text:
+                continue
+            for syllables in _sentences(str(text)):
+                previous = BOUNDARY
+                for syllable in syllables:
+                    self.unigrams[syllable] += 1
+                    self.bigrams[(previous, syllable)] += 1
+                    self.context_totals[previous] += 1
+                    self.forms[strip_diacritics(syllable)].add(syllable)
+                    previous = syllable
+                self.bigrams[(previous, BOUNDARY)] += 1
+                self.context_totals[previous] += 1
+        self.total = sum(self.unigrams.values())
+        return self
+
+    def _unigram_prob(self, syllable):
+        vocabulary = len(self.unigrams) + 1
+        return (self.unigrams[syllable] + 1) / (self.total + vocabulary)
+
+    def _transition(self, previous, syllable):
+        """log P(syllable | previous), nội suy bigram với unigram"""
+        unigram = self._unigram_prob(syllable)
+        context = self.context_totals[previous]
+        bigram = self.bigrams[(previous, syllable)] / context if context else 0.0
+        return math.log(self.bigram_weight * bigram + (1 - self.bigram_weight) * unigram)
+
+    def candidates(self, word):
+        """
+        Ứng viên có dấu cho một từ
+
+        Returns:
+            tuple: (danh sách [(ứng viên, log tiên nghiệm)], từ có được mô hình biết hay không)
+        """
+        lower = _normalize(word)
+        plain = strip_diacritics(lower)
+
+        # Người dùng/ASR đã có dấu và từ có trong mô hình: giữ nguyên
+        if _has_diacritics(lower) and lower in self.unigrams:
+            return [(lower, 0.0)], True
+
+        candidates = [(form, 0.0) for form in sorted(self.forms.get(plain, ()))]
+        for key in sorted(confusable_keys(plain)):
+            candidates.extend((form, self.confusion_log_penalty) for form in sorted(self.forms.get(key, ())))
+
+        if candidates:
+            return candidates, True
+        # Từ không có trong mô hình (tiếng Anh, tên riêng...): giữ nguyên;
+        # chỉ âm tiết tiếng Việt không dấu chưa từng gặp mới bị coi là chưa biết
+        unknown = not _has_diacritics(lower) and bool(VIETNAMESE_SYLLABLE.match(plain))
+        return [(lower, 0.0)], not unknown
+
+    def _decode(self, words):
+        """
+        Viterbi + forward-backward trên một đoạn âm tiết
+
+        Returns:
+            tuple: (các âm tiết tốt nhất, độ tin cậy nhỏ nhất, số âm tiết tiếng Việt chưa biết)
+        """
+        lattice = []
+        unknown = 0
+        for word in words:
+            options, known = self.candidates(word)
+            if not known:
+                unknown += 1
+            lattice.append(options)
+
+        # Xác suất chuyển giữa các ứng viên liền kề (tính một lần, dùng cho cả hai thuật toán)
+        transitions = []
+        previous_states = [BOUNDARY]
+        for options in lattice:
+            transitions.append([
+                [self._transition(previous, form) + prior for form, prior in options]
+                for previous in previous_states
+            ])
+            previous_states = [form for form, _ in options]
+        # Câu yêu cầu thường là cụm từ bị cắt giữa chừng nên không tính xác suất kết thúc câu
+        end = [0.0] * len(previous_states)
+
+        # Viterbi
+        scores = [0.0]
+        backpointers = []
+        for step in transitions:
+            new_scores, pointers = [], []
+            for j in range(len(step[0])):
+                best_i = max(range(len(scores)), key=lambda i: scores[i] + step[i][j])
+                new_scores.append(scores[best_i] + step[best_i][j])
+                pointers.append(best_i)
+            scores = new_scores
+            backpointers.append(pointers)
+        best = max(range(len(scores)), key=lambda j: scores[j] + end[j])
+        path = [best]
+        for pointers in reversed(backpointers[1:]):
+            path.append(pointers[path[-1]])
+        path.reverse()
+
+        # Forward-backward để lấy xác suất hậu nghiệm của lựa chọn tại mỗi vị trí
+        forward = [[0.0]]
+        for step in transitions:
+            previous = forward[-1]
+            forward.append([
+                _logsumexp([previous[i] + step[i][j] for i in range(len(previous))])
+                for j in range(len(step[0]))
+            ])
+        backward = [end]
+        for step in reversed(transitions[1:]):
+            following = backward[0]
+            backward.insert(0, [
+                _logsumexp([row[j] + following[j] for j in range(len(row))])
+                for row in step
+            ])
+        total = _logsumexp([forward[-1][j] + end[j] for j in range(len(end))])
+
+        restored = [lattice[position][choice][0] for position, choice in enumerate(path)]
+
+        # Độ tin cậy từng âm tiết: xác suất hậu nghiệm, nhân hệ số phạt khi lựa chọn chỉ dựa vào
+        # unigram (không bigram kề bên nào đủ phổ biến) - hậu nghiệm khi đó rất tự tin nhưng
+        # thường sai với tên riêng ('nguyen nhat anh' -> 'nguyên nhất ảnh')
+        confidence = 1.0
+        for position, choice in enumerate(path):
+            changed = restored[position] != _normalize(words[position])
+            if len(lattice[position]) == 1 and not changed:
+                continue
+            posterior = 1.0
+            if len(lattice[position]) > 1:
+                posterior = math.exp(forward[position + 1][choice] + backward[position][choice] - total)
+            if not self._supported(restored, position):
+                posterior *= self.unsupported_penalty
+            confidence = min(confidence, posterior)
+
+        return restored, confidence, unknown
+
+    def _supported(self, syllables, position):
+        """Âm tiết có bigram (với âm tiết trước hoặc sau, kể cả đầu câu) đủ phổ biến không"""
+        previous = syllables[position - 1] if position else BOUNDARY
+        if self.bigrams[(previous, syllables[position])] >= self.min_bigram_count:
+            return True
+        following = syllables[position + 1] if position + 1 < len(syllables) else None
+        return following is not None and self.bigrams[(syllables[position], following)] >= self.min_bigram_count
+
+    def restore(self, text):
+        """
+        Khôi phục dấu và sửa lỗi đồng âm cho cả câu
+
+        Args:
+            text (str): Câu (thường là kết quả ASR)
+
+        Returns:
+            tuple: (câu đã sửa, độ tin cậy trong [0, 1])
+        """
+        if not text or not text.strip():
+            return text, 1.0
+
+        parts = TOKEN_PATTERN.split(text)
+        confidence = 1.0
+        vietnamese = 0
+        unknown = 0
+
+        # Mỗi đoạn từ liên tiếp (không bị ngắt bởi dấu câu hay chữ số) được giải mã riêng
+        run = []
+        for i in range(1, len(parts) + 1, 2):
+            is_word = i < len(parts) and SYLLABLE_PATTERN.fullmatch(parts[i]) is not None
+            if is_word:
+                run.append(i)
+            if run and (not is_word or SENTENCE_BREAK.search(parts[i + 1] if i + 1 < len(parts) else "")):
+                words = [parts[j] for j in run]
+                restored, run_confidence, run_unknown = self._decode(words)
+                for j, syllable in zip(run, restored):
+                    parts[j] = _preserve_case(parts[j], syllable)
+                confidence = min(confidence, run_confidence)
+                vietnamese += sum(1 for word in words if VIETNAMESE_SYLLABLE.match(strip_diacritics(_normalize(word))))
+                unknown += run_unknown
+                run = []
+
+        # Âm tiết tiếng Việt chưa từng gặp làm giảm độ tin cậy theo tỷ lệ
+        if vietnamese:
+            confidence *= 1 - unknown / vietnamese
+        return "".join(parts), confidence
+
+
+def _logsumexp(values):
+    peak = max(values)
+    return peak + math.log(sum(math.exp(value - peak) for value in values))
+
+
+def _preserve_case(original, corrected):
+    """Giữ kiểu chữ hoa/thường của từ gốc"""
+    if original.isupper() and len(original) > 1:
+        return corrected.upper()
+    if original[:1].isupper():
+        return corrected[:1].upper() + corrected[1:]
+    return corrected
+
+
+def catalog_texts(database_path=None):
+    """Tiêu đề, chủ đề, từ khóa và khoa của catalog"""
+    conn = sqlite3.connect(database_path or DATABASE_PATH)
+    try:
+        for row in conn.execute("SELECT title, subject, keywords, department FROM books"):
+            for value in row:
+                if value:
+                    yield str(value)
+    finally:
+        conn.close()
+
+
+def logged_queries(log_path=None):
+    """Các câu yêu cầu đã được sửa trong log (bản xoay vòng .1 rồi log hiện tại, mỗi dòng một câu)"""
+    log_path = log_path or QUERY_LOG_PATH
+    for path in (f"{log_path}.1", log_path):
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield line
+
+
+_log_lock = threading.Lock()
+
+
+def log_query(text, log_path=None, max_bytes=QUERY_LOG_MAX_BYTES):
+    """
+    Ghi câu yêu cầu đã sửa vào log để huấn luyện lại mô hình
+
+    Chỉ ghi câu từ nguồn bên ngoài mô hình (câu do OpenAI sửa) - ghi kết quả của chính
+    mô hình sẽ tự củng cố các lỗi của nó.
+
+    Args:
+        text (str): Câu yêu cầu có dấu
+        log_path (str): File log
+        max_bytes (int): Kích thước tối đa, vượt quá thì log được đổi tên thành .1 (ghi đè bản cũ)
+    """
+    text = " ".join((text or "").split())
+    if not text or not _has_diacritics(text):
+        return
+    log_path = log_path or QUERY_LOG_PATH
+    try:
+        with _log_lock:
+            if os.path.exists(log_path) and os.path.getsize(log_path) >= max_bytes:
+                os.replace(log_path, f"{log_path}.1")
+            with open(log_path, "a", encoding="utf-8") as f:
+                f.write(text + "\n")
+    except OSError as e:
+        logger.warning(f"Không thể ghi log câu yêu cầu: {e}")
+
+
+def build_restorer(database_paths=None, log_path=None):
+    """
+    Huấn luyện mô hình từ câu mẫu, catalog và log câu yêu cầu
+
+    Args:
+        database_paths (list): Các file SQLite của catalog (mặc định DATABASE_PATH)
+        log_path (str): File log câu yêu cầu
+
+    Returns:
+        DiacriticRestorer: Mô hình sẵn sàng sử dụng
+    """
+    restorer = DiacriticRestorer()
+    restorer.train(SEED_CORPUS.splitlines())
+    for database_path in database_paths or [DATABASE_PATH]:
+        try:
+            restorer.train(catalog_texts(database_path))
+        except sqlite3.Error as e:
+            logger.warning(f"Không đọc được catalog cho mô hình khôi phục dấu: {e}")
+    restorer.train(logged_queries(log_path))
+    logger.info(f"Đã xây dựng mô hình khôi phục dấu: {len(restorer.unigrams)} âm tiết, {len(restorer.bigrams)} bigram")
+    return restorer
@@ -0,0 +1,196 @@
+"""
+Module quản lý bảng facet (thống kê theo nhóm) cho catalog sách
+Các bảng facet được duy trì tăng dần bằng trigger trên bảng books
+"""
+
+import logging
+from collections import Counter
+from config import FACET_FIELDS, FACET_YEAR_BUCKET, FACET_UNKNOWN_VALUE
+
+logger = logging.getLogger(__name__)
+
+FACET_TABLE = "book_facets"
+
+
+def _value_sql(field, alias):
+    """
+    Biểu thức SQL tính giá trị facet của một dòng trong trigger
+
+    Args:
+        field (str): Tên cột trong bảng books
+        alias (str): NEW hoặc OLD
+
+    Returns:
+        str: Biểu thức SQL
+    """
+    column = f"{alias}.{field}"
+    if field == "publication_year":
+        bucket = f"(CAST({column} AS INTEGER) / {FACET_YEAR_BUCKET} * {FACET_YEAR_BUCKET})"
+        return (
+            f"CASE WHEN CAST({column} AS INTEGER) > 0 "
+            f"THEN printf('%d-%d', {bucket}, {bucket} + {FACET_YEAR_BUCKET - 1}) "
+            f"ELSE '{FACET_UNKNOWN_VALUE}' END"
+        )
+    return f"COALESCE(NULLIF(TRIM({column}), ''), '{FACET_UNKNOWN_VALUE}')"
+
+
+def facet_value(field, value):
+    """
+    Tính giá trị facet của một dòng trong Python (cùng quy tắc với trigger)
+
+    Args:
+        field (str): Tên cột
+        value: Giá trị của cột
+
+    Returns:
+        str: Giá trị facet
+    """
+    if field == "publication_year":
+        try:
+            year = int(value)
+        except (TypeError, ValueError):
+            return FACET_UNKNOWN_VALUE
+        if year <= 0:
+            return FACET_UNKNOWN_VALUE
+        start = year // FACET_YEAR_BUCKET * FACET_YEAR_BUCKET
+        return f"{start}-{start + FACET_YEAR_BUCKET - 1}"
+
+    text = str(value).strip() if value is not None else ""
+    return text or FACET_UNKNOWN_VALUE
+
+
+def _trigger_statements():
+    """Tạo các câu lệnh CREATE TRIGGER cho insert/update/delete"""
+    increments = []
+    decrements = []
+    for field in FACET_FIELDS:
+        increments.append(
+            f"INSERT INTO {FACET_TABLE} (facet, value, count) "
+            f"VALUES ('{field}', {_value_sql(field, 'NEW')}, 1) "
+            f"ON CONFLICT(facet, value) DO UPDATE SET count = count + 1;"
+        )
+        decrements.append(
+            f"UPDATE {FACET_TABLE} SET count = count - 1 "
+            f"WHERE facet = '{field}' AND value = {_value_sql(field, 'OLD')};"
+        )
+    cleanup = f"DELETE FROM {FACET_TABLE} WHERE count <= 0;"
+    watched_columns = ", ".join(FACET_FIELDS)
+
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS books_facets_ai AFTER INSERT ON books
+        BEGIN
+            {' '.join(increments)}
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS books_facets_ad AFTER DELETE ON books
+        BEGIN
+            {' '.join(decrements)}
+            {cleanup}
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS books_facets_au AFTER UPDATE OF {watched_columns} ON books
+        BEGIN
+            {' '.join(decrements)}
+            {' '.join(increments)}
+            {cleanup}
+        END""",
+    ]
+
+
+def rebuild_facets(conn):
+    """
+    Tính lại toàn bộ bảng facet từ bảng books (chỉ chạy khi khởi tạo)
+
+    Args:
+        conn (sqlite3.Connection): Kết nối database
+    """
+    with conn:
+        conn.execute(f"DELETE FROM {FACET_TABLE}")
+        for field in FACET_FIELDS:
+            expression = _value_sql(field, "books")
+            conn.execute(
+                f"INSERT INTO {FACET_TABLE} (facet, value, count) "
+                f"SELECT '{field}', {expression}, COUNT(*) FROM books GROUP BY 2"
+            )
+    logger.info("Đã xây dựng lại bảng facet")
+
+
+def ensure_facet_tables(conn):
+    """
+    Tạo bảng facet và trigger nếu chưa có
+
+    Args:
+        conn (sqlite3.Connection): Kết nối database
+
+    Returns:
+        bool: True nếu bảng facet sẵn sàng
+    """
+    try:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (FACET_TABLE,)
+        ).fetchone()
+
+        with conn:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {FACET_TABLE} (
+                    facet TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (facet, value)
+                ) WITHOUT ROWID
+            """)
+            for statement in _trigger_statements():
+                conn.execute(statement)
+
+        if not exists:
+            rebuild_facets(conn)
+        return True
+    except Exception as e:
+        logger.error(f"Lỗi khởi tạo bảng facet: {e}")
+        return False
+
+
+def get_facet_counts(conn, facet=None, limit=None):
+    """
+    Đọc số lượng theo facet từ bảng đã tính sẵn
+
+    Args:
+        conn (sqlite3.Connection): Kết nối database
+        facet (str): Tên facet, None để lấy tất cả
+        limit (int): Số giá trị tối đa cho mỗi facet
+
+    Returns:
+        dict: {facet: [(value, count), ...]} sắp xếp theo count giảm dần
+    """
+    facets = [facet] if facet else list(FACET_FIELDS)
+    counts = {}
+    for name in facets:
+        query = f"SELECT value, count FROM {FACET_TABLE} WHERE facet = ? ORDER BY count DESC, value"
+        params = [name]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        counts[name] = [tuple(row) for row in conn.execute(query, params).fetchall()]
+    return counts
+
+
+def facet_counts_for_results(results, facets=None):
+    """
+    Tính facet cho tập kết quả hiện tại từ các dòng đã có trong bộ nhớ
+
+    Args:
+        results (list): Danh sách dict kết quả tìm kiếm
+        facets (list): Danh sách facet cần tính, mặc định FACET_FIELDS
+
+    Returns:
+        dict: {facet: [(value, count), ...]} sắp xếp theo count giảm dần
+    """
+    counts = {}
+    for field in facets or FACET_FIELDS:
+        counter = Counter(
+            facet_value(field, row.get(field))
+            for row in results
+            if isinstance(row, dict) and field in row
+        )
+        if counter:
+            counts[field] = counter.most_common()
+    return counts
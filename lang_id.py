@@ -0,0 +1,147 @@
+"""
+Module nhận diện ngôn ngữ nhanh, tất định cho câu yêu cầu tiếng Việt/tiếng Anh
+Quyết định dựa trên ký tự có dấu tiếng Việt, cấu trúc âm tiết và mô hình n-gram ký tự nhỏ;
+langdetect chỉ được dùng khi không phân định được
+"""
+
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from config import LANG_ID_CACHE_SIZE, LANG_ID_MIN_MARGIN
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+# Chữ cái chỉ có trong tiếng Việt (sau khi bỏ dấu thanh)
+VIETNAMESE_LETTERS = set("ăâđêôơư")
+# Dấu thanh tiếng Việt (dạng tổ hợp NFD): huyền, sắc, hỏi, ngã, nặng
+VIETNAMESE_TONE_MARKS = {"̀", "́", "̉", "̃", "̣"}
+
+# Cấu trúc âm tiết tiếng Việt (không dấu): phụ âm đầu + nguyên âm + phụ âm cuối
+VIETNAMESE_SYLLABLE = re.compile(
+    r"^(ngh|ng|nh|ch|gh|gi|kh|ph|qu|th|tr|[bcdđghklmnprstvx])?"
+    r"[aeiouyăâêôơư]{1,3}"
+    r"(ng|nh|ch|[cmnpt])?$"
+)
+
+# Ngữ liệu mẫu cho mô hình n-gram ký tự (không dấu, vì ASR thường mất dấu)
+VIETNAMESE_SAMPLE = """
+tim sach ve lap trinh toi muon tim sach cho hoc sinh giao trinh tham khao chuyen nganh
+thu vien khoa cong nghe thong tin kinh te van hoc nghe thuat lich su dia ly kien truc
+nha o nong thon xay dung moi truong phat trien du lich viet nam tac gia nam xuat ban
+co bao nhieu cuon sach nao hay nhat cua nguoi dan quan ly ky thuat dien anh san khau
+ban can tim quyen sach gi muon muon doc hoc tap nghien cuu khoa hoc tu nhien xa hoi
+ngon ngu tieng anh toan ly hoa sinh y duoc luat kinh doanh tai chinh ngan hang
+"""
+
+ENGLISH_SAMPLE = """
+find books about programming i want to learn machine learning search for a book on
+java python database algorithm tutorial for beginners the library has many books
+need information about data science web development software engineering computer
+history of art and literature the best guide to economics business finance
+please show me some books what is the newest book which author wrote this
+introduction advanced practice reference learning study read with from that this
+"""
+
+
+def strip_diacritics(text):
+    """Bỏ dấu tiếng Việt: 'tìm sách' -> 'tim sach'"""
+    text = unicodedata.normalize("NFD", text).replace("đ", "d").replace("Đ", "D")
+    return "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+
+
+def _trigrams(word):
+    padded = f"^{word}$"
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+class CharNgramModel:
+    """Mô hình trigram ký tự với làm mịn add-one"""
+
+    def __init__(self, sample):
+        self.counts = Counter()
+        for word in WORD_PATTERN.findall(sample.lower()):
+            self.counts.update(_trigrams(word))
+        self.total = sum(self.counts.values())
+        self.vocabulary = len(self.counts) + 1
+
+    def log_prob(self, word):
+        return sum(
+            math.log((self.counts[gram] + 1) / (self.total + self.vocabulary))
+            for gram in _trigrams(word)
+        )
+
+
+_VI_MODEL = CharNgramModel(VIETNAMESE_SAMPLE)
+_EN_MODEL = CharNgramModel(ENGLISH_SAMPLE)
+
+_langdetect_lock = threading.Lock()
+_langdetect_detect = None
+
+
+def _fallback_detect(text):
+    """langdetect (tất định nhờ seed cố định), chỉ nạp khi thực sự cần"""
+    global _langdetect_detect
+    if _langdetect_detect is None:
+        with _langdetect_lock:
+            if _langdetect_detect is None:
+                from langdetect import DetectorFactory, detect
+                DetectorFactory.seed = 0
+                _langdetect_detect = detect
+    return _langdetect_detect(text)
+
+
+def score_language(text):
+    """
+    Tính điểm tiếng Việt so với tiếng Anh
+
+    Args:
+        text (str): Văn bản đầu vào
+
+    Returns:
+        float: > 0 nghiêng về tiếng Việt, < 0 nghiêng về tiếng Anh
+    """
+    score = 0.0
+    for word in WORD_PATTERN.findall(text.lower()):
+        decomposed = unicodedata.normalize("NFD", word)
+        if any(ch in VIETNAMESE_TONE_MARKS for ch in decomposed) or any(ch in VIETNAMESE_LETTERS for ch in word):
+            score += 2.0
+            continue
+
+        plain = strip_diacritics(word)
+        if not VIETNAMESE_SYLLABLE.match(plain):
+            score -= 1.5
+            continue
+
+        # Âm tiết hợp lệ cả hai ngôn ngữ: dùng n-gram ký tự, chuẩn hóa theo độ dài
+        grams = len(plain) + 1
+        ratio = (_VI_MODEL.log_prob(plain) - _EN_MODEL.log_prob(plain)) / grams
+        score += max(-1.0, min(1.0, ratio))
+    return score
+
+
+@lru_cache(maxsize=LANG_ID_CACHE_SIZE)
+def detect_language(text):
+    """
+    Nhận diện ngôn ngữ (kết quả được ghi nhớ theo chuỗi)
+
+    Args:
+        text (str): Văn bản đầu vào
+
+    Returns:
+        str: 'vi', 'en' hoặc mã ngôn ngữ của langdetect khi không phân định được
+    """
+    words = WORD_PATTERN.findall(text or "")
+    if not words:
+        return 'vi'
+
+    score = score_language(text)
+    if abs(score) >= LANG_ID_MIN_MARGIN:
+        return 'vi' if score > 0 else 'en'
+
+    try:
+        return _fallback_detect(text)
+    except Exception:
+        return 'vi' if score >= 0 else 'en'
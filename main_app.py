@@ -1,195 +1,33 @@
 import sys
 import os
+import threading
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, 
                             QWidget, QPushButton, QTextEdit, QLabel, QMessageBox, 
-                            QProgressBar, QFrame, QGridLayout, QGroupBox)
+                            QProgressBar, QFrame, QGridLayout, QGroupBox, QListWidget, QListView,
+                            QAbstractItemView)
 from PyQt6.QtCore import Qt, QPropertyAnimation, QRect, pyqtSignal, QTimer, QThread
 from PyQt6.QtGui import QFont
-from audio_workers import RecordingWorker, AudioWorker
+from audio_workers import RecordingWorker
+from audio_session import get_audio_session
+from wake_word import WakeWordListener
+from audio_archive import get_archive_writer
+from results_model import ResultListModel, format_facets
+from search_service import SearchService
+from config import (SUGGEST_DEBOUNCE_MS, SUGGEST_MAX_RESULTS, WAKE_WORD_ENABLED, TTS_READ_RESULTS,
+                    RESULTS_BATCH_SIZE, WORKER_STOP_TIMEOUT_MS, SPECULATIVE_SEARCH,
+                    SPECULATIVE_SEARCH_DELAY_MS)
 
-class PipelineWorker(QThread):
-    """Worker tối ưu để chạy pipeline tuần tự"""
-    progress_update = pyqtSignal(str, int)
-    finished = pyqtSignal(str, str)
-    error = pyqtSignal(str)
-    
-    def __init__(self, recorded_text):
-        super().__init__()
-        self.recorded_text = recorded_text
-        self.is_running = True
+class PrefixIndexLoader(QThread):
+    """Worker tải chỉ mục gợi ý ở background khi khởi động"""
+    loaded = pyqtSignal(object)
     
     def run(self):
-        processor = None
-        try:
-            print(f"🔄 Starting optimized pipeline: '{self.recorded_text}'")
-            
-            # Khởi tạo processor
-            from search_processor import SearchProcessor
-            processor = SearchProcessor()
-            
-            # Pipeline steps với error handling tốt hơn
-            steps = [
-                (20, "🔍 CHỈNH SỬA VĂN BẢN...", self._correct_text),
-                (40, "⚙️ TẠO TRUY VẤN SQL...", self._generate_sql),
-                (60, "✅ KIỂM TRA TRUY VẤN...", self._validate_sql),
-                (80, "📚 TÌM KIẾM DATABASE...", self._query_database),
-                (90, "📝 FORMAT KẾT QUẢ...", self._format_results)
-            ]
-            
-            context = {'processor': processor, 'text': self.recorded_text}
-            
-            for progress, message, step_func in steps:
-                if not self.is_running:
-                    return
-                    
-                self.progress_update.emit(message, progress)
-                context = step_func(context)
-                
-                if context.get('error'):
-                    raise Exception(context['error'])
-            
-            # Hoàn thành
-            self.progress_update.emit("✅ HOÀN THÀNH!", 100)
-            self.finished.emit(
-                context.get('corrected_text', self.recorded_text),
-                context.get('formatted_results', 'Không có kết quả')
-            )
-            
-        except Exception as e:
-            print(f"❌ Pipeline error: {str(e)}")
-            self.error.emit(str(e))
-        finally:
-            if processor:
-                try:
-                    processor.close()
-                except:
-                    pass
-    
-    def _correct_text(self, context):
-        """Bước 1: Sửa văn bản"""
-        try:
-            corrected = context['processor'].correct_text(context['text'])
-            context['corrected_text'] = corrected
-            print(f"✓ Text: '{context['text']}' → '{corrected}'")
-            return context
-        except Exception as e:
-            context['error'] = f"Lỗi chỉnh sửa văn bản: {str(e)}"
-            return context
-    
-    def _generate_sql(self, context):
-        """Bước 2: Tạo SQL"""
         try:
-            sql = context['processor'].text_to_sql(context['corrected_text'])
-            context['sql_query'] = sql
-            print(f"✓ SQL: {sql}")
-            return context
+            from prefix_index import PrefixIndex
+            from config import CATALOG_SHARDS
+            self.loaded.emit(PrefixIndex.from_databases(CATALOG_SHARDS or [None]))
         except Exception as e:
-            context['error'] = f"Lỗi tạo truy vấn: {str(e)}"
-            return context
-    
-    def _validate_sql(self, context):
-        """Bước 3: Kiểm tra SQL"""
-        sql = context.get('sql_query', '')
-        if not sql or not sql.strip():
-            context['error'] = "Không thể tạo câu truy vấn từ văn bản"
-        return context
-    
-    def _query_database(self, context):
-        """Bước 4: Truy vấn database"""
-        try:
-            results = context['processor'].query_database(context['sql_query'])
-            
-            # Debug: In ra cấu trúc dữ liệu để hiểu rõ hơn
-            print(f"🔍 Debug - Raw results type: {type(results)}")
-            print(f"🔍 Debug - Raw results: {results}")
-            
-            # Xử lý kết quả - có thể là tuple (success, data) hoặc chỉ là data
-            if isinstance(results, tuple) and len(results) == 2:
-                success, data = results
-                if success:
-                    context['results'] = data
-                    count = len(data) if isinstance(data, list) else 'N/A'
-                    print(f"✓ Found: {count} results")
-                else:
-                    context['error'] = f"Lỗi truy vấn database: {data}"
-            else:
-                # Trường hợp trả về trực tiếp data
-                context['results'] = results
-                count = len(results) if isinstance(results, list) else 'N/A'
-                print(f"✓ Found: {count} results")
-            
-            return context
-        except Exception as e:
-            context['error'] = f"Lỗi truy vấn database: {str(e)}"
-            return context
-    
-    def _format_results(self, context):
-        """Bước 5: Format kết quả"""
-        try:
-            formatted = self.format_results(context['results'])
-            context['formatted_results'] = formatted
-            return context
-        except Exception as e:
-            context['error'] = f"Lỗi format kết quả: {str(e)}"
-            return context
-    
-    def format_results(self, results):
-        """Format kết quả thành string đẹp và tối ưu"""
-        # Xử lý trường hợp results là tuple (success, data)
-        if isinstance(results, tuple) and len(results) == 2:
-            success, data = results
-            if not success:
-                return f"❌ Lỗi truy vấn: {data}"
-            results = data
-        
-        if isinstance(results, list) and results:
-            formatted_results = ""
-            
-            for i, item in enumerate(results, 1):
-                if isinstance(item, dict):
-                    formatted_results += f"📖 Kết quả {i}:\n"
-                    
-                    # Format theo thứ tự ưu tiên
-                    priority_fields = [
-                        ('title', '📚 Tiêu đề'),
-                        ('author', '✍️ Tác giả'),
-                        ('category', '📂 Thể loại'),
-                        ('description', '📝 Mô tả'),
-                        ('price', '💰 Giá'),
-                        ('publication_year', '📅 Năm xuất bản'),
-                        ('year', '📅 Năm xuất bản'),
-                        ('isbn', '🔢 ISBN')
-                    ]
-                    
-                    for field, icon_label in priority_fields:
-                        if field in item and item[field]:
-                            value = item[field]
-                            if field == 'price' and isinstance(value, (int, float)):
-                                formatted_results += f"   {icon_label}: {value:,.0f} VND\n"
-                            else:
-                                formatted_results += f"   {icon_label}: {value}\n"
-                    
-                    # Thêm các field khác nếu có
-                    displayed_fields = [field for field, _ in priority_fields]
-                    for key, value in item.items():
-                        if key not in displayed_fields and value:
-                            formatted_results += f"   • {key}: {value}\n"
-                    
-                    formatted_results += "\n"
-                else:
-                    formatted_results += f"📖 Kết quả {i}: {str(item)}\n\n"
-            
-            return formatted_results
-        elif isinstance(results, list) and not results:
-            return "❌ Không tìm thấy kết quả nào phù hợp với yêu cầu tìm kiếm.\n\n💡 Gợi ý:\n• Thử từ khóa khác\n• Kiểm tra chính tả\n• Sử dụng từ khóa đơn giản hơn"
-        else:
-            return f"📄 Kết quả: {str(results)}"
-    
-    def stop(self):
-        """Dừng pipeline một cách an toàn"""
-        self.is_running = False
-        self.quit()
-        self.wait()
+            print(f"⚠️ Không thể tải chỉ mục gợi ý: {e}")
 
 class LibrarySearchApp(QMainWindow):
     def __init__(self):
@@ -201,15 +39,53 @@ class LibrarySearchApp(QMainWindow):
         
         # Worker instances
         self.recording_worker = None
-        self.transcription_worker = None
-        self.pipeline_worker = None
-        
-        # Timer for recording
-        self.recording_timer_obj = QTimer()
-        self.recording_timer_obj.timeout.connect(self.update_recording_time_tick)
-        self.recording_seconds = 0
+        self.retired_workers = []  # Worker đã hủy nhưng thread chưa thoát hẳn
+        self.transcription_job = None  # Id job đang chờ trên search_service
+        self.search_job = None
+        self.speculation = None  # Tìm kiếm chạy trước khi xác nhận: kết quả được giữ lại tới khi xác nhận
+        self.wake_word_listener = None
+        self.result_reader = None
+        
+        # Gợi ý khi đang gõ (debounce theo keystroke)
+        self.prefix_index = None
+        self.suggest_timer = QTimer()
+        self.suggest_timer.setSingleShot(True)
+        self.suggest_timer.setInterval(SUGGEST_DEBOUNCE_MS)
+        self.suggest_timer.timeout.connect(self.update_suggestions)
+        
+        # Tìm kiếm chạy trước chỉ bắt đầu khi văn bản đứng yên (debounce): mỗi lần chạy gọi OpenAI
+        # và lần bị bỏ vẫn tốn phí, nên không chạy theo từng lần sửa
+        self.speculation_timer = QTimer()
+        self.speculation_timer.setSingleShot(True)
+        self.speculation_timer.setInterval(SPECULATIVE_SEARCH_DELAY_MS)
+        self.speculation_timer.timeout.connect(self.start_speculative_search)
         
         self.initUI()
+        
+        # Dịch vụ xử lý sống suốt vòng đời ứng dụng: SearchProcessor được khởi tạo một lần,
+        # warm-up chạy ở background ngay khi cửa sổ hiện lên (xem showEvent)
+        self.search_service = SearchService()
+        self.search_service.warmup_progress.connect(self.on_warmup_progress)
+        self.search_service.transcription_finished.connect(self.on_transcription_finished)
+        self.search_service.transcription_failed.connect(self.on_transcription_error)
+        self.search_service.progress_update.connect(self.on_pipeline_progress)
+        self.search_service.rows_ready.connect(self.on_pipeline_rows)
+        self.search_service.search_finished.connect(self.on_pipeline_finished)
+        self.search_service.search_failed.connect(self.on_pipeline_error)
+        
+        self.prefix_index_loader = PrefixIndexLoader()
+        self.prefix_index_loader.loaded.connect(self.on_prefix_index_loaded)
+        self.prefix_index_loader.start()
+        
+        # Mở sẵn thiết bị âm thanh ở background để nhấn GHI ÂM là ghi được ngay
+        self.audio_session = get_audio_session()
+        threading.Thread(target=self.audio_session.warm_up, daemon=True).start()
+        
+        # Nghe từ đánh thức ("thư viện ơi") để ghi âm không cần bấm nút
+        if WAKE_WORD_ENABLED:
+            self.wake_word_listener = WakeWordListener()
+            self.wake_word_listener.detected.connect(self.on_wake_word_detected)
+            self.wake_word_listener.start()
     
     def initUI(self):
         self.setWindowTitle("📚 Tìm Kiếm Thư Viện Bằng Giọng Nói")
@@ -343,8 +219,9 @@ class LibrarySearchApp(QMainWindow):
         self.verification_label.setVisible(False)
         
         self.transcription_display = QTextEdit()
-        self.transcription_display.setMinimumHeight(150)
-        self.transcription_display.setReadOnly(True)
+        self.transcription_display.setMinimumHeight(100)
+        self.transcription_display.setAcceptRichText(False)
+        self.transcription_display.textChanged.connect(self.on_transcription_edited)
         self.transcription_display.setPlaceholderText("Văn bản nhận diện sẽ hiển thị ở đây...")
         self.transcription_display.setStyleSheet("""
             QTextEdit {
@@ -359,6 +236,24 @@ class LibrarySearchApp(QMainWindow):
         """)
         self.transcription_display.setVisible(False)
         
+        self.suggestion_list = QListWidget()
+        self.suggestion_list.setFixedHeight(100)
+        self.suggestion_list.itemClicked.connect(self.on_suggestion_clicked)
+        self.suggestion_list.setStyleSheet("""
+            QListWidget {
+                background: #ffffff;
+                border: 1px solid #bdc3c7;
+                border-radius: 8px;
+                padding: 5px;
+                font-size: 13px;
+                color: #2c3e50;
+            }
+            QListWidget::item:hover {
+                background: #e8f4fd;
+            }
+        """)
+        self.suggestion_list.setVisible(False)
+        
         # Stage 3: Results
         self.results_label = QLabel("📚 KẾT QUẢ TÌM KIẾM")
         self.results_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -375,7 +270,7 @@ class LibrarySearchApp(QMainWindow):
         self.results_label.setVisible(False)
         
         self.result_output = QTextEdit()
-        self.result_output.setMinimumHeight(200)
+        self.result_output.setMinimumHeight(80)
         self.result_output.setReadOnly(True)
         self.result_output.setPlaceholderText("Kết quả tìm kiếm sách sẽ hiển thị ở đây...")
         self.result_output.setStyleSheet("""
@@ -391,13 +286,47 @@ class LibrarySearchApp(QMainWindow):
         """)
         self.result_output.setVisible(False)
         
+        # Danh sách kết quả: chỉ các dòng đang hiển thị được vẽ, nhấn đúp để xem tóm tắt/liên kết
+        self.results_model = ResultListModel()
+        self.result_list = QListView()
+        self.result_list.setModel(self.results_model)
+        self.result_list.setMinimumHeight(200)
+        self.result_list.setWordWrap(True)
+        self.result_list.setLayoutMode(QListView.LayoutMode.Batched)
+        self.result_list.setBatchSize(RESULTS_BATCH_SIZE)
+        self.result_list.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.result_list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.result_list.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.result_list.doubleClicked.connect(self.results_model.toggle_expanded)
+        self.result_list.setStyleSheet("""
+            QListView {
+                background: #ffffff;
+                border: 2px solid #2ecc71;
+                border-radius: 10px;
+                padding: 10px;
+                font-size: 14px;
+                color: #2c3e50;
+            }
+            QListView::item {
+                padding: 8px;
+                border-bottom: 1px solid #ecf0f1;
+            }
+            QListView::item:selected {
+                background: #e8f4fd;
+                color: #2c3e50;
+            }
+        """)
+        self.result_list.setVisible(False)
+        
         # Add all content to layout
         self.content_layout.addWidget(self.instruction_label)
         self.content_layout.addWidget(self.examples_label)
         self.content_layout.addWidget(self.verification_label)
         self.content_layout.addWidget(self.transcription_display)
+        self.content_layout.addWidget(self.suggestion_list)
         self.content_layout.addWidget(self.results_label)
         self.content_layout.addWidget(self.result_output)
+        self.content_layout.addWidget(self.result_list)
         self.content_layout.addStretch()
         
         self.main_display_layout.addWidget(self.title_label)
@@ -549,6 +478,25 @@ class LibrarySearchApp(QMainWindow):
             }
         """)
         
+        # Level meter (mức âm lượng micro khi ghi âm)
+        self.level_meter = QProgressBar()
+        self.level_meter.setRange(0, 100)
+        self.level_meter.setTextVisible(False)
+        self.level_meter.setFixedHeight(8)
+        self.level_meter.setVisible(False)
+        self.level_meter.setStyleSheet("""
+            QProgressBar {
+                border: none;
+                border-radius: 4px;
+                background: #ecf0f1;
+            }
+            QProgressBar::chunk {
+                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+                    stop:0 #2ecc71, stop:0.7 #f1c40f, stop:1 #e74c3c);
+                border-radius: 4px;
+            }
+        """)
+        
         # Progress bar
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
@@ -570,6 +518,7 @@ class LibrarySearchApp(QMainWindow):
         
         status_layout.addWidget(self.recording_status)
         status_layout.addWidget(self.recording_timer)
+        status_layout.addWidget(self.level_meter)
         status_layout.addWidget(self.progress_bar)
         
         layout.addWidget(self.status_frame)
@@ -583,8 +532,13 @@ class LibrarySearchApp(QMainWindow):
         self.examples_label.setVisible(False)
         self.verification_label.setVisible(False)
         self.transcription_display.setVisible(False)
+        self.suggestion_list.setVisible(False)
         self.results_label.setVisible(False)
         self.result_output.setVisible(False)
+        self.result_list.setVisible(False)
+        
+        if self.wake_word_listener:
+            self.wake_word_listener.set_paused(stage != 1)
         
         if stage == 1:  # Stage ghi âm
             self.instruction_label.setVisible(True)
@@ -607,6 +561,7 @@ class LibrarySearchApp(QMainWindow):
         elif stage == 3:  # Stage kết quả
             self.results_label.setVisible(True)
             self.result_output.setVisible(True)
+            self.result_list.setVisible(True)
             self.main_action_button.setText("🔄 TÌM KIẾM MỚI")
             self.main_action_button.setEnabled(True)
             self.secondary_action_button.setText("📋 COPY")
@@ -633,65 +588,80 @@ class LibrarySearchApp(QMainWindow):
     
     def start_recording(self):
         """Bắt đầu ghi âm"""
-        # Dừng tất cả workers trước khi bắt đầu
+        # Dừng tất cả workers trước khi bắt đầu (và ngắt đọc kết quả)
+        self.stop_reading()
         self.stop_all_workers()
+        if self.wake_word_listener:
+            self.wake_word_listener.set_paused(True)
         
         self.main_action_button.setEnabled(False)
         self.secondary_action_button.setEnabled(True)
         self.recording_status.setText("🔴 ĐANG GHI ÂM - Hãy nói rõ yêu cầu của bạn...")
         self.recording_timer.setVisible(True)
         self.recording_timer.setText("⏱️ 00:00")
+        self.level_meter.setValue(0)
+        self.level_meter.setVisible(True)
         self.status_frame.setVisible(True)
         
-        # Reset timer
-        self.recording_seconds = 0
-        self.recording_timer_obj.start(1000)
-        
-        # Start recording worker
-        self.recording_worker = RecordingWorker()
-        self.recording_worker.recording_finished.connect(self.on_recording_finished)
-        self.recording_worker.error.connect(self.on_recording_error)
-        self.recording_worker.start()
+        # Start recording worker (thời gian và mức âm lượng đến từ vòng ghi âm)
+        if self.recording_worker is None:
+            self.recording_worker = self.create_recording_worker()
+        self.recording_worker.begin()
+    
+    def create_recording_worker(self):
+        """Tạo RecordingWorker và nối tín hiệu một lần (worker được dùng lại cho các lần ghi sau)"""
+        worker = RecordingWorker()
+        worker.recording_finished.connect(self.on_recording_finished)
+        worker.error.connect(self.on_recording_error)
+        worker.recording_time_update.connect(self.update_recording_time)
+        worker.level_update.connect(self.update_level_meter)
+        worker.max_duration_reached.connect(self.stop_recording)
+        return worker
     
     def stop_recording(self):
         """Dừng ghi âm"""
         if self.recording_worker and self.recording_worker.isRunning():
             self.recording_worker.stop_recording()
         
-        self.recording_timer_obj.stop()
         self.main_action_button.setEnabled(True)
         self.secondary_action_button.setEnabled(False)
         self.recording_status.setText("⏳ ĐANG XỬ LÝ ÂM THANH - Vui lòng đợi...")
         self.recording_timer.setVisible(False)
+        self.level_meter.setVisible(False)
         self.progress_bar.setVisible(True)
         self.progress_bar.setRange(0, 0)  # Indeterminate progress
     
-    def update_recording_time_tick(self):
-        """Cập nhật thời gian ghi âm mỗi giây"""
-        self.recording_seconds += 1
-        minutes = self.recording_seconds // 60
-        secs = self.recording_seconds % 60
-        self.recording_timer.setText(f"⏱️ {minutes:02d}:{secs:02d}")
-    
     def stop_all_workers(self):
-        """Dừng tất cả các worker đang chạy một cách an toàn"""
-        workers = [
-            ('recording_worker', lambda w: w.stop_recording()),
-            ('transcription_worker', lambda w: w.quit()),
-            ('pipeline_worker', lambda w: w.stop())
-        ]
-        
-        for worker_name, stop_func in workers:
-            if hasattr(self, worker_name):
-                worker = getattr(self, worker_name)
-                if worker and worker.isRunning():
-                    try:
-                        stop_func(worker)
-                        worker.wait(1000)  # Wait max 1 second
-                    except:
-                        worker.terminate()  # Force terminate if needed
-        
-        self.recording_timer_obj.stop()
+        """Hủy tất cả các worker/job đang chạy (hủy hợp tác qua token, không bao giờ terminate)"""
+        worker = self.recording_worker
+        if worker and worker.isRunning():
+            worker.stop_recording(discard=True)
+            if not worker.wait(WORKER_STOP_TIMEOUT_MS):
+                # Thread sẽ tự thoát ở vòng đọc kế tiếp; giữ tham chiếu để QThread không bị hủy khi đang chạy,
+                # lần ghi sau dùng worker mới (tín hiệu muộn của worker cũ bị bỏ qua, xem _is_current)
+                self.retired_workers.append(worker)
+                self.recording_worker = None
+        
+        # Job trên search_service: tín hiệu muộn mang id cũ bị bỏ qua (xem _is_current_job)
+        self.speculation_timer.stop()
+        self.speculation = None
+        for job_name in ('transcription_job', 'search_job'):
+            job_id = getattr(self, job_name)
+            if job_id is not None:
+                self.search_service.cancel(job_id)
+                setattr(self, job_name, None)
+        
+        self.retired_workers = [worker for worker in self.retired_workers if worker.isRunning()]
+    
+    def _is_current(self, worker_name):
+        """Tín hiệu có đến từ worker hiện tại không (worker đã hủy có thể còn phát tín hiệu đang chờ)"""
+        worker = getattr(self, worker_name)
+        # sender() là None khi worker cũ đã bị giải phóng trước khi tín hiệu được xử lý
+        return worker is not None and self.sender() is worker
+    
+    def _is_current_job(self, job_name, job_id):
+        """Tín hiệu có thuộc job hiện tại không (job đã hủy có thể còn tín hiệu đang chờ)"""
+        return job_id is not None and getattr(self, job_name) == job_id
     
     def update_recording_time(self, seconds):
         """Cập nhật thời gian ghi âm"""
@@ -699,27 +669,42 @@ class LibrarySearchApp(QMainWindow):
         secs = seconds % 60
         self.recording_timer.setText(f"⏱️ {minutes:02d}:{secs:02d}")
     
+    def on_wake_word_detected(self, distance):
+        """Nghe thấy từ đánh thức - bắt đầu ghi âm nếu đang ở màn hình ghi âm"""
+        recording = self.recording_worker and self.recording_worker.isRunning()
+        if self.current_stage == 1 and not recording:
+            print(f"👂 Wake word detected ({distance:.2f})")
+            self.start_recording()
+    
+    def update_level_meter(self, level):
+        """Cập nhật thanh mức âm lượng (level trong [0, 1])"""
+        self.level_meter.setValue(int(level * 100))
+    
     def on_recording_finished(self, audio_file):
         """Xử lý khi ghi âm hoàn thành"""
+        # Worker được dùng lại: bỏ qua tín hiệu muộn của lần ghi trước khi lần ghi mới đã bắt đầu
+        if not self._is_current('recording_worker') or self.recording_worker.is_recording:
+            return
         self.temp_recording = audio_file
-        self.recording_timer_obj.stop()
         
         print(f"🎤 Recording completed: {audio_file}")
         
         # Bắt đầu transcription
-        self.transcription_worker = AudioWorker(audio_file)
-        self.transcription_worker.finished.connect(self.on_transcription_finished)
-        self.transcription_worker.error.connect(self.on_transcription_error)
-        self.transcription_worker.start()
+        self.transcription_job = self.search_service.submit_transcription(audio_file)
     
     def on_recording_error(self, error_msg):
         """Xử lý lỗi ghi âm"""
+        if not self._is_current('recording_worker'):
+            return
         self.stop_all_workers()
         QMessageBox.critical(self, "Lỗi ghi âm", error_msg)
         self.update_ui_for_stage(1)
     
-    def on_transcription_finished(self, text, results):
+    def on_transcription_finished(self, job_id, text):
         """Xử lý khi nhận diện hoàn thành"""
+        if not self._is_current_job('transcription_job', job_id):
+            return
+        self.transcription_job = None
         self.progress_bar.setVisible(False)
         
         print(f"🎤 Transcription: '{text}'")
@@ -732,22 +717,95 @@ class LibrarySearchApp(QMainWindow):
             self.recorded_text = text
             self.transcription_display.setText(text)
             self.update_ui_for_stage(2)
+            self.suggest_timer.start()
+            if SPECULATIVE_SEARCH:
+                self.speculation_timer.start()
+    
+    def start_speculative_search(self):
+        """
+        Chạy trước pipeline tìm kiếm trong khi người dùng đọc lại văn bản (sau SPECULATIVE_SEARCH_DELAY_MS
+        không sửa, xem speculation_timer)
+        
+        Tín hiệu của job được giữ trong self.speculation; xác nhận không sửa thì hiển thị ngay,
+        sửa văn bản thì job bị hủy (xem discard_speculative_search)
+        """
+        text = self.transcription_display.toPlainText().strip()
+        if self.current_stage != 2 or self.speculation is not None or len(text) < 3:
+            return
+        self.speculation = {'text': text, 'rows': [], 'progress': None, 'outcome': None}
+        self.search_job = self.search_service.submit_search(text)
+        print(f"🔮 Speculative search: '{text}'")
     
-    def on_transcription_error(self, error_msg):
+    def discard_speculative_search(self):
+        """Bỏ tìm kiếm chạy trước (văn bản đã bị sửa); request OpenAI đang chạy bị ngắt qua token"""
+        if self.speculation is None:
+            return
+        self.speculation = None
+        if self.search_job is not None:
+            self.search_service.cancel(self.search_job)
+            self.search_job = None
+        print("⏹️ Speculative search discarded")
+    
+    def on_transcription_error(self, job_id, error_msg):
         """Xử lý lỗi nhận diện"""
+        if not self._is_current_job('transcription_job', job_id):
+            return
         self.stop_all_workers()
         QMessageBox.critical(self, "Lỗi", error_msg)
         self.update_ui_for_stage(1)
     
+    def on_prefix_index_loaded(self, index):
+        """Nhận chỉ mục gợi ý đã tải xong"""
+        self.prefix_index = index
+        print("✓ Loaded prefix index")
+    
+    def on_transcription_edited(self):
+        """Người dùng sửa văn bản - khởi động lại các bộ đếm debounce, bỏ tìm kiếm chạy trước"""
+        if self.current_stage == 2:
+            self.suggest_timer.start()
+            if self.speculation and self.transcription_display.toPlainText().strip() != self.speculation['text']:
+                self.discard_speculative_search()
+            if SPECULATIVE_SEARCH:
+                self.speculation_timer.start()
+    
+    def update_suggestions(self):
+        """Cập nhật danh sách gợi ý (tra cứu nhị phân trong bộ nhớ, không chặn UI)"""
+        self.suggestion_list.clear()
+        suggestions = []
+        if self.prefix_index:
+            suggestions = self.prefix_index.suggest(
+                self.transcription_display.toPlainText(), SUGGEST_MAX_RESULTS
+            )
+        
+        icons = {'title': '📚', 'author': '✍️', 'keyword': '🔍'}
+        for text, kind, _ in suggestions:
+            self.suggestion_list.addItem(f"{icons.get(kind, '•')} {text}")
+        self.suggestion_list.setVisible(self.current_stage == 2 and bool(suggestions))
+    
+    def on_suggestion_clicked(self, item):
+        """Chọn gợi ý - thay văn bản tìm kiếm bằng nội dung gợi ý"""
+        text = item.text().split(" ", 1)[-1]
+        self.transcription_display.setPlainText(text)
+    
     def confirm_and_search(self):
         """Xác nhận văn bản và bắt đầu pipeline tìm kiếm"""
+        edited_text = self.transcription_display.toPlainText().strip()
+        if edited_text:
+            self.recorded_text = edited_text
         if not self.recorded_text:
             return
         
-        # Dừng tất cả workers trước khi bắt đầu pipeline
-        self.stop_all_workers()
+        # Văn bản không đổi: dùng lại tìm kiếm đã chạy trước, nếu không thì dừng tất cả workers
+        self.speculation_timer.stop()
+        speculation = self.speculation
+        if speculation is not None and speculation['text'] == self.recorded_text:
+            self.speculation = None
+        else:
+            speculation = None
+            self.stop_all_workers()
         
         self.update_ui_for_stage(3)
+        self.results_model.clear()
         self.result_output.setText("🔍 ĐANG KHỞI ĐỘNG PIPELINE TÌM KIẾM...\n\nVui lòng đợi...")
         
         # Hiển thị progress bar
@@ -756,20 +814,37 @@ class LibrarySearchApp(QMainWindow):
         self.progress_bar.setRange(0, 100)
         self.progress_bar.setValue(0)
         self.recording_timer.setVisible(False)
+        self.level_meter.setVisible(False)
         
         # Vô hiệu hóa buttons
         self.main_action_button.setEnabled(False)
         self.secondary_action_button.setEnabled(False)
         
-        # Bắt đầu pipeline worker
-        self.pipeline_worker = PipelineWorker(self.recorded_text)
-        self.pipeline_worker.progress_update.connect(self.on_pipeline_progress)
-        self.pipeline_worker.finished.connect(self.on_pipeline_finished)
-        self.pipeline_worker.error.connect(self.on_pipeline_error)
-        self.pipeline_worker.start()
+        if speculation is None:
+            # Gửi job tìm kiếm cho search_service
+            self.search_job = self.search_service.submit_search(self.recorded_text)
+            return
+        
+        # Hiển thị ngay phần tìm kiếm chạy trước đã xong, phần còn lại đến qua tín hiệu như bình thường
+        print("⚡ Using speculative search")
+        self.results_model.append_rows(speculation['rows'])
+        if speculation['progress']:
+            self.show_pipeline_progress(*speculation['progress'])
+        if speculation['outcome']:
+            show, args = speculation['outcome']
+            show(*args)
     
-    def on_pipeline_progress(self, message, percentage):
+    def on_pipeline_progress(self, job_id, message, percentage):
         """Cập nhật tiến trình pipeline"""
+        if not self._is_current_job('search_job', job_id):
+            return
+        if self.speculation is not None:
+            self.speculation['progress'] = (message, percentage)
+            return
+        self.show_pipeline_progress(message, percentage)
+    
+    def show_pipeline_progress(self, message, percentage):
+        """Hiển thị tiến trình pipeline"""
         self.recording_status.setText(message)
         self.progress_bar.setValue(percentage)
         
@@ -777,8 +852,27 @@ class LibrarySearchApp(QMainWindow):
         if percentage < 100:
             self.result_output.setText(f"{message}\n\n🔄 Tiến trình: {percentage}%")
     
-    def on_pipeline_finished(self, corrected_text, results):
+    def on_pipeline_rows(self, job_id, rows):
+        """Thêm một lô kết quả vào danh sách"""
+        if not self._is_current_job('search_job', job_id):
+            return
+        if self.speculation is not None:
+            self.speculation['rows'].extend(rows)
+        else:
+            self.results_model.append_rows(rows)
+    
+    def on_pipeline_finished(self, job_id, corrected_text, results, facets):
         """Hoàn thành pipeline"""
+        if not self._is_current_job('search_job', job_id):
+            return
+        self.search_job = None
+        if self.speculation is not None:
+            self.speculation['outcome'] = (self.show_pipeline_results, (corrected_text, results, facets))
+            return
+        self.show_pipeline_results(corrected_text, results, facets)
+    
+    def show_pipeline_results(self, corrected_text, results, facets=None):
+        """Hiển thị kết quả pipeline (kèm số lượng theo facet của các kết quả đang hiển thị)"""
         self.progress_bar.setVisible(False)
         self.status_frame.setVisible(False)
         
@@ -792,15 +886,50 @@ class LibrarySearchApp(QMainWindow):
         if corrected_text != self.recorded_text:
             result_text += f"✅ VĂN BẢN ĐÃ CHỈNH SỬA:\n   \"{corrected_text}\"\n\n"
         
-        result_text += f"📚 KẾT QUẢ TÌM KIẾM:\n\n{results}"
+        count = self.results_model.rowCount()
+        if count:
+            result_text += f"📚 TÌM THẤY {count} KẾT QUẢ (nhấn đúp vào một kết quả để xem tóm tắt và liên kết)"
+            facet_text = format_facets(facets or {})
+            if facet_text:
+                result_text += f"\n\n🏷️ PHÂN LOẠI {count} KẾT QUẢ:\n{facet_text}"
+        else:
+            result_text += f"📚 KẾT QUẢ TÌM KIẾM:\n\n{results}"
         
         self.result_output.setText(result_text)
         
+        if TTS_READ_RESULTS:
+            self.read_results_aloud(results)
+        
         # Log tối ưu
         print(f"✅ Pipeline completed successfully")
     
-    def on_pipeline_error(self, error_msg):
+    def read_results_aloud(self, results):
+        """Đọc kết quả thành tiếng (câu đầu phát ngay, các câu sau được tổng hợp trong khi đang phát)"""
+        try:
+            if self.result_reader is None:
+                from result_reader import create_result_reader
+                self.result_reader = create_result_reader()
+            self.result_reader.read(results)
+        except Exception as e:
+            print(f"⚠️ Không thể đọc kết quả: {e}")
+    
+    def stop_reading(self):
+        """Ngắt đọc kết quả (barge-in)"""
+        if self.result_reader:
+            self.result_reader.cancel()
+    
+    def on_pipeline_error(self, job_id, error_msg):
         """Xử lý lỗi pipeline"""
+        if not self._is_current_job('search_job', job_id):
+            return
+        self.search_job = None
+        if self.speculation is not None:
+            self.speculation['outcome'] = (self.show_pipeline_error, (error_msg,))
+            return
+        self.show_pipeline_error(error_msg)
+    
+    def show_pipeline_error(self, error_msg):
+        """Hiển thị lỗi pipeline theo loại lỗi"""
         self.progress_bar.setVisible(False)
         self.status_frame.setVisible(False)
         
@@ -849,12 +978,14 @@ class LibrarySearchApp(QMainWindow):
     
     def retry_recording(self):
         """Quay lại ghi âm"""
+        self.stop_reading()
         self.stop_all_workers()
         self.cleanup_temp_files()
         self.update_ui_for_stage(1)
     
     def start_new_search(self):
         """Bắt đầu tìm kiếm mới"""
+        self.stop_reading()
         self.stop_all_workers()
         self.cleanup_temp_files()
         self.update_ui_for_stage(1)
@@ -863,6 +994,7 @@ class LibrarySearchApp(QMainWindow):
         """Dọn dẹp các file tạm"""
         self.transcription_display.clear()
         self.result_output.clear()
+        self.results_model.clear()
         self.recorded_text = ""
         
         if self.temp_recording and os.path.exists(self.temp_recording):
@@ -873,26 +1005,50 @@ class LibrarySearchApp(QMainWindow):
             self.temp_recording = None
     
     def copy_results(self):
-        """Copy kết quả"""
-        if self.result_output.toPlainText():
-            QApplication.clipboard().setText(self.result_output.toPlainText())
+        """Copy kết quả (các dòng đang chọn, hoặc tất cả nếu không chọn dòng nào)"""
+        selected = [index.row() for index in self.result_list.selectionModel().selectedIndexes()]
+        if selected:
+            text = self.results_model.to_text(selected)
+        else:
+            text = self.result_output.toPlainText()
+            if self.results_model.rowCount():
+                text += "\n\n" + self.results_model.to_text()
+        if text:
+            QApplication.clipboard().setText(text)
             QMessageBox.information(self, "Đã copy", "Kết quả đã được copy vào clipboard!")
     
     def closeEvent(self, event):
         """Xử lý khi đóng ứng dụng"""
+        self.stop_reading()
         self.stop_all_workers()
         self.cleanup_temp_files()
+        if self.wake_word_listener:
+            self.wake_word_listener.stop()
+        self.search_service.close()
+        self.audio_session.close()
+        if self.result_reader:
+            from tts_utils import TTSManager
+            TTSManager.close()
+        get_archive_writer().close()
+        self.results_model.close()
         event.accept()
     
     def showEvent(self, event):
-        """Optimize khi hiển thị window"""
+        """Cửa sổ đã hiện: bắt đầu warm-up dịch vụ xử lý ở background (database, Whisper, OpenAI)"""
         super().showEvent(event)
-        # Pre-load imports để tăng tốc pipeline
-        try:
-            import search_processor
-            print("✓ Pre-loaded search_processor")
-        except:
-            pass
+        self.search_service.start()
+    
+    def on_warmup_progress(self, message, percentage):
+        """Hiển thị tiến trình warm-up khi đang chờ ở màn hình ghi âm (ghi âm vẫn dùng được ngay)"""
+        recording = self.recording_worker and self.recording_worker.isRunning()
+        if self.current_stage != 1 or recording or self.transcription_job is not None:
+            return
+        done = percentage >= 100
+        self.recording_status.setText(message)
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(percentage)
+        self.progress_bar.setVisible(not done)
+        self.status_frame.setVisible(not done)
     
     def keyPressEvent(self, event):
         """Keyboard shortcuts"""
@@ -0,0 +1,156 @@
+"""
+Module dịch offline câu yêu cầu tiếng Anh sang vốn từ tiếng Việt của catalog
+Dùng bảng cụm từ (domain_mapping + thuật ngữ chủ đề song ngữ) và cache LRU cho cả câu
+"""
+
+import logging
+import re
+import sqlite3
+import unicodedata
+from functools import lru_cache
+from config import DATABASE_PATH, TRANSLATION_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]+", re.UNICODE)
+
+# Cụm từ chung của câu yêu cầu - luôn có trong bảng (chuỗi rỗng = bỏ từ)
+GENERAL_PHRASES = {
+    'i': 'tôi', 'me': 'tôi', 'my': 'của tôi', 'you': 'bạn',
+    'want to': 'muốn', 'would like': 'muốn', 'looking for': 'tìm', 'look for': 'tìm',
+    'search for': 'tìm', 'find me': 'tìm cho tôi', 'show me': 'cho tôi xem',
+    'please': '', 'a': '', 'an': '', 'the': '', 'some': 'một số', 'any': '',
+    'about': 'về', 'of': 'của', 'on': 'về', 'for': 'cho', 'by': 'của', 'with': 'với', 'and': 'và', 'or': 'hoặc',
+    'in': 'trong', 'from': 'từ', 'to': '', 'is': 'là', 'are': 'là',
+    'written by': 'của tác giả', 'author': 'tác giả', 'published': 'xuất bản',
+    'published in': 'xuất bản năm', 'year': 'năm', 'new': 'mới', 'newest': 'mới nhất',
+    'latest': 'mới nhất', 'old': 'cũ', 'best': 'hay nhất', 'how many': 'bao nhiêu',
+    'available': 'còn', 'borrow': 'mượn', 'library': 'thư viện', 'textbook': 'giáo trình',
+    'textbooks': 'giáo trình', 'reference': 'tham khảo', 'department': 'khoa',
+    'faculty': 'khoa', 'subject': 'chủ đề', 'topic': 'chủ đề', 'price': 'giá',
+    'under': 'dưới', 'over': 'trên', 'cheap': 'giá rẻ',
+}
+
+# Thuật ngữ chủ đề song ngữ - chỉ dùng khi bản tiếng Việt có trong catalog
+SUBJECT_GLOSSARY = {
+    'architecture': 'kiến trúc', 'housing': 'nhà ở', 'rural': 'nông thôn', 'urban': 'đô thị',
+    'urban planning': 'quy hoạch đô thị', 'construction': 'xây dựng', 'environment': 'môi trường',
+    'flood': 'lũ lụt', 'floods': 'lũ lụt', 'landslide': 'sạt lở đất', 'tourism': 'du lịch',
+    'literature': 'văn học', 'art': 'nghệ thuật', 'arts': 'nghệ thuật', 'film': 'điện ảnh',
+    'cinema': 'điện ảnh', 'theater': 'sân khấu', 'theatre': 'sân khấu', 'screenwriting': 'biên kịch',
+    'screenplay': 'kịch bản', 'script': 'kịch bản', 'writing': 'viết', 'writing skills': 'kỹ năng viết',
+    'history': 'lịch sử', 'culture': 'văn hóa', 'economics': 'kinh tế', 'economy': 'kinh tế',
+    'business': 'kinh doanh', 'finance': 'tài chính', 'banking': 'ngân hàng', 'accounting': 'kế toán',
+    'marketing': 'marketing', 'management': 'quản lý', 'law': 'luật', 'medicine': 'y học',
+    'pharmacy': 'dược', 'nursing': 'điều dưỡng', 'mathematics': 'toán học', 'math': 'toán',
+    'physics': 'vật lý', 'chemistry': 'hóa học', 'biology': 'sinh học', 'science': 'khoa học',
+    'natural science': 'khoa học tự nhiên', 'social science': 'khoa học xã hội',
+    'computer science': 'khoa học máy tính', 'information technology': 'công nghệ thông tin',
+    'programming': 'lập trình', 'software': 'phần mềm', 'network': 'mạng', 'networks': 'mạng',
+    'database': 'cơ sở dữ liệu', 'databases': 'cơ sở dữ liệu', 'machine learning': 'học máy',
+    'artificial intelligence': 'trí tuệ nhân tạo', 'data science': 'khoa học dữ liệu',
+    'engineering': 'kỹ thuật', 'electrical': 'điện', 'electronics': 'điện tử',
+    'mechanical': 'cơ khí', 'language': 'ngôn ngữ', 'english': 'tiếng anh', 'vietnamese': 'tiếng việt',
+    'vietnam': 'việt nam', 'education': 'giáo dục', 'psychology': 'tâm lý học',
+    'philosophy': 'triết học', 'politics': 'chính trị', 'journalism': 'báo chí',
+    'design': 'thiết kế', 'graphic design': 'thiết kế đồ họa', 'music': 'âm nhạc',
+}
+
+
+def _normalize(text):
+    return unicodedata.normalize("NFC", text).lower()
+
+
+class OfflineTranslator:
+    """Dịch offline bằng bảng cụm từ, khớp cụm dài nhất trước"""
+
+    def __init__(self, phrase_table, cache_size=TRANSLATION_CACHE_SIZE):
+        """
+        Khởi tạo OfflineTranslator
+
+        Args:
+            phrase_table (dict): {cụm từ tiếng Anh: cụm từ tiếng Việt}
+            cache_size (int): Số câu dịch được ghi nhớ
+        """
+        self.phrase_table = {
+            " ".join(_normalize(phrase).split()): replacement
+            for phrase, replacement in phrase_table.items()
+        }
+        self.max_phrase_words = max((len(phrase.split()) for phrase in self.phrase_table), default=1)
+        self.translate = lru_cache(maxsize=cache_size)(self._translate)
+
+    def _translate(self, text):
+        """
+        Dịch một câu
+
+        Args:
+            text (str): Câu tiếng Anh
+
+        Returns:
+            tuple: (câu đã dịch, số từ chưa dịch được)
+        """
+        tokens = TOKEN_PATTERN.findall(text)
+        lowered = [_normalize(token) for token in tokens]
+        output = []
+        untranslated = 0
+        i = 0
+        while i < len(tokens):
+            for size in range(min(self.max_phrase_words, len(tokens) - i), 0, -1):
+                phrase = " ".join(lowered[i:i + size])
+                if phrase in self.phrase_table:
+                    if self.phrase_table[phrase]:
+                        output.append(self.phrase_table[phrase])
+                    i += size
+                    break
+            else:
+                if tokens[i][0].isalpha() and not tokens[i].isupper():
+                    untranslated += 1
+                output.append(tokens[i])
+                i += 1
+
+        translated = " ".join(output)
+        translated = re.sub(r"\s+([^\w\s])", r"\1", translated)
+        return translated, untranslated
+
+
+def catalog_vocabulary(database_path=None):
+    """
+    Tập văn bản chủ đề/từ khóa/khoa của catalog (chữ thường) để lọc thuật ngữ
+
+    Returns:
+        str: Văn bản gộp
+    """
+    conn = sqlite3.connect(database_path or DATABASE_PATH)
+    try:
+        rows = conn.execute("SELECT title, keywords, subject, department, document_type FROM books").fetchall()
+    finally:
+        conn.close()
+    return " ".join(_normalize(str(value)) for row in rows for value in row if value)
+
+
+def build_translator(domain_mapping=None, database_path=None):
+    """
+    Xây dựng bộ dịch offline từ domain_mapping và thuật ngữ có trong catalog
+
+    Args:
+        domain_mapping (dict): Bảng ánh xạ domain của SmartTextFilter
+        database_path (str): Đường dẫn database SQLite
+
+    Returns:
+        OfflineTranslator: Bộ dịch
+    """
+    table = dict(GENERAL_PHRASES)
+    try:
+        vocabulary = catalog_vocabulary(database_path)
+        glossary = {
+            english: vietnamese for english, vietnamese in SUBJECT_GLOSSARY.items()
+            if _normalize(vietnamese) in vocabulary
+        }
+    except Exception as e:
+        logger.warning(f"Không đọc được catalog cho glossary, dùng toàn bộ thuật ngữ: {e}")
+        glossary = dict(SUBJECT_GLOSSARY)
+
+    table.update(glossary)
+    table.update(domain_mapping or {})
+    logger.info(f"Đã xây dựng bảng dịch offline: {len(table)} cụm từ ({len(glossary)} thuật ngữ catalog)")
+    return OfflineTranslator(table)
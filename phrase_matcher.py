@@ -0,0 +1,155 @@
+"""
+Module so khớp nhiều cụm từ trong một lượt duyệt
+Gộp tất cả cụm từ (sửa lỗi giọng nói, từ tục tĩu, ánh xạ domain, từ khóa ngữ cảnh)
+vào một regex biên dịch sẵn, khớp cụm dài nhất tại mỗi vị trí
+"""
+
+import re
+import time
+
+
+class PhraseInfo:
+    """Thông tin gắn với một cụm từ"""
+
+    __slots__ = ("speech", "profanity", "domain", "tags")
+
+    def __init__(self):
+        self.speech = None      # Từ thay thế khi sửa lỗi nhận diện giọng nói
+        self.profanity = False  # Cụm từ tục tĩu
+        self.domain = None      # Từ thay thế khi ánh xạ domain thư viện
+        self.tags = set()       # Nhãn ngữ cảnh (verb, book, prep, place, intent, topic, kw:<từ khóa>)
+
+
+class PhraseMatcher:
+    """Automaton so khớp nhiều cụm từ (dựa trên regex gộp)"""
+
+    def __init__(self):
+        self.phrases = {}
+        self._regex = None
+
+    def _info(self, phrase):
+        key = " ".join(phrase.lower().split())
+        self._regex = None
+        return self.phrases.setdefault(key, PhraseInfo())
+
+    def add_speech_corrections(self, corrections):
+        """Thêm bảng sửa lỗi nhận diện giọng nói {từ sai: từ đúng}"""
+        for phrase, replacement in corrections.items():
+            self._info(phrase).speech = replacement
+
+    def add_profanity(self, phrases):
+        """Thêm danh sách cụm từ tục tĩu"""
+        for phrase in phrases:
+            if phrase and phrase.strip():
+                self._info(phrase).profanity = True
+
+    def add_domain_mapping(self, mapping):
+        """Thêm bảng ánh xạ domain {từ tiếng Anh: từ tiếng Việt}"""
+        for phrase, replacement in mapping.items():
+            self._info(phrase).domain = replacement
+
+    def add_tags(self, tag, phrases):
+        """Gắn nhãn ngữ cảnh cho các cụm từ"""
+        for phrase in phrases:
+            self._info(phrase).tags.add(tag)
+
+    def compile(self):
+        """Biên dịch tất cả cụm từ thành một regex (cụm dài hơn được ưu tiên)"""
+        alternatives = sorted(self.phrases, key=len, reverse=True)
+        body = "|".join(r"\s+".join(re.escape(word) for word in phrase.split()) for phrase in alternatives)
+        self._regex = re.compile(rf"(?<!\w)(?:{body})(?!\w)", re.IGNORECASE)
+        return self
+
+    def info_for(self, replacement):
+        """Thông tin của một từ (dùng cho từ thay thế sau khi sửa lỗi giọng nói)"""
+        return self.phrases.get(" ".join(replacement.lower().split()))
+
+    def segments(self, text):
+        """
+        Chia văn bản thành các đoạn trong một lượt duyệt
+
+        Args:
+            text (str): Văn bản đầu vào
+
+        Returns:
+            list: [(đoạn văn bản, PhraseInfo hoặc None), ...]
+        """
+        if self._regex is None:
+            self.compile()
+
+        segments = []
+        position = 0
+        for match in self._regex.finditer(text):
+            if match.start() > position:
+                segments.append((text[position:match.start()], None))
+            key = " ".join(match.group(0).lower().split())
+            segments.append((match.group(0), self.phrases.get(key)))
+            position = match.end()
+        if position < len(text):
+            segments.append((text[position:], None))
+        return segments
+
+
+def is_library_context(segments, info_for=None):
+    """
+    Kiểm tra ngữ cảnh thư viện từ các đoạn đã khớp (không cần duyệt lại văn bản)
+
+    Quy tắc tương đương library_patterns:
+    - động từ tìm kiếm ngay trước "book(s)", hoặc "book(s)" ngay trước giới từ
+    - có "library/thư viện/mượn/thuê/borrow"
+    - "want/need" xuất hiện trước "book/learn/study"
+    - hoặc có ít nhất 2 từ khóa thư viện khác nhau
+
+    Args:
+        segments (list): Kết quả PhraseMatcher.segments
+        info_for (callable): Lấy thông tin của từ thay thế (khi đoạn đã được sửa lỗi giọng nói)
+    """
+    previous_tags = set()
+    seen_intent = False
+    keywords = set()
+
+    for fragment, info in segments:
+        if info is None:
+            # Chỉ khoảng trắng giữ nguyên quan hệ "liền kề"
+            if fragment.strip():
+                previous_tags = set()
+            continue
+
+        tags = info.tags
+        if info.speech and info_for:
+            replacement = info_for(info.speech)
+            tags = replacement.tags if replacement else set()
+        if 'place' in tags:
+            return True
+        if 'book' in tags and 'verb' in previous_tags:
+            return True
+        if 'prep' in tags and 'book' in previous_tags:
+            return True
+        if 'topic' in tags and seen_intent:
+            return True
+        if 'intent' in tags:
+            seen_intent = True
+        keywords.update(tag for tag in tags if tag.startswith('kw:'))
+        previous_tags = tags
+
+    return len(keywords) >= 2
+
+
+def benchmark(func, texts, rounds=200):
+    """
+    Đo thông lượng xử lý
+
+    Args:
+        func (callable): Hàm xử lý một chuỗi
+        texts (list): Danh sách chuỗi mẫu
+        rounds (int): Số vòng lặp
+
+    Returns:
+        float: Số chuỗi xử lý mỗi giây
+    """
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            func(text)
+    elapsed = time.perf_counter() - started
+    return rounds * len(texts) / elapsed if elapsed else float("inf")
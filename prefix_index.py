@@ -0,0 +1,146 @@
+"""
+Module chỉ mục tiền tố cho gợi ý tìm kiếm khi đang gõ
+Dùng mảng đã sắp xếp + tìm kiếm nhị phân trên tiêu đề, tác giả và từ khóa
+"""
+
+import bisect
+import logging
+import re
+import sqlite3
+import unicodedata
+from config import DATABASE_PATH, SUGGEST_MAX_RESULTS
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def fold_text(text):
+    """
+    Chuẩn hóa văn bản để so khớp: chữ thường, bỏ dấu tiếng Việt, gộp khoảng trắng
+
+    Args:
+        text (str): Văn bản đầu vào
+
+    Returns:
+        str: Văn bản đã chuẩn hóa
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFD", str(text).lower()).replace("đ", "d")
+    text = "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+    return " ".join(WORD_PATTERN.findall(text))
+
+
+class PrefixIndex:
+    """Chỉ mục tiền tố trong bộ nhớ"""
+
+    def __init__(self):
+        self.keys = []
+        self.entries = []
+
+    @classmethod
+    def from_database(cls, database_path=None):
+        """
+        Xây dựng chỉ mục từ bảng books (mở kết nối riêng, an toàn khi gọi từ thread khác)
+
+        Args:
+            database_path (str): Đường dẫn database SQLite
+
+        Returns:
+            PrefixIndex: Chỉ mục đã xây dựng
+        """
+        return cls.from_databases([database_path])
+
+    @classmethod
+    def from_databases(cls, database_paths):
+        """
+        Xây dựng chỉ mục từ nhiều database (các shard catalog)
+
+        Args:
+            database_paths (list): Danh sách đường dẫn, None là DATABASE_PATH
+
+        Returns:
+            PrefixIndex: Chỉ mục đã xây dựng
+        """
+        rows = []
+        for database_path in database_paths:
+            conn = sqlite3.connect(database_path or DATABASE_PATH)
+            try:
+                rows.extend(conn.execute("SELECT id, title, author, keywords FROM books").fetchall())
+            finally:
+                conn.close()
+
+        index = cls()
+        index.build(rows)
+        logger.info(f"Đã xây dựng chỉ mục gợi ý: {len(index.keys)} mục")
+        return index
+
+    def build(self, rows):
+        """
+        Xây dựng chỉ mục từ các dòng (id, title, author, keywords)
+
+        Args:
+            rows (list): Danh sách tuple dữ liệu sách
+        """
+        pairs = []
+        for book_id, title, author, keywords in rows:
+            if title:
+                # Mỗi vị trí bắt đầu từ trong tiêu đề để khớp được giữa câu
+                folded = fold_text(title).split()
+                for start in range(len(folded)):
+                    pairs.append((" ".join(folded[start:]), (title, "title", book_id)))
+            for name in re.split(r"[,;]", author or ""):
+                if name.strip():
+                    pairs.append((fold_text(name), (name.strip(), "author", book_id)))
+            for keyword in re.split(r"[,;]", keywords or ""):
+                if keyword.strip():
+                    pairs.append((fold_text(keyword), (keyword.strip(), "keyword", book_id)))
+
+        pairs = [pair for pair in pairs if pair[0]]
+        pairs.sort(key=lambda pair: pair[0])
+        self.keys = [key for key, _ in pairs]
+        self.entries = [entry for _, entry in pairs]
+
+    def _lookup(self, prefix, limit, seen, results):
+        """Thêm các mục khớp tiền tố vào results"""
+        position = bisect.bisect_left(self.keys, prefix)
+        while position < len(self.keys) and len(results) < limit:
+            if not self.keys[position].startswith(prefix):
+                break
+            entry = self.entries[position]
+            if (entry[0], entry[1]) not in seen:
+                seen.add((entry[0], entry[1]))
+                results.append(entry)
+            position += 1
+
+    def suggest(self, text, limit=SUGGEST_MAX_RESULTS):
+        """
+        Lấy gợi ý cho văn bản đang gõ
+
+        Thử toàn bộ văn bản trước, sau đó bỏ dần các từ đầu câu
+        ("tìm sách lập tr" -> "sách lập tr" -> "lập tr") đến khi có kết quả.
+
+        Args:
+            text (str): Văn bản đang gõ
+            limit (int): Số gợi ý tối đa
+
+        Returns:
+            list: [(text, kind, book_id), ...]
+        """
+        words = fold_text(text).split()
+        if not words:
+            return []
+
+        # Giữ khoảng trắng cuối nếu người dùng đã gõ xong từ cuối
+        trailing = " " if text and text[-1].isspace() else ""
+        results = []
+        seen = set()
+        for start in range(len(words)):
+            prefix = " ".join(words[start:]) + trailing
+            if len(prefix.strip()) < 2:
+                break
+            self._lookup(prefix, limit, seen, results)
+            if results:
+                break
+        return results
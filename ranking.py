@@ -0,0 +1,234 @@
+"""
+Module xếp hạng kết quả tìm kiếm bằng BM25 nhiều trường
+Chấm điểm theo title, author, keywords, subject, summary và chọn top-k bằng heap giới hạn
+"""
+
+import heapq
+import logging
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from config import RANKING_FIELD_WEIGHTS, RANKING_BM25_K1, RANKING_BM25_B
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+LIMIT_PATTERN = re.compile(r"\s+LIMIT\s+(\d+)(\s+OFFSET\s+\d+)?\s*$", re.IGNORECASE)
+UNRANKABLE_PATTERN = re.compile(r"\b(ORDER|GROUP)\s+BY\b|\bCOUNT\s*\(|\bbook_facets\b", re.IGNORECASE)
+
+# Từ xuất hiện trong hầu hết câu yêu cầu, không mang nghĩa tìm kiếm
+QUERY_STOPWORDS = {
+    'tìm', 'kiếm', 'sách', 'cuốn', 'quyển', 'về', 'cho', 'tôi', 'mình', 'muốn',
+    'cần', 'có', 'không', 'những', 'các', 'của', 'và', 'là', 'một', 'nào',
+    'find', 'search', 'book', 'books', 'about', 'the', 'a', 'an', 'of', 'on', 'for',
+}
+
+
+def tokenize(text):
+    """
+    Tách văn bản thành các token chữ thường (giữ dấu tiếng Việt)
+
+    Args:
+        text (str): Văn bản đầu vào
+
+    Returns:
+        list: Danh sách token
+    """
+    if not text:
+        return []
+    text = unicodedata.normalize("NFC", str(text)).lower()
+    return TOKEN_PATTERN.findall(text)
+
+
+def split_limit(sql_query, default_limit):
+    """
+    Tách mệnh đề LIMIT cuối câu truy vấn
+
+    Args:
+        sql_query (str): SQL query
+        default_limit (int): Giới hạn mặc định khi không có LIMIT
+
+    Returns:
+        tuple: (câu truy vấn không có LIMIT, giá trị LIMIT), (None, None) nếu có OFFSET
+    """
+    sql = sql_query.strip().rstrip(";").strip()
+    match = LIMIT_PATTERN.search(sql)
+    if not match:
+        return sql, default_limit
+    if match.group(2):
+        return None, None  # Phân trang do người dùng chỉ định - giữ nguyên
+    return sql[:match.start()], int(match.group(1))
+
+
+def is_rankable_query(sql_query):
+    """Truy vấn có ORDER BY hoặc là truy vấn thống kê thì giữ nguyên thứ tự"""
+    return not UNRANKABLE_PATTERN.search(sql_query)
+
+
+def fill_top_keys(ranked, candidates, limit):
+    """
+    Lấy danh sách khóa top-k, bổ sung ứng viên không khớp term nào theo thứ tự gốc
+
+    Args:
+        ranked (list): Kết quả BM25Index.search
+        candidates (list): Khóa ứng viên theo thứ tự gốc
+        limit (int): Số kết quả cần lấy
+
+    Returns:
+        list: Danh sách khóa
+    """
+    top_keys = [key for _, key in ranked]
+    chosen = set(top_keys)
+    for key in candidates:
+        if len(top_keys) >= limit:
+            break
+        if key not in chosen:
+            top_keys.append(key)
+            chosen.add(key)
+    return top_keys
+
+
+class BM25Index:
+    """Chỉ mục BM25 nhiều trường trong bộ nhớ"""
+
+    def __init__(self, field_weights=None, k1=RANKING_BM25_K1, b=RANKING_BM25_B):
+        """
+        Khởi tạo BM25Index
+
+        Args:
+            field_weights (dict): Trọng số cho từng trường
+            k1 (float): Tham số bão hòa tần suất
+            b (float): Tham số chuẩn hóa độ dài
+        """
+        self.field_weights = dict(field_weights or RANKING_FIELD_WEIGHTS)
+        self.k1 = k1
+        self.b = b
+        self.doc_count = 0
+        self.postings = {field: defaultdict(dict) for field in self.field_weights}
+        self.doc_lengths = {field: {} for field in self.field_weights}
+        self.total_lengths = {field: 0 for field in self.field_weights}
+
+    def add_document(self, key, row):
+        """
+        Thêm một sách vào chỉ mục
+
+        Args:
+            key: Khóa định danh sách (id hoặc tuple)
+            row (dict): Dữ liệu sách
+        """
+        self.doc_count += 1
+        for field in self.field_weights:
+            tokens = tokenize(row.get(field))
+            self.doc_lengths[field][key] = len(tokens)
+            self.total_lengths[field] += len(tokens)
+
+            term_freqs = defaultdict(int)
+            for token in tokens:
+                term_freqs[token] += 1
+            for token, freq in term_freqs.items():
+                self.postings[field][token][key] = freq
+
+    @classmethod
+    def from_connection(cls, conn, key_func=None, **kwargs):
+        """
+        Xây dựng chỉ mục từ bảng books
+
+        Args:
+            conn (sqlite3.Connection): Kết nối database
+            key_func (callable): Hàm tạo khóa từ id, mặc định dùng id
+
+        Returns:
+            BM25Index: Chỉ mục đã xây dựng
+        """
+        index = cls(**kwargs)
+        index.add_connection(conn, key_func)
+        logger.info(f"Đã xây dựng chỉ mục BM25: {index.doc_count} sách")
+        return index
+
+    def add_connection(self, conn, key_func=None):
+        """
+        Thêm toàn bộ sách của một database vào chỉ mục
+
+        Args:
+            conn (sqlite3.Connection): Kết nối database
+            key_func (callable): Hàm tạo khóa từ id, mặc định dùng id
+        """
+        columns = ", ".join(["id"] + list(self.field_weights))
+        cursor = conn.execute(f"SELECT {columns} FROM books")
+        names = [description[0] for description in cursor.description]
+        for values in cursor:
+            row = dict(zip(names, values))
+            key = key_func(row["id"]) if key_func else row["id"]
+            self.add_document(key, row)
+
+    def _idf(self, field, term):
+        """Inverse document frequency của term trong một trường"""
+        doc_freq = len(self.postings[field].get(term, ()))
+        return math.log(1 + (self.doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    def _field_candidates(self, field, terms, candidates=None):
+        """
+        Chấm điểm BM25 trên một trường
+
+        Returns:
+            dict: {key: điểm đã nhân trọng số}
+        """
+        scores = defaultdict(float)
+        if not self.doc_count:
+            return scores
+
+        weight = self.field_weights[field]
+        avg_length = (self.total_lengths[field] / self.doc_count) or 1.0
+        lengths = self.doc_lengths[field]
+
+        for term in terms:
+            postings = self.postings[field].get(term)
+            if not postings:
+                continue
+            idf = self._idf(field, term)
+            for key, freq in postings.items():
+                if candidates is not None and key not in candidates:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * lengths[key] / avg_length)
+                scores[key] += weight * idf * freq * (self.k1 + 1) / (freq + norm)
+        return scores
+
+    def query_terms(self, query):
+        """Lấy các term dùng để chấm điểm (bỏ stopword nếu còn term khác)"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        content_terms = [term for term in terms if term not in QUERY_STOPWORDS]
+        return content_terms or terms
+
+    def search(self, query, k, candidates=None):
+        """
+        Tìm top-k sách theo BM25
+
+        Args:
+            query (str): Câu truy vấn
+            k (int): Số kết quả cần lấy
+            candidates (set): Tập khóa được phép, None để tìm toàn bộ
+
+        Returns:
+            list: [(score, key), ...] sắp xếp giảm dần
+        """
+        terms = self.query_terms(query)
+        if not terms or k <= 0:
+            return []
+
+        # Gộp danh sách ứng viên của từng trường
+        totals = defaultdict(float)
+        for field in self.field_weights:
+            for key, score in self._field_candidates(field, terms, candidates).items():
+                totals[key] += score
+
+        # Heap giới hạn k phần tử
+        heap = []
+        for order, (key, score) in enumerate(totals.items()):
+            entry = (score, -order, key)
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+        return [(score, key) for score, _, key in sorted(heap, reverse=True)]
@@ -0,0 +1,155 @@
+"""
+Module đọc kết quả tìm kiếm thành tiếng theo từng câu
+Tổng hợp câu N+1 trong khi câu N đang phát (producer/consumer), hủy ngay khi có tìm kiếm mới
+"""
+
+import re
+import queue
+import logging
+import threading
+from tts_cache import FIXED_PROMPTS
+from config import TTS_MAX_SENTENCE_CHARS, TTS_LOOKAHEAD
+
+logger = logging.getLogger(__name__)
+
+# Bỏ emoji, ký tự kẻ khung... chỉ giữ chữ, số và dấu câu đọc được
+SYMBOL_PATTERN = re.compile(r"[^\w\s,.;:!?%/()'\"-]", re.UNICODE)
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?;])\s+")
+CLAUSE_SPLIT = re.compile(r"(?<=,)\s+")
+
+
+def split_sentences(text, max_chars=TTS_MAX_SENTENCE_CHARS):
+    """
+    Tách văn bản kết quả đã format thành các câu đọc được
+
+    Bỏ dòng trống, dòng kẻ phân cách và các trường phụ (dòng bắt đầu bằng '•');
+    câu dài được chia tiếp tại dấu phẩy
+
+    Args:
+        text (str): Kết quả đã format
+        max_chars (int): Độ dài tối đa mỗi câu
+
+    Returns:
+        list: Các câu
+    """
+    sentences = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("•"):
+            continue
+        cleaned = " ".join(SYMBOL_PATTERN.sub(" ", line).split()).strip(" :-")
+        if not any(ch.isalnum() for ch in cleaned):
+            continue
+
+        for sentence in SENTENCE_SPLIT.split(cleaned):
+            if len(sentence) <= max_chars:
+                sentences.append(sentence)
+                continue
+            # Gộp các mệnh đề vào câu cho tới khi đủ dài
+            current = ""
+            for clause in CLAUSE_SPLIT.split(sentence):
+                if current and len(current) + len(clause) + 1 > max_chars:
+                    sentences.append(current)
+                    current = clause
+                else:
+                    current = f"{current} {clause}".strip()
+            if current:
+                sentences.append(current)
+    return sentences
+
+
+class ResultReader:
+    """Đọc văn bản theo từng câu: một thread tổng hợp trước, một thread phát"""
+
+    def __init__(self, synthesize, play, stop, lookahead=TTS_LOOKAHEAD):
+        """
+        Khởi tạo ResultReader
+
+        Args:
+            synthesize (callable): (text) -> âm thanh đã tổng hợp
+            play (callable): (audio, cancelled) -> phát và chờ xong; bỏ câu nếu cancelled đã được set
+                trước khi phát (câu đang phát được dừng bằng stop)
+            stop (callable): Dừng phát ngay
+            lookahead (int): Số câu được tổng hợp trước
+        """
+        self.synthesize = synthesize
+        self.play = play
+        self.stop = stop
+        self.lookahead = lookahead
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    def read(self, text, intro=True):
+        """
+        Đọc văn bản (hủy lần đọc trước nếu còn đang đọc)
+
+        Args:
+            text (str): Kết quả đã format
+            intro (bool): Mở đầu bằng câu giới thiệu đã tổng hợp sẵn (phát ngay, không chờ mạng)
+        """
+        sentences = split_sentences(text)
+        if intro:
+            sentences.insert(0, FIXED_PROMPTS["results_intro"])
+        if not sentences:
+            return
+
+        with self._lock:
+            self.cancel()
+            cancelled = threading.Event()
+            self._cancelled = cancelled
+
+        audio_queue = queue.Queue(maxsize=self.lookahead)
+        threading.Thread(target=self._produce, args=(sentences, audio_queue, cancelled), daemon=True).start()
+        threading.Thread(target=self._consume, args=(audio_queue, cancelled), daemon=True).start()
+
+    def cancel(self):
+        """Barge-in: dừng đọc ngay (gọi khi bắt đầu ghi âm/tìm kiếm mới)"""
+        if not self._cancelled.is_set():
+            self._cancelled.set()
+            try:
+                self.stop()
+            except Exception:
+                pass
+
+    def _put(self, audio_queue, item, cancelled):
+        while not cancelled.is_set():
+            try:
+                audio_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self, sentences, audio_queue, cancelled):
+        """Tổng hợp lần lượt các câu, tối đa `lookahead` câu đi trước câu đang phát"""
+        for sentence in sentences:
+            if cancelled.is_set():
+                return
+            try:
+                audio = self.synthesize(sentence)
+            except Exception as e:
+                logger.error(f"Lỗi tổng hợp câu '{sentence}': {e}")
+                continue
+            if not self._put(audio_queue, audio, cancelled):
+                return
+        self._put(audio_queue, None, cancelled)
+
+    def _consume(self, audio_queue, cancelled):
+        """Phát các câu theo thứ tự"""
+        while not cancelled.is_set():
+            try:
+                audio = audio_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if audio is None:
+                return
+            try:
+                self.play(audio, cancelled)
+            except Exception as e:
+                logger.error(f"Lỗi phát âm thanh: {e}")
+
+
+def create_result_reader():
+    """ResultReader dùng TTSManager (backend theo cấu hình + cache, phát qua thread phát dùng chung)"""
+    from tts_utils import TTSManager
+    return ResultReader(TTSManager.synthesize, TTSManager.play_audio, TTSManager.stop)
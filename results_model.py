@@ -0,0 +1,337 @@
+"""
+Module model danh sách kết quả cho QListView
+Chỉ các dòng đang hiển thị được format, dòng được thêm dần theo từng lô,
+các trường nặng (summary, url) chỉ được đọc từ database (ở thread nền) khi mở rộng một dòng
+"""
+
+import os
+import sqlite3
+import logging
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, pyqtSignal
+from config import DATABASE_PATH, CATALOG_SHARDS, RESULT_HEAVY_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# Thứ tự ưu tiên các trường khi hiển thị
+PRIORITY_FIELDS = [
+    ('title', '📚 Tiêu đề'),
+    ('author', '✍️ Tác giả'),
+    ('category', '📂 Thể loại'),
+    ('description', '📝 Mô tả'),
+    ('price', '💰 Giá'),
+    ('publication_year', '📅 Năm xuất bản'),
+    ('year', '📅 Năm xuất bản'),
+    ('isbn', '🔢 ISBN')
+]
+
+# Trường nặng: không gửi kèm kết quả, đọc lại theo id khi mở rộng dòng
+HEAVY_FIELDS = tuple(RESULT_HEAVY_FIELDS)
+HEAVY_LABELS = {
+    'summary': '📝 Tóm tắt',
+    'url': '🔗 Liên kết',
+}
+
+FACET_LABELS = {
+    'subject': '📂 Chủ đề',
+    'department': '🏫 Khoa',
+    'document_type': '📄 Loại tài liệu',
+    'publication_year': '📅 Năm xuất bản',
+    'storage_location': '📍 Vị trí',
+}
+
+ItemRole = Qt.ItemDataRole.UserRole + 1
+ExpandedRole = Qt.ItemDataRole.UserRole + 2
+
+
+def format_value(field, value):
+    """Format giá trị một trường để hiển thị"""
+    if field == 'price' and isinstance(value, (int, float)):
+        return f"{value:,.0f} VND"
+    return str(value)
+
+
+def format_item(item, number, details=None, hint=True):
+    """
+    Format một kết quả thành văn bản
+
+    Args:
+        item (dict): Kết quả (không gồm trường nặng)
+        number (int): Số thứ tự (bắt đầu từ 1)
+        details (dict): Các trường nặng đã tải (None nếu dòng đang thu gọn)
+        hint (bool): Thêm dòng hướng dẫn mở rộng khi dòng đang thu gọn
+
+    Returns:
+        str: Văn bản nhiều dòng
+    """
+    if not isinstance(item, dict):
+        return f"📖 Kết quả {number}: {item}"
+
+    lines = [f"📖 Kết quả {number}:"]
+    displayed_fields = [field for field, _ in PRIORITY_FIELDS]
+    for field, icon_label in PRIORITY_FIELDS:
+        if item.get(field):
+            lines.append(f"   {icon_label}: {format_value(field, item[field])}")
+    for key, value in item.items():
+        if key not in displayed_fields and key not in HEAVY_FIELDS and value:
+            lines.append(f"   • {key}: {value}")
+
+    if details is not None:
+        for field in HEAVY_FIELDS:
+            if details.get(field):
+                lines.append(f"   {HEAVY_LABELS[field]}: {details[field]}")
+    elif hint and has_details(item):
+        lines.append("   ▸ Nhấn đúp để xem tóm tắt và liên kết")
+    return "\n".join(lines)
+
+
+def has_details(item):
+    """Kết quả có trường nặng để tải khi mở rộng không"""
+    return isinstance(item, dict) and (item.get('id') is not None or any(item.get(f) for f in HEAVY_FIELDS))
+
+
+def strip_heavy_fields(results):
+    """
+    Bỏ các trường nặng khỏi kết quả trước khi gửi sang UI
+
+    Kết quả không có id (ví dụ truy vấn thống kê) giữ nguyên vì không đọc lại được
+
+    Args:
+        results (list): Danh sách dict kết quả
+
+    Returns:
+        list: Danh sách dict mới
+    """
+    stripped = []
+    for item in results:
+        if isinstance(item, dict) and item.get('id') is not None:
+            item = {key: value for key, value in item.items() if key not in HEAVY_FIELDS}
+        stripped.append(item)
+    return stripped
+
+
+def format_results(results):
+    """Format kết quả thành string đẹp và tối ưu"""
+    # Xử lý trường hợp results là tuple (success, data)
+    if isinstance(results, tuple) and len(results) == 2:
+        success, data = results
+        if not success:
+            return f"❌ Lỗi truy vấn: {data}"
+        results = data
+
+    if isinstance(results, list) and results:
+        return "\n\n".join(
+            format_item(item, i, hint=False) for i, item in enumerate(strip_heavy_fields(results), 1)
+        ) + "\n\n"
+    elif isinstance(results, list) and not results:
+        return "❌ Không tìm thấy kết quả nào phù hợp với yêu cầu tìm kiếm.\n\n💡 Gợi ý:\n• Thử từ khóa khác\n• Kiểm tra chính tả\n• Sử dụng từ khóa đơn giản hơn"
+    else:
+        return f"📄 Kết quả: {str(results)}"
+
+
+def format_facets(facets, max_values=3):
+    """
+    Format số lượng facet của trang kết quả (mỗi facet một dòng, các giá trị nhiều nhất)
+
+    Args:
+        facets (dict): {facet: [(value, count), ...]} (xem SearchProcessor.get_result_facets)
+        max_values (int): Số giá trị tối đa mỗi facet
+
+    Returns:
+        str: Văn bản nhiều dòng, rỗng nếu không có facet
+    """
+    lines = []
+    for field, label in FACET_LABELS.items():
+        values = facets.get(field)
+        if values:
+            shown = ", ".join(f"{value} ({count})" for value, count in values[:max_values])
+            more = f", +{len(values) - max_values}" if len(values) > max_values else ""
+            lines.append(f"   {label}: {shown}{more}")
+    return "\n".join(lines)
+
+
+class DetailLoader:
+    """Đọc trường nặng của một sách theo id (kết nối chỉ đọc, mở khi cần, dùng trên một thread)"""
+
+    def __init__(self, database_path=None, shard_paths=None):
+        """
+        Khởi tạo DetailLoader
+
+        Args:
+            database_path (str): Database khi không chia shard
+            shard_paths (list): File SQLite của các shard (tên shard là tên file, như CatalogShard)
+        """
+        shard_paths = list(shard_paths if shard_paths is not None else CATALOG_SHARDS)
+        self.paths = {os.path.splitext(os.path.basename(path))[0]: path for path in shard_paths}
+        self.default_path = shard_paths[0] if shard_paths else (database_path or DATABASE_PATH)
+        self.connections = {}
+
+    def _connection(self, shard=None):
+        path = self.paths.get(shard, self.default_path)
+        if path not in self.connections:
+            # as_uri() mã hóa các ký tự đặc biệt trong đường dẫn ('?', '#', '%', dấu cách...)
+            uri = pathlib.Path(path).absolute().as_uri() + "?mode=ro"
+            self.connections[path] = sqlite3.connect(uri, uri=True)
+        return self.connections[path]
+
+    def load(self, item):
+        """
+        Tải các trường nặng của một kết quả
+
+        Args:
+            item (dict): Kết quả (có 'id', và 'shard' nếu chia shard)
+
+        Returns:
+            dict: {field: value}
+        """
+        details = {field: item[field] for field in HEAVY_FIELDS if item.get(field)}
+        if details or item.get('id') is None:
+            return details
+        try:
+            row = self._connection(item.get('shard')).execute(
+                f"SELECT {', '.join(HEAVY_FIELDS)} FROM books WHERE id = ? LIMIT 1", (item['id'],)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Lỗi tải chi tiết sách {item['id']}: {e}")
+            return {}
+        return dict(zip(HEAVY_FIELDS, row)) if row else {}
+
+    def close(self):
+        for conn in self.connections.values():
+            conn.close()
+        self.connections.clear()
+
+
+class ResultListModel(QAbstractListModel):
+    """Model kết quả tìm kiếm: văn bản mỗi dòng được format khi view cần hiển thị dòng đó"""
+    details_loaded = pyqtSignal(int, int, dict)  # (lượt kết quả, row, trường nặng) từ thread tải
+
+    def __init__(self, loader=None, parent=None):
+        """
+        Khởi tạo ResultListModel
+
+        Args:
+            loader (DetailLoader): Bộ tải trường nặng, tạo khi mở rộng dòng đầu tiên
+            parent (QObject): Đối tượng cha
+        """
+        super().__init__(parent)
+        self.loader = loader
+        self.items = []
+        self.details = {}  # row -> trường nặng đã tải
+        self.expanded = set()
+        self.loading = set()  # row đang chờ tải trường nặng
+        self._texts = {}  # row -> văn bản đã format
+        # Một thread tải duy nhất: kết nối SQLite của DetailLoader chỉ dùng trên thread này
+        self._executor = None
+        self._generation = 0  # Tăng khi xóa kết quả, bỏ qua kết quả tải của lượt cũ
+        self.details_loaded.connect(self._on_details_loaded)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.ItemDataRole.DisplayRole:
+            text = self._texts.get(row)
+            if text is None:
+                text = format_item(self.items[row], row + 1, self._expanded_details(row))
+                if row in self.loading and row in self.expanded:
+                    text += "\n   ⏳ Đang tải tóm tắt và liên kết..."
+                self._texts[row] = text
+            return text
+        if role == ItemRole:
+            return self.items[row]
+        if role == ExpandedRole:
+            return row in self.expanded
+        return None
+
+    def append_rows(self, rows):
+        """Thêm một lô kết quả vào cuối danh sách"""
+        if not rows:
+            return
+        start = len(self.items)
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        self.items.extend(rows)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._generation += 1
+        self.items = []
+        self.details = {}
+        self.expanded = set()
+        self.loading = set()
+        self._texts = {}
+        self.endResetModel()
+
+    def toggle_expanded(self, index):
+        """Mở rộng/thu gọn một dòng; lần mở rộng đầu tiên mới tải trường nặng (ở thread nền)"""
+        row = index.row() if isinstance(index, QModelIndex) else index
+        if not 0 <= row < len(self.items) or not has_details(self.items[row]):
+            return
+        if row in self.expanded:
+            self.expanded.discard(row)
+        else:
+            if row not in self.details and row not in self.loading:
+                self._start_loading(row)
+            self.expanded.add(row)
+        self._refresh_row(row)
+
+    def _start_loading(self, row):
+        if self.loader is None:
+            self.loader = DetailLoader()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="detail-loader")
+        self.loading.add(row)
+        self._executor.submit(self._load, self._generation, row, self.items[row])
+
+    def _load(self, generation, row, item):
+        """Chạy trên thread tải; kết quả về UI qua tín hiệu (queued)"""
+        try:
+            details = self.loader.load(item)
+        except Exception as e:
+            logger.error(f"Lỗi tải chi tiết kết quả: {e}")
+            details = {}
+        self.details_loaded.emit(generation, row, details)
+
+    def _on_details_loaded(self, generation, row, details):
+        if generation != self._generation:
+            return
+        self.loading.discard(row)
+        self.details[row] = details
+        self._refresh_row(row)
+
+    def _refresh_row(self, row):
+        self._texts.pop(row, None)
+        model_index = self.index(row)
+        self.dataChanged.emit(model_index, model_index, [Qt.ItemDataRole.DisplayRole, ExpandedRole])
+
+    def to_text(self, rows=None):
+        """
+        Văn bản của các dòng (để copy)
+
+        Args:
+            rows (list): Chỉ số các dòng, None để lấy tất cả
+
+        Returns:
+            str: Văn bản
+        """
+        rows = range(len(self.items)) if rows is None else sorted(rows)
+        return "\n\n".join(format_item(self.items[row], row + 1, self._expanded_details(row), hint=False)
+                           for row in rows)
+
+    def _expanded_details(self, row):
+        return self.details.get(row, {}) if row in self.expanded else None
+
+    def close(self):
+        """Đóng kết nối của DetailLoader trên thread tải rồi dừng thread"""
+        if self._executor is not None:
+            if self.loader is not None:
+                self._executor.submit(self.loader.close)
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        elif self.loader is not None:
+            self.loader.close()
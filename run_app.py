@@ -4,11 +4,10 @@ Library Search Application Launcher
 """
 
 import sys
-import os
 import logging
+import importlib.util
 from PyQt6.QtWidgets import QApplication, QMessageBox
 from main_app import LibrarySearchApp
-from search_processor import SearchProcessor
 from config import LOG_LEVEL, LOG_FORMAT, WINDOW_TITLE
 
 def setup_logging():
@@ -23,7 +22,7 @@ def setup_logging():
     )
 
 def check_dependencies():
-    """Check if all required dependencies are available"""
+    """Check if all required dependencies are available (find_spec: không import torch/transformers)"""
     required_modules = [
         'PyQt6',
         'torch',
@@ -37,9 +36,7 @@ def check_dependencies():
     missing_modules = []
     
     for module in required_modules:
-        try:
-            __import__(module)
-        except ImportError:
+        if importlib.util.find_spec(module) is None:
             missing_modules.append(module)
     
     if missing_modules:
@@ -49,24 +46,25 @@ def check_dependencies():
     
     return True, "All dependencies are available"
 
-def test_connections():
-    """Test all system connections"""
-    try:
-        processor = SearchProcessor()
-        status = processor.test_connection()
-        processor.close()
-        
-        failed_connections = [name for name, success in status.items() if not success]
-        
-        if failed_connections:
-            warning_msg = f"Some connections failed: {', '.join(failed_connections)}\n"
-            warning_msg += "The app may have limited functionality."
-            return False, warning_msg
-        
-        return True, "All connections successful"
-        
-    except Exception as e:
-        return False, f"Connection test failed: {str(e)}"
+def report_connections(window, status):
+    """
+    Report connection status after the background warm-up (database, Whisper, OpenAI)
+    
+    Args:
+        window (LibrarySearchApp): Main window
+        status (dict): {connection name: success} from SearchProcessor.test_connection
+    """
+    logger = logging.getLogger(__name__)
+    failed_connections = [name for name, success in status.items() if not success]
+    
+    if not failed_connections:
+        logger.info("All connections successful")
+        return
+    
+    warning_msg = f"Some connections failed: {', '.join(failed_connections)}\n"
+    warning_msg += "The app may have limited functionality."
+    logger.warning(warning_msg)
+    QMessageBox.warning(window, "Connection Warning", warning_msg)
 
 def main():
     """Main application entry point"""
@@ -88,28 +86,11 @@ def main():
     app = QApplication(sys.argv)
     app.setApplicationName(WINDOW_TITLE)
     
-    # Test connections
-    conn_ok, conn_msg = test_connections()
-    if not conn_ok:
-        reply = QMessageBox.warning(
-            None,
-            "Connection Warning",
-            f"{conn_msg}\n\nDo you want to continue anyway?",
-            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
-            QMessageBox.StandardButton.Yes
-        )
-        
-        if reply == QMessageBox.StandardButton.No:
-            logger.info("User chose to exit due to connection issues")
-            sys.exit(0)
-        
-        logger.warning(conn_msg)
-    else:
-        logger.info("All connections successful")
-    
-    # Create and show main window
+    # Create and show main window right away; database, Whisper and the OpenAI check
+    # are warmed up in the background and connections are reported when ready
     try:
         window = LibrarySearchApp()
+        window.search_service.warmup_finished.connect(lambda status: report_connections(window, status))
         window.show()
         
         logger.info("Application window created and shown")
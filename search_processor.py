@@ -4,10 +4,10 @@ Kết hợp speech-to-text, text correction, SQL generation và database query
 """
 
 import os
+import json
+import time
 import sqlite3
-import torch
-import torchaudio
-from transformers import WhisperProcessor, WhisperForConditionalGeneration
+import hashlib
 import re
 import logging
 from config import (
@@ -16,8 +16,27 @@ from config import (
     WHISPER_MODEL_PATH,
     OPENAI_API_KEY,
     MAX_SEARCH_RESULTS,
+    SEARCH_TIMEOUT,
+    OPENAI_HEALTH_PATH,
+    OPENAI_HEALTH_TTL,
+    OPENAI_HEALTH_TIMEOUT,
+    CATALOG_SHARDS,
+    DATABASE_SCHEMA,
+    RESULT_HEAVY_FIELDS,
+    DIACRITIC_MIN_CONFIDENCE,
     LOG_LEVEL
 )
+from facets import ensure_facet_tables, get_facet_counts, facet_counts_for_results
+from ranking import BM25Index, split_limit, is_rankable_query, fill_top_keys
+from catalog_shards import ShardedCatalog
+from availability import (
+    ensure_availability_table, attach_availability, rewrite_availability_predicates,
+    set_availability, checkout, checkin
+)
+from diacritic_restorer import build_restorer, log_query
+from cancellation import (
+    CancelledError, NEVER_CANCELLED, interrupt_on_cancel, stopping_criteria, run_cancellable, abortable_http_client
+)
 
 # Try to import OpenAI, with fallback
 try:
@@ -32,10 +51,16 @@ except ImportError as e:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# SELECT * trên riêng bảng books (không JOIN) được đổi thành các cột hiển thị trong danh sách
+SELECT_ALL_PATTERN = re.compile(r"^\s*SELECT\s+(DISTINCT\s+)?\*\s+(?=FROM\s+books\b)", re.IGNORECASE)
+JOIN_PATTERN = re.compile(r"\bJOIN\b|\bFROM\s+books\s*(?:\w+\s*)?,", re.IGNORECASE)
+LIST_COLUMNS = [column for column in DATABASE_SCHEMA["columns"] if column not in RESULT_HEAVY_FIELDS]
+
 class SearchProcessor:
     """Lớp xử lý tìm kiếm sách thông minh"""
     
-    def __init__(self, database_path=None, model_path=None, openai_api_key=None):
+    def __init__(self, database_path=None, model_path=None, openai_api_key=None, shard_paths=None,
+                 load_model=True):
         """
         Khởi tạo SearchProcessor
         
@@ -43,34 +68,81 @@ class SearchProcessor:
             database_path (str): Đường dẫn đến database SQLite
             model_path (str): Đường dẫn đến Whisper model
             openai_api_key (str): API key cho OpenAI
+            shard_paths (list): Danh sách file SQLite của các shard catalog (thay cho database_path)
+            load_model (bool): Tải Whisper ngay; False để gọi init_whisper_model() sau (warm-up từng bước)
         """
         # Database connection
         self.database_path = database_path or DATABASE_PATH
+        self.shard_paths = list(shard_paths if shard_paths is not None else CATALOG_SHARDS)
         self.conn = None
-        self.init_database()
+        self.catalog = None
+        self.ranker = None
+        if self.shard_paths:
+            self.init_shards()
+        else:
+            self.init_database()
+            self.init_ranker()
         
         # Whisper model
         self.model_path = model_path or WHISPER_MODEL_PATH
         self.processor = None
         self.model = None
-        self.init_whisper_model()
+        if load_model:
+            self.init_whisper_model()
         
         # OpenAI client
         self.openai_api_key = openai_api_key or OPENAI_API_KEY
-        self.openai_client = OpenAI(api_key=self.openai_api_key)
+        # Lời gọi bị hủy được ngắt ngay (shutdown socket) qua abort thay vì chạy nốt tới timeout
+        http_client, self._abort_openai = abortable_http_client(timeout=SEARCH_TIMEOUT)
+        self.openai_client = OpenAI(api_key=self.openai_api_key, timeout=SEARCH_TIMEOUT, http_client=http_client)
+        
+        # Mô hình khôi phục dấu (xây dựng khi sửa câu lần đầu)
+        self._diacritic_restorer = None
+    
+    @property
+    def diacritic_restorer(self):
+        """Mô hình khôi phục dấu học từ catalog và log câu yêu cầu"""
+        if self._diacritic_restorer is None:
+            self._diacritic_restorer = build_restorer(self.shard_paths or [self.database_path])
+        return self._diacritic_restorer
     
     def init_database(self):
         """Khởi tạo kết nối database"""
         try:
             self.conn = sqlite3.connect(self.database_path, check_same_thread=False)
             logger.info(f"Đã kết nối database: {self.database_path}")
+            ensure_facet_tables(self.conn)
+            ensure_availability_table(self.conn)
         except Exception as e:
             logger.error(f"Lỗi kết nối database: {e}")
             self.conn = None
     
+    def init_shards(self):
+        """Khởi tạo catalog phân mảnh (mỗi shard một file SQLite)"""
+        try:
+            self.catalog = ShardedCatalog(self.shard_paths)
+            self.conn = self.catalog.primary_connection
+            logger.info(f"Đã kết nối {len(self.shard_paths)} shard catalog")
+        except Exception as e:
+            logger.error(f"Lỗi kết nối shard catalog: {e}")
+            self.catalog = None
+            self.conn = None
+    
+    def init_ranker(self):
+        """Khởi tạo chỉ mục BM25 để xếp hạng kết quả"""
+        try:
+            if self.conn:
+                self.ranker = BM25Index.from_connection(self.conn)
+        except Exception as e:
+            logger.error(f"Lỗi khởi tạo chỉ mục xếp hạng: {e}")
+            self.ranker = None
+    
     def init_whisper_model(self):
         """Khởi tạo Whisper model"""
         try:
+            # torch/transformers chỉ được import khi tải model (không làm chậm khởi động ứng dụng)
+            from transformers import WhisperProcessor, WhisperForConditionalGeneration
+            
             model_name = WHISPER_MODEL_NAME
             self.processor = WhisperProcessor.from_pretrained(model_name)
             
@@ -101,6 +173,8 @@ class SearchProcessor:
             torch.Tensor: Audio waveform đã được xử lý
         """
         try:
+            import torchaudio
+            
             waveform, sample_rate = torchaudio.load(audio_path)
             
             # Resample to 16kHz if needed
@@ -113,12 +187,13 @@ class SearchProcessor:
             logger.error(f"Lỗi load audio: {e}")
             return None
     
-    def transcribe_audio(self, audio_path):
+    def transcribe_audio(self, audio_path, token=None):
         """
         Chuyển đổi audio thành text sử dụng Whisper
         
         Args:
             audio_path (str): Đường dẫn đến file audio
+            token (CancellationToken): Token hủy, dừng vòng sinh token ngay khi bị hủy
             
         Returns:
             str: Text đã được chuyển đổi
@@ -126,6 +201,7 @@ class SearchProcessor:
         try:
             if not self.processor or not self.model:
                 return "Lỗi: Model chưa được khởi tạo"
+            import torch
             
             # Load audio
             audio = self.load_audio(audio_path)
@@ -136,8 +212,14 @@ class SearchProcessor:
             inputs = self.processor(audio, sampling_rate=16000, return_tensors="pt")
             
             # Generate transcription
+            token = token or NEVER_CANCELLED
+            token.raise_if_cancelled()
             with torch.no_grad():
-                predicted_ids = self.model.generate(inputs["input_features"])
+                predicted_ids = self.model.generate(
+                    inputs["input_features"],
+                    stopping_criteria=stopping_criteria(token)
+                )
+            token.raise_if_cancelled()
             
             # Decode
             transcription = self.processor.batch_decode(predicted_ids, skip_special_tokens=True)[0]
@@ -145,25 +227,42 @@ class SearchProcessor:
             logger.info(f"Transcription: {transcription}")
             return transcription.strip()
             
+        except CancelledError:
+            raise
         except Exception as e:
             logger.error(f"Lỗi transcribe audio: {e}")
             return f"Lỗi nhận diện: {str(e)}"
     
-    def correct_text(self, text):
+    def correct_text(self, text, token=None):
         """
-        Sửa lỗi chính tả và ngữ pháp sử dụng OpenAI
+        Sửa lỗi chính tả và ngữ pháp: khôi phục dấu bằng mô hình trên máy,
+        chỉ gọi OpenAI khi độ tin cậy của mô hình thấp
         
         Args:
             text (str): Văn bản cần sửa
+            token (CancellationToken): Token hủy, ngắt lời gọi OpenAI khi bị hủy
             
         Returns:
             str: Văn bản đã được sửa lỗi
         """
+        if not text or text.strip() == "":
+            return text
+        
+        restored = text
         try:
-            if not text or text.strip() == "":
-                return text
-            
-            response = self.openai_client.chat.completions.create(
+            restored, confidence = self.diacritic_restorer.restore(text)
+            if confidence >= DIACRITIC_MIN_CONFIDENCE:
+                logger.info(f"Text correction (local, {confidence:.2f}): '{text}' -> '{restored}'")
+                return restored
+            logger.info(f"Độ tin cậy khôi phục dấu thấp ({confidence:.2f}), dùng OpenAI")
+        except Exception as e:
+            logger.error(f"Lỗi khôi phục dấu: {e}")
+        
+        try:
+            response = run_cancellable(
+                token or NEVER_CANCELLED,
+                self.openai_client.chat.completions.create,
+                abort=self._abort_openai,
                 model="gpt-3.5-turbo",
                 messages=[
                     {
@@ -178,18 +277,22 @@ class SearchProcessor:
             
             corrected_text = response.choices[0].message.content.strip()
             logger.info(f"Text correction: '{text}' -> '{corrected_text}'")
+            log_query(corrected_text)
             return corrected_text
             
+        except CancelledError:
+            raise
         except Exception as e:
             logger.error(f"Lỗi correct text: {e}")
-            return text  # Trả về text gốc nếu có lỗi
+            return restored  # Trả về kết quả khôi phục dấu nếu có lỗi
     
-    def text_to_sql(self, text):
+    def text_to_sql(self, text, token=None):
         """
         Chuyển đổi văn bản thành SQL query sử dụng OpenAI
         
         Args:
             text (str): Văn bản yêu cầu tìm kiếm
+            token (CancellationToken): Token hủy, ngắt lời gọi OpenAI khi bị hủy
             
         Returns:
             str: SQL query
@@ -202,13 +305,21 @@ class SearchProcessor:
             
             Ví dụ về dữ liệu: [1, 'Quán văn 110 : chuyên đề văn học nghệ thuật', 'Nguyên Minh (ch.b)', 'Hội Nhà văn', 2024, '333 tr.', '21 cm.', 56245, 200000, '03 Quang Trung', 'Sách Tham Khảo', '10/10', 'quán văn', 'Văn học nghệ thuật', 'Bao gồm các bài viết...', 'https...']
             
+            Bảng tình trạng mượn/trả: book_availability (book_id, available, total) - JOIN với books.id khi cần lọc sách còn trong thư viện
+            Bảng thống kê tính sẵn: book_facets (facet, value, count)
+            Các facet: 'subject', 'department', 'document_type', 'publication_year' (nhóm 5 năm, ví dụ '2020-2024'), 'storage_location'
+            
             Lưu ý: 
             - Chỉ được phép trả lời SQL query
+            - Với câu hỏi đếm số lượng sách theo chủ đề, khoa, loại tài liệu, năm hoặc vị trí, dùng bảng book_facets thay vì GROUP BY trên books
             - Sử dụng LIKE '%keyword%' cho tìm kiếm từ khóa
             - Sử dụng LOWER() để không phân biệt hoa thường
             - Giới hạn kết quả bằng LIMIT {MAX_SEARCH_RESULTS}"""
             
-            response = self.openai_client.chat.completions.create(
+            response = run_cancellable(
+                token or NEVER_CANCELLED,
+                self.openai_client.chat.completions.create,
+                abort=self._abort_openai,
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -226,16 +337,20 @@ class SearchProcessor:
             logger.info(f"Generated SQL: {sql_query}")
             return sql_query
             
+        except CancelledError:
+            raise
         except Exception as e:
             logger.error(f"Lỗi text to SQL: {e}")
             return "SELECT * FROM books LIMIT 10;"  # Default query
     
-    def query_database(self, sql_query):
+    def query_database(self, sql_query, query_text=None, token=None):
         """
         Thực hiện truy vấn database
         
         Args:
             sql_query (str): SQL query
+            query_text (str): Văn bản yêu cầu, dùng để xếp hạng kết quả theo BM25
+            token (CancellationToken): Token hủy, ngắt truy vấn SQLite đang chạy khi bị hủy
             
         Returns:
             tuple: (success: bool, results: list hoặc error_message: str)
@@ -244,30 +359,189 @@ class SearchProcessor:
             if not self.conn:
                 return False, "Không có kết nối database"
             
-            cursor = self.conn.cursor()
-            cursor.execute(sql_query)
-            rows = cursor.fetchall()
+            # Cột books.availability chỉ là số lượng ban đầu, điều kiện lọc phải dùng bảng phụ
+            sql_query = rewrite_availability_predicates(sql_query)
+            sql_query = self._select_list_columns(sql_query)
+            connections = self.catalog.connections if self.catalog else [self.conn]
+            with interrupt_on_cancel(token or NEVER_CANCELLED, *connections):
+                if self.catalog:
+                    results = self.catalog.query(sql_query, query_text)
+                    logger.info(f"Sharded query returned {len(results)} results")
+                    return True, results
+            
+                if query_text and self.ranker:
+                    ranked = self._ranked_query(sql_query, query_text)
+                    if ranked is not None:
+                        attach_availability(self.conn, ranked)
+                        logger.info(f"Database query returned {len(ranked)} ranked results")
+                        return True, ranked
+            
+                cursor = self.conn.cursor()
+                cursor.execute(sql_query)
+                rows = cursor.fetchall()
+            
+                if len(rows) == 0:
+                    return True, []
             
-            if len(rows) == 0:
-                return True, []
+                # Get column names
+                column_names = [description[0] for description in cursor.description]
             
-            # Get column names
-            column_names = [description[0] for description in cursor.description]
+                # Convert to list of dictionaries
+                results = []
+                for row in rows:
+                    result_dict = dict(zip(column_names, row))
+                    results.append(result_dict)
             
-            # Convert to list of dictionaries
-            results = []
-            for row in rows:
-                result_dict = dict(zip(column_names, row))
-                results.append(result_dict)
+                # Ghép tình trạng mượn/trả hiện tại từ bảng phụ
+                attach_availability(self.conn, results)
             
-            logger.info(f"Database query returned {len(results)} results")
-            return True, results
+                logger.info(f"Database query returned {len(results)} results")
+                return True, results
             
+        except CancelledError:
+            raise
         except Exception as e:
             error_msg = f"Lỗi truy vấn database: {str(e)}"
             logger.error(error_msg)
             return False, error_msg
     
+    def _select_list_columns(self, sql_query):
+        """
+        Đổi SELECT * FROM books thành các cột của danh sách kết quả: trường nặng (summary, url)
+        không được đọc, chỉ tải theo id khi mở rộng một dòng (xem results_model.DetailLoader)
+        
+        Args:
+            sql_query (str): SQL query
+            
+        Returns:
+            str: SQL query đã viết lại (giữ nguyên nếu có JOIN)
+        """
+        if JOIN_PATTERN.search(sql_query):
+            return sql_query
+        return SELECT_ALL_PATTERN.sub(
+            lambda match: f"SELECT {match.group(1) or ''}{', '.join(LIST_COLUMNS)} ", sql_query, count=1
+        )
+    
+    def _ranked_query(self, sql_query, query_text):
+        """
+        Lấy tập ứng viên từ SQL, xếp hạng BM25 và chỉ đọc k dòng tốt nhất
+        
+        Args:
+            sql_query (str): SQL query do LLM tạo
+            query_text (str): Văn bản yêu cầu
+            
+        Returns:
+            list: Kết quả đã xếp hạng, None nếu không áp dụng được xếp hạng
+        """
+        if not is_rankable_query(sql_query):
+            return None
+        
+        inner_sql, limit = split_limit(sql_query, MAX_SEARCH_RESULTS)
+        if not inner_sql:
+            return None
+        
+        try:
+            candidate_ids = [row[0] for row in self.conn.execute(f"SELECT id FROM ({inner_sql})")]
+        except sqlite3.Error:
+            return None  # Truy vấn không có cột id
+        
+        if not candidate_ids:
+            return []
+        
+        ranked = self.ranker.search(query_text, limit, candidates=set(candidate_ids))
+        top_ids = fill_top_keys(ranked, candidate_ids, limit)
+        
+        placeholders = ", ".join("?" for _ in top_ids)
+        cursor = self.conn.execute(
+            f"SELECT * FROM ({inner_sql}) WHERE id IN ({placeholders})", top_ids
+        )
+        column_names = [description[0] for description in cursor.description]
+        rows_by_id = {}
+        for row in cursor.fetchall():
+            result_dict = dict(zip(column_names, row))
+            rows_by_id.setdefault(result_dict["id"], result_dict)
+        
+        return [rows_by_id[book_id] for book_id in top_ids if book_id in rows_by_id]
+    
+    def _run_availability(self, shard, func, *args):
+        """Chạy func(conn, *args) trên kết nối chứa bảng availability (theo shard nếu có, giữ khóa shard)"""
+        if self.catalog:
+            return self.catalog.run_on_shard(shard, func, *args)
+        return func(self.conn, *args)
+    
+    def update_availability(self, book_id, available, total=None, shard=None):
+        """
+        Cập nhật tình trạng sách (không ghi vào bảng books)
+        
+        Args:
+            book_id (int): Id sách
+            available (int): Số bản còn trong thư viện
+            total (int): Tổng số bản, None để giữ nguyên
+            shard (str): Tên shard chứa sách (khi dùng catalog phân mảnh)
+            
+        Returns:
+            bool: True nếu cập nhật thành công
+        """
+        try:
+            return self._run_availability(shard, set_availability, book_id, available, total)
+        except Exception as e:
+            logger.error(f"Lỗi cập nhật tình trạng sách: {e}")
+            return False
+    
+    def checkout_book(self, book_id, shard=None):
+        """Ghi nhận mượn sách, trả về False nếu sách đã hết"""
+        try:
+            return self._run_availability(shard, checkout, book_id)
+        except Exception as e:
+            logger.error(f"Lỗi ghi nhận mượn sách: {e}")
+            return False
+    
+    def return_book(self, book_id, shard=None):
+        """Ghi nhận trả sách"""
+        try:
+            return self._run_availability(shard, checkin, book_id)
+        except Exception as e:
+            logger.error(f"Lỗi ghi nhận trả sách: {e}")
+            return False
+    
+    def get_facet_counts(self, facet=None, limit=None):
+        """
+        Lấy số lượng sách theo facet trên toàn bộ catalog
+        
+        Args:
+            facet (str): Tên facet, None để lấy tất cả
+            limit (int): Số giá trị tối đa cho mỗi facet
+            
+        Returns:
+            dict: {facet: [(value, count), ...]}
+        """
+        try:
+            if self.catalog:
+                return self.catalog.get_facet_counts(facet, limit)
+            if not self.conn:
+                return {}
+            return get_facet_counts(self.conn, facet, limit)
+        except Exception as e:
+            logger.error(f"Lỗi đọc facet: {e}")
+            return {}
+    
+    def get_result_facets(self, results):
+        """
+        Tính facet cho tập kết quả hiện tại mà không cần truy vấn lại database
+        
+        Số lượng chỉ tính trên các dòng đã trả về (trang kết quả đã giới hạn bởi LIMIT),
+        không phải toàn bộ sách khớp điều kiện; số lượng trên cả catalog lấy từ get_facet_counts
+        
+        Args:
+            results (list): Danh sách kết quả từ query_database
+            
+        Returns:
+            dict: {facet: [(value, count), ...]}
+        """
+        if not isinstance(results, list):
+            return {}
+        return facet_counts_for_results(results)
+    
     def format_search_results(self, results):
         """
         Format kết quả tìm kiếm để hiển thị
@@ -302,30 +576,31 @@ class SearchProcessor:
         
         return formatted_text
     
-    def process_search_request(self, audio_path):
+    def process_search_request(self, audio_path, token=None):
         """
         Xử lý toàn bộ request tìm kiếm từ audio
         
         Args:
             audio_path (str): Đường dẫn đến file audio
+            token (CancellationToken): Token hủy, truyền xuống từng bước
             
         Returns:
             tuple: (transcribed_text: str, formatted_results: str)
         """
         try:
             # Step 1: Transcribe audio
-            transcribed_text = self.transcribe_audio(audio_path)
+            transcribed_text = self.transcribe_audio(audio_path, token=token)
             if "Lỗi" in transcribed_text:
                 return transcribed_text, "❌ Không thể xử lý audio"
             
             # Step 2: Correct text
-            corrected_text = self.correct_text(transcribed_text)
+            corrected_text = self.correct_text(transcribed_text, token=token)
             
             # Step 3: Convert to SQL
-            sql_query = self.text_to_sql(corrected_text)
+            sql_query = self.text_to_sql(corrected_text, token=token)
             
             # Step 4: Query database
-            success, results = self.query_database(sql_query)
+            success, results = self.query_database(sql_query, query_text=corrected_text, token=token)
             
             if not success:
                 return transcribed_text, f"❌ LỖI TÌM KIẾM:\n{results}"
@@ -335,6 +610,8 @@ class SearchProcessor:
             
             return transcribed_text, formatted_results
             
+        except CancelledError:
+            raise
         except Exception as e:
             error_msg = f"❌ LỖI XỬ LÝ: {str(e)}"
             logger.error(error_msg)
@@ -361,20 +638,51 @@ class SearchProcessor:
         status["whisper"] = self.processor is not None and self.model is not None
         
         # Test OpenAI
+        status["openai"] = self.check_openai()
+        
+        return status
+    
+    def check_openai(self):
+        """
+        Kiểm tra OpenAI bằng một lời gọi rẻ (liệt kê model, không tốn token)
+        
+        Kết quả thành công được lưu vào OPENAI_HEALTH_PATH theo hash của API key và dùng lại
+        trong OPENAI_HEALTH_TTL giây, nên các lần khởi động sau không cần gọi mạng
+        
+        Returns:
+            bool: OpenAI dùng được
+        """
+        if not self.openai_client or not self.openai_api_key:
+            return False
+        
+        key_hash = hashlib.sha256(self.openai_api_key.encode("utf-8")).hexdigest()[:16]
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": "test"}],
-                max_tokens=5
-            )
-            status["openai"] = True
-        except:
+            with open(OPENAI_HEALTH_PATH, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("key") == key_hash and time.time() - cached.get("checked_at", 0) < OPENAI_HEALTH_TTL:
+                return True
+        except (OSError, ValueError):
             pass
         
-        return status
+        try:
+            self.openai_client.with_options(timeout=OPENAI_HEALTH_TIMEOUT, max_retries=0).models.list()
+        except Exception as e:
+            logger.warning(f"OpenAI không phản hồi: {e}")
+            return False
+        
+        try:
+            with open(OPENAI_HEALTH_PATH, "w", encoding="utf-8") as f:
+                json.dump({"key": key_hash, "checked_at": time.time()}, f)
+        except OSError as e:
+            logger.error(f"Không thể lưu trạng thái OpenAI: {e}")
+        return True
     
     def close(self):
         """Đóng kết nối"""
+        if self.catalog:
+            self.catalog.close()
+            self.conn = None
+            logger.info("Đã đóng các shard catalog")
         if self.conn:
             self.conn.close()
             logger.info("Đã đóng kết nối database")
@@ -392,7 +700,7 @@ if __name__ == "__main__":
     test_text = "Tìm sách Python"
     corrected = processor.correct_text(test_text)
     sql = processor.text_to_sql(corrected)
-    success, results = processor.query_database(sql)
+    success, results = processor.query_database(sql, query_text=corrected)
     
     print(f"Original: {test_text}")
     print(f"Corrected: {corrected}")
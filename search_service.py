@@ -0,0 +1,313 @@
+"""
+Module dịch vụ xử lý tìm kiếm sống suốt vòng đời ứng dụng
+Một thread xử lý duy nhất sở hữu SearchProcessor (database, Whisper, OpenAI client) và nhận
+các job (nhận diện giọng nói, tìm kiếm) qua hàng đợi; mỗi lần tìm kiếm chỉ cần gửi job
+"""
+
+import queue
+import logging
+import itertools
+import threading
+from PyQt6.QtCore import QObject, pyqtSignal
+from cancellation import CancellationToken, CancelledError
+from results_model import format_results, strip_heavy_fields
+from config import RESULTS_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class SearchJob:
+    """Một job trong hàng đợi: id để UI nhận biết tín hiệu của job hiện tại, token để hủy"""
+
+    def __init__(self, job_id, kind, payload):
+        self.id = job_id
+        self.kind = kind
+        self.payload = payload
+        self.token = CancellationToken()
+
+
+class SearchService(QObject):
+    """Thread xử lý với hàng đợi job, SearchProcessor được khởi tạo một lần trên thread này"""
+    warmup_progress = pyqtSignal(str, int)
+    warmup_finished = pyqtSignal(dict)
+    progress_update = pyqtSignal(int, str, int)
+    rows_ready = pyqtSignal(int, list)
+    search_finished = pyqtSignal(int, str, str, dict)  # (job id, văn bản đã sửa, kết quả đã format, facet)
+    search_failed = pyqtSignal(int, str)
+    transcription_finished = pyqtSignal(int, str)
+    transcription_failed = pyqtSignal(int, str)
+
+    def __init__(self, processor_factory=None, parent=None):
+        """
+        Khởi tạo SearchService (thread xử lý chạy khi gọi start())
+
+        Args:
+            processor_factory (callable): () -> SearchProcessor chưa tải Whisper,
+                mặc định SearchProcessor(load_model=False)
+            parent (QObject): Đối tượng cha
+        """
+        super().__init__(parent)
+        self.processor_factory = processor_factory
+        self.processor = None
+        self.queue = queue.Queue()
+        self._ids = itertools.count(1)
+        self._jobs = {}  # id -> SearchJob đang chờ/đang chạy
+        self._lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, name="search-service", daemon=True)
+
+    def start(self):
+        """Chạy thread xử lý: warm-up (database, Whisper, OpenAI) rồi lần lượt xử lý các job"""
+        if self.thread.ident is None:
+            self.thread.start()
+
+    def submit_search(self, text):
+        """
+        Gửi job tìm kiếm (sửa văn bản -> SQL -> truy vấn -> format)
+
+        Returns:
+            int: Id job
+        """
+        return self._submit("search", text)
+
+    def submit_transcription(self, audio_path):
+        """
+        Gửi job nhận diện giọng nói từ file ghi âm
+
+        Returns:
+            int: Id job
+        """
+        return self._submit("transcribe", audio_path)
+
+    def _submit(self, kind, payload):
+        job = SearchJob(next(self._ids), kind, payload)
+        with self._lock:
+            self._jobs[job.id] = job
+        self.queue.put(job)
+        return job.id
+
+    def cancel(self, job_id):
+        """Hủy một job (không chặn); job chưa chạy sẽ bị bỏ qua"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job:
+            job.token.cancel()
+
+    def cancel_all(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.token.cancel()
+
+    def _run(self):
+        self._warm_up()
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            try:
+                if job.token.is_cancelled:
+                    continue
+                if job.kind == "search":
+                    self._run_search(job)
+                else:
+                    self._run_transcription(job)
+            except CancelledError:
+                print(f"⏹️ Job {job.id} ({job.kind}) cancelled")
+            except Exception as e:
+                logger.error(f"Lỗi job {job.id}: {e}")
+            finally:
+                with self._lock:
+                    self._jobs.pop(job.id, None)
+
+        if self.processor:
+            try:
+                self.processor.close()
+            except Exception:
+                pass
+
+    def _warm_up(self):
+        """
+        Khởi tạo SearchProcessor một lần, từng bước có báo tiến trình (chạy trước mọi job;
+        job gửi trong lúc warm-up chờ trong hàng đợi)
+        """
+        status = {"database": False, "whisper": False, "openai": False}
+        try:
+            self.warmup_progress.emit("📚 ĐANG MỞ CƠ SỞ DỮ LIỆU...", 10)
+            if self.processor_factory:
+                self.processor = self.processor_factory()
+            else:
+                from search_processor import SearchProcessor
+                self.processor = SearchProcessor(load_model=False)
+
+            if self.processor.model is None:
+                self.warmup_progress.emit("🧠 ĐANG TẢI MODEL NHẬN DIỆN GIỌNG NÓI...", 40)
+                self.processor.init_whisper_model()
+
+            self.warmup_progress.emit("🌐 ĐANG KIỂM TRA KẾT NỐI...", 80)
+            status = self.processor.test_connection()
+            print("✓ Search service ready")
+        except Exception as e:
+            logger.error(f"Lỗi khởi tạo SearchProcessor: {e}")
+            self.processor = None
+        self.warmup_progress.emit("🟢 Sẵn sàng ghi âm", 100)
+        self.warmup_finished.emit(status)
+
+    # ------------------------------------------------------------------
+    # Nhận diện giọng nói
+    # ------------------------------------------------------------------
+
+    def _run_transcription(self, job):
+        """Whisper trên file ghi âm; dùng Google (chạy song song các ngôn ngữ) khi Whisper không dùng được"""
+        try:
+            text = ""
+            if self.processor:
+                text = self.processor.transcribe_audio(job.payload, token=job.token)
+            if not text or text.startswith("Lỗi"):
+                from audio_workers import transcribe_google
+                text = transcribe_google(job.payload, token=job.token)
+            job.token.raise_if_cancelled()
+            self.transcription_finished.emit(job.id, text)
+        except CancelledError:
+            raise
+        except Exception as e:
+            self.transcription_failed.emit(job.id, f"Lỗi xử lý: {str(e)}")
+
+    # ------------------------------------------------------------------
+    # Tìm kiếm
+    # ------------------------------------------------------------------
+
+    def _run_search(self, job):
+        try:
+            print(f"🔄 Starting optimized pipeline: '{job.payload}'")
+            if self.processor is None:
+                raise Exception("Lỗi kết nối database: dịch vụ tìm kiếm chưa sẵn sàng")
+
+            # Pipeline steps với error handling tốt hơn
+            steps = [
+                (20, "🔍 CHỈNH SỬA VĂN BẢN...", self._correct_text),
+                (40, "⚙️ TẠO TRUY VẤN SQL...", self._generate_sql),
+                (60, "✅ KIỂM TRA TRUY VẤN...", self._validate_sql),
+                (80, "📚 TÌM KIẾM DATABASE...", self._query_database),
+                (90, "📝 FORMAT KẾT QUẢ...", self._format_results)
+            ]
+
+            context = {'processor': self.processor, 'text': job.payload, 'token': job.token, 'job_id': job.id}
+
+            for progress, message, step_func in steps:
+                job.token.raise_if_cancelled()
+                self.progress_update.emit(job.id, message, progress)
+                context = step_func(context)
+
+                if context.get('error'):
+                    raise Exception(context['error'])
+
+            # Hoàn thành
+            job.token.raise_if_cancelled()
+            self.progress_update.emit(job.id, "✅ HOÀN THÀNH!", 100)
+            self.search_finished.emit(
+                job.id,
+                context.get('corrected_text', job.payload),
+                context.get('formatted_results', 'Không có kết quả'),
+                context.get('facets', {})
+            )
+
+        except CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Pipeline error: {str(e)}")
+            self.search_failed.emit(job.id, str(e))
+
+    def _correct_text(self, context):
+        """Bước 1: Sửa văn bản"""
+        try:
+            corrected = context['processor'].correct_text(context['text'], token=context['token'])
+            context['corrected_text'] = corrected
+            print(f"✓ Text: '{context['text']}' → '{corrected}'")
+            return context
+        except CancelledError:
+            raise
+        except Exception as e:
+            context['error'] = f"Lỗi chỉnh sửa văn bản: {str(e)}"
+            return context
+
+    def _generate_sql(self, context):
+        """Bước 2: Tạo SQL"""
+        try:
+            sql = context['processor'].text_to_sql(context['corrected_text'], token=context['token'])
+            context['sql_query'] = sql
+            print(f"✓ SQL: {sql}")
+            return context
+        except CancelledError:
+            raise
+        except Exception as e:
+            context['error'] = f"Lỗi tạo truy vấn: {str(e)}"
+            return context
+
+    def _validate_sql(self, context):
+        """Bước 3: Kiểm tra SQL"""
+        sql = context.get('sql_query', '')
+        if not sql or not sql.strip():
+            context['error'] = "Không thể tạo câu truy vấn từ văn bản"
+        return context
+
+    def _query_database(self, context):
+        """Bước 4: Truy vấn database"""
+        try:
+            results = context['processor'].query_database(
+                context['sql_query'],
+                query_text=context.get('corrected_text', context['text']),
+                token=context['token']
+            )
+
+            # Định dạng lười: danh sách kết quả chỉ được chuyển thành chuỗi khi bật log debug
+            logger.debug("Raw results (%s): %s", type(results).__name__, results)
+
+            # Xử lý kết quả - có thể là tuple (success, data) hoặc chỉ là data
+            if isinstance(results, tuple) and len(results) == 2:
+                success, data = results
+                if success:
+                    context['results'] = data
+                    context['facets'] = context['processor'].get_result_facets(data)
+                    self._emit_rows(context, data)
+                    count = len(data) if isinstance(data, list) else 'N/A'
+                    print(f"✓ Found: {count} results")
+                else:
+                    context['error'] = f"Lỗi truy vấn database: {data}"
+            else:
+                # Trường hợp trả về trực tiếp data
+                context['results'] = results
+                count = len(results) if isinstance(results, list) else 'N/A'
+                print(f"✓ Found: {count} results")
+
+            return context
+        except CancelledError:
+            raise
+        except Exception as e:
+            context['error'] = f"Lỗi truy vấn database: {str(e)}"
+            return context
+
+    def _emit_rows(self, context, results):
+        """Gửi kết quả sang danh sách trên UI theo từng lô (không kèm trường nặng như summary, url)"""
+        if not isinstance(results, list):
+            return
+        rows = strip_heavy_fields(results)
+        for start in range(0, len(rows), RESULTS_BATCH_SIZE):
+            context['token'].raise_if_cancelled()
+            self.rows_ready.emit(context['job_id'], rows[start:start + RESULTS_BATCH_SIZE])
+
+    def _format_results(self, context):
+        """Bước 5: Format kết quả"""
+        try:
+            context['formatted_results'] = format_results(context['results'])
+            return context
+        except Exception as e:
+            context['error'] = f"Lỗi format kết quả: {str(e)}"
+            return context
+
+    def close(self, timeout=1.0):
+        """Hủy các job, dừng thread xử lý và đóng processor"""
+        self.cancel_all()
+        if self.thread.ident is None:
+            return
+        self.queue.put(None)
+        self.thread.join(timeout)
@@ -0,0 +1,413 @@
+"""
+Module gộp kết quả truy vấn từ nhiều shard catalog
+Câu truy vấn chạy trên từng shard rồi được gộp đúng ngữ nghĩa SQL: cộng COUNT/SUM, lấy MIN/MAX,
+tính lại AVG, gộp nhóm GROUP BY/DISTINCT, sắp xếp lại theo ORDER BY và áp lại LIMIT/OFFSET
+"""
+
+import re
+import functools
+import logging
+
+logger = logging.getLogger(__name__)
+
+SELECT_PATTERN = re.compile(r"\s*SELECT\s+(DISTINCT\s+|ALL\s+)?", re.IGNORECASE)
+FROM_PATTERN = re.compile(r"\bFROM\b", re.IGNORECASE)
+GROUP_PATTERN = re.compile(r"\bGROUP\s+BY\b", re.IGNORECASE)
+HAVING_PATTERN = re.compile(r"\bHAVING\b", re.IGNORECASE)
+ORDER_PATTERN = re.compile(r"\bORDER\s+BY\b", re.IGNORECASE)
+LIMIT_PATTERN = re.compile(r"\s+LIMIT\s+(\d+)(?:\s+OFFSET\s+(\d+)|\s*,\s*(\d+))?\s*$", re.IGNORECASE)
+COMPOUND_PATTERN = re.compile(r"\b(UNION|INTERSECT|EXCEPT)\b", re.IGNORECASE)
+AGGREGATE_PATTERN = re.compile(r"^(COUNT|SUM|TOTAL|MIN|MAX|AVG)\s*\((.*)\)$", re.IGNORECASE | re.DOTALL)
+AGGREGATE_CALL_PATTERN = re.compile(r"\b(COUNT|SUM|TOTAL|MIN|MAX|AVG|GROUP_CONCAT)\s*\(", re.IGNORECASE)
+ALIAS_PATTERN = re.compile(r"\s+AS\s+(\S+)$|(?<=[)\w])\s+([A-Za-z_]\w*)$", re.IGNORECASE)
+IDENTIFIER_PATTERN = re.compile(r"^(?:[A-Za-z_]\w*\.)?([A-Za-z_]\w*)$")
+TERM_PATTERN = re.compile(
+    r"(?:\s+COLLATE\s+(\w+))?(?:\s+(ASC|DESC))?(?:\s+NULLS\s+(FIRST|LAST))?$", re.IGNORECASE
+)
+# Từ khóa đứng cuối biểu thức, không phải alias viết tắt (CASE ... END)
+NOT_ALIASES = {"END", "ASC", "DESC", "NULL"}
+ORDER_COLUMN_PREFIX = "__order_"
+MASK = "\x00"
+
+
+def _mask(sql):
+    """
+    Che nội dung chuỗi và nội dung trong ngoặc (giữ nguyên độ dài)
+
+    Từ khóa tìm trên chuỗi đã che chỉ khớp ở cấp ngoài cùng của câu truy vấn
+    """
+    chars = list(sql)
+    depth = 0
+    quote = None
+    for i, ch in enumerate(sql):
+        if quote:
+            chars[i] = MASK
+            if ch == quote:
+                quote = None
+        elif ch in ("'", '"', "`"):
+            quote = ch
+            chars[i] = MASK
+        elif ch == "(":
+            if depth:
+                chars[i] = MASK
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth:
+                chars[i] = MASK
+        elif depth:
+            chars[i] = MASK
+    return "".join(chars)
+
+
+def _split_top_level(text):
+    """Tách theo dấu phẩy ở cấp ngoài cùng, trả về các đoạn đã strip"""
+    masked = _mask(text)
+    parts = []
+    start = 0
+    for i, ch in enumerate(masked):
+        if ch == ",":
+            parts.append(text[start:i].strip())
+            start = i + 1
+    parts.append(text[start:].strip())
+    return [part for part in parts if part]
+
+
+def _normalize(expression):
+    return " ".join(expression.split()).lower()
+
+
+def _unquote(name):
+    if len(name) >= 2 and name[0] == name[-1] and name[0] in ("'", '"', "`"):
+        return name[1:-1]
+    return name
+
+
+class SelectItem:
+    """Một biểu thức trong danh sách SELECT"""
+
+    def __init__(self, text):
+        masked = _mask(text)
+        match = ALIAS_PATTERN.search(masked)
+        self.alias = None
+        self.expression = text
+        if match and (match.group(2) or "").upper() not in NOT_ALIASES:
+            self.alias = _unquote(text[match.start(1 if match.group(1) else 2):].strip())
+            self.expression = text[:match.start()].strip()
+
+        self.star = self.expression == "*" or self.expression.endswith(".*")
+        aggregate = AGGREGATE_PATTERN.match(self.expression)
+        self.function = aggregate.group(1).upper() if aggregate else None
+        self.argument = aggregate.group(2).strip() if aggregate else None
+        # Hàm gộp lồng trong biểu thức khác (COUNT(*) * 2, GROUP_CONCAT...) không gộp lại được
+        self.unmergeable = bool(
+            (self.function and re.match(r"DISTINCT\b", self.argument, re.IGNORECASE))
+            or (not self.function and AGGREGATE_CALL_PATTERN.search(self.expression))
+        )
+
+        identifier = IDENTIFIER_PATTERN.match(self.expression)
+        # Tên cột SQLite trả về: alias, tên cột (bỏ tiền tố bảng) hoặc nguyên văn biểu thức
+        self.name = self.alias or (identifier.group(1) if identifier else self.expression)
+
+    def matches(self, expression):
+        """Biểu thức ORDER BY có trỏ tới cột này không"""
+        key = _normalize(expression)
+        if self.alias and key == self.alias.lower():
+            return True
+        return key == _normalize(self.expression)
+
+
+class OrderTerm:
+    """Một khóa sắp xếp ORDER BY"""
+
+    def __init__(self, text):
+        match = TERM_PATTERN.search(_mask(text))
+        self.expression = text[:match.start()].strip()
+        self.nocase = (match.group(1) or "").upper() == "NOCASE"
+        self.descending = (match.group(2) or "").upper() == "DESC"
+        nulls = (match.group(3) or "").upper()
+        # SQLite coi NULL nhỏ nhất: đứng đầu khi ASC, cuối khi DESC
+        self.nulls_first = nulls == "FIRST" if nulls else not self.descending
+        self.key = None  # Tên cột (dict) hoặc vị trí (tuple) dùng để so sánh
+
+
+def _sort_value(value, nocase):
+    """Khóa so sánh theo thứ tự của SQLite: NULL < số < chuỗi < blob"""
+    if isinstance(value, (int, float)):
+        return 1, value
+    if isinstance(value, str):
+        return 2, value.lower() if nocase else value
+    return 3, bytes(value)
+
+
+def _value(row, key):
+    return row.get(key) if isinstance(row, dict) else row[key]
+
+
+def _compare(terms, a, b):
+    for term in terms:
+        va, vb = _value(a, term.key), _value(b, term.key)
+        if va is None or vb is None:
+            if va is None and vb is None:
+                continue
+            first = -1 if term.nulls_first else 1
+            return first if va is None else -first
+        ka, kb = _sort_value(va, term.nocase), _sort_value(vb, term.nocase)
+        if ka != kb:
+            result = -1 if ka < kb else 1
+            return -result if term.descending else result
+    return 0
+
+
+def _combine(function, values):
+    """Gộp giá trị của một hàm gộp từ các shard"""
+    present = [value for value in values if value is not None]
+    if function == "COUNT":
+        return sum(present)
+    if function == "TOTAL":
+        return float(sum(present))
+    if not present:
+        return None
+    if function == "SUM":
+        return sum(present)
+    if function == "MIN":
+        return min(present, key=lambda value: _sort_value(value, False))
+    if function == "MAX":
+        return max(present, key=lambda value: _sort_value(value, False))
+    raise ValueError(function)
+
+
+class ShardQuery:
+    """Câu truy vấn đã phân tích: SQL chạy trên từng shard và cách gộp kết quả"""
+
+    def __init__(self, sql, distinct, items, from_clause, group_clause, order_terms, limit, offset):
+        self.sql = sql
+        self.distinct = distinct
+        self.items = items
+        self.from_clause = from_clause
+        self.group_clause = group_clause
+        self.order_terms = order_terms
+        self.limit = limit
+        self.offset = offset
+        self.aggregate = bool(distinct or group_clause or any(item.function for item in items))
+        self.hidden_columns = []
+        # Biểu thức GROUP BY không có trong SELECT vẫn phải là một phần của khóa nhóm khi gộp
+        group_terms = _split_top_level(GROUP_PATTERN.sub("", group_clause, count=1)) if group_clause else []
+        self.hidden_groups = [term for term in group_terms if not any(
+            item.matches(term) or item.name.lower() == term.lower() for item in items
+        )]
+        self.shard_sql = self._build_shard_sql()
+
+    @classmethod
+    def parse(cls, sql):
+        """
+        Phân tích một câu SELECT
+
+        Args:
+            sql (str): SQL query
+
+        Returns:
+            ShardQuery: None nếu câu truy vấn không gộp được (UNION, HAVING, COUNT(DISTINCT)...)
+        """
+        sql = sql.strip().rstrip(";").strip()
+        masked = _mask(sql)
+        select = SELECT_PATTERN.match(masked)
+        if not select or COMPOUND_PATTERN.search(masked):
+            return None
+        from_match = FROM_PATTERN.search(masked, select.end())
+        if not from_match or HAVING_PATTERN.search(masked, from_match.end()):
+            return None
+
+        limit = offset = None
+        end = len(sql)
+        limit_match = LIMIT_PATTERN.search(masked)
+        if limit_match:
+            end = limit_match.start()
+            if limit_match.group(3) is not None:  # LIMIT offset, count
+                offset, limit = int(limit_match.group(1)), int(limit_match.group(3))
+            else:
+                limit = int(limit_match.group(1))
+                offset = int(limit_match.group(2)) if limit_match.group(2) else None
+
+        order_match = ORDER_PATTERN.search(masked, from_match.end(), end)
+        order_terms = []
+        if order_match:
+            order_terms = [OrderTerm(term) for term in _split_top_level(sql[order_match.end():end])]
+            end = order_match.start()
+
+        group_match = GROUP_PATTERN.search(masked, from_match.end(), end)
+        group_clause = sql[group_match.start():end].strip() if group_match else ""
+        from_clause = sql[from_match.start():group_match.start() if group_match else end].strip()
+
+        items = [SelectItem(text) for text in _split_top_level(sql[select.end():from_match.start()])]
+        distinct = (select.group(1) or "").strip().upper() == "DISTINCT"
+        if not items or any(item.unmergeable for item in items):
+            return None
+
+        query = cls(sql, distinct, items, from_clause, group_clause, order_terms, limit, offset)
+        if query.aggregate and (any(item.star for item in items) or not query._resolve_aggregate_order()):
+            return None
+        return query
+
+    def _build_shard_sql(self):
+        if self.aggregate:
+            # AVG được tính lại từ SUM và COUNT của từng shard; ORDER BY/LIMIT áp sau khi gộp
+            columns = []
+            for item in self.items:
+                if item.function == "AVG":
+                    columns.append(f"SUM({item.argument}), COUNT({item.argument})")
+                else:
+                    columns.append(item.expression if item.alias is None else f"{item.expression} AS \"{item.alias}\"")
+            columns.extend(self.hidden_groups)
+            parts = [f"SELECT {'DISTINCT ' if self.distinct else ''}{', '.join(columns)}", self.from_clause]
+            if self.group_clause:
+                parts.append(self.group_clause)
+            return " ".join(parts)
+
+        select_list = [item.expression if item.alias is None else f"{item.expression} AS \"{item.alias}\""
+                       for item in self.items]
+        for i, term in enumerate(self.order_terms):
+            term.key = self._resolve_column(term.expression)
+            if term.key is None:
+                # Khóa sắp xếp không có trong kết quả: lấy thêm một cột ẩn, bỏ đi sau khi gộp
+                term.key = f"{ORDER_COLUMN_PREFIX}{i}"
+                self.hidden_columns.append(term.key)
+                select_list.append(f"{term.expression} AS \"{term.key}\"")
+
+        parts = [f"SELECT {', '.join(select_list)}", self.from_clause]
+        if self.order_terms:
+            order = ", ".join(self.sql_term(term) for term in self.order_terms)
+            parts.append(f"ORDER BY {order}")
+        if self.limit is not None:
+            # Mỗi shard trả đủ offset + limit dòng đầu để kết quả chung không thiếu dòng nào
+            parts.append(f"LIMIT {self.limit + (self.offset or 0)}")
+        return " ".join(parts)
+
+    @staticmethod
+    def sql_term(term):
+        text = term.expression
+        if term.nocase:
+            text += " COLLATE NOCASE"
+        text += " DESC" if term.descending else " ASC"
+        if term.nulls_first == term.descending:
+            text += " NULLS FIRST" if term.nulls_first else " NULLS LAST"
+        return text
+
+    def _resolve_column(self, expression):
+        """Tên cột trong kết quả (dict) của một biểu thức ORDER BY, None nếu không có"""
+        if expression.isdigit():
+            index = int(expression) - 1
+            if 0 <= index < len(self.items) and not self.items[index].star:
+                return self.items[index].name
+            return None
+        for item in self.items:
+            if not item.star and item.matches(expression):
+                return item.name
+        identifier = IDENTIFIER_PATTERN.match(expression)
+        if identifier and any(item.star for item in self.items):
+            return identifier.group(1)
+        return None
+
+    def _resolve_aggregate_order(self):
+        """Khóa ORDER BY của truy vấn gộp phải là một cột trong kết quả (vị trí trong tuple)"""
+        for term in self.order_terms:
+            if term.expression.isdigit():
+                index = int(term.expression) - 1
+                term.key = index if 0 <= index < len(self.items) else None
+            else:
+                term.key = next((i for i, item in enumerate(self.items) if item.matches(term.expression)), None)
+            if term.key is None:
+                return False
+        return True
+
+    def _page(self, rows):
+        start = self.offset or 0
+        return rows[start:start + self.limit] if self.limit is not None else rows[start:]
+
+    def merge_rows(self, per_shard):
+        """
+        Gộp kết quả dạng dòng (không có hàm gộp)
+
+        Args:
+            per_shard (list): Danh sách dict kết quả của từng shard
+
+        Returns:
+            list: Kết quả đã sắp xếp lại và áp LIMIT/OFFSET
+        """
+        rows = [row for rows in per_shard for row in rows]
+        if self.order_terms:
+            # sorted ổn định: dòng bằng nhau giữ thứ tự shard
+            rows.sort(key=functools.cmp_to_key(functools.partial(_compare, self.order_terms)))
+        rows = self._page(rows)
+        for row in rows:
+            for column in self.hidden_columns:
+                row.pop(column, None)
+        return rows
+
+    def merge_aggregates(self, per_shard):
+        """
+        Gộp kết quả của truy vấn có hàm gộp/GROUP BY/DISTINCT
+
+        Args:
+            per_shard (list): (column_names, rows) của từng shard
+
+        Returns:
+            tuple: (column_names, rows)
+        """
+        column_names = None
+        groups = {}
+        key_items = [i for i, item in enumerate(self.items) if not item.function]
+        grouped = bool(self.group_clause or self.distinct)
+
+        for names, rows in per_shard:
+            if column_names is None:
+                column_names = self._output_names(names)
+            for row in rows:
+                values, extra = self._split_row(row)
+                key = tuple(values[i] for i in key_items) + extra if grouped else ()
+                groups.setdefault(key, []).append(values)
+
+        merged = []
+        for parts in groups.values():
+            row = []
+            for i, item in enumerate(self.items):
+                column = [values[i] for values in parts]
+                if item.function == "AVG":
+                    sums = [value for value, _ in column if value is not None]
+                    count = sum(count for _, count in column)
+                    row.append(sum(sums) / count if count else None)
+                elif item.function:
+                    row.append(_combine(item.function, column))
+                else:
+                    row.append(next((value for value in column if value is not None), None))
+            merged.append(tuple(row))
+
+        if self.order_terms:
+            merged.sort(key=functools.cmp_to_key(functools.partial(_compare, self.order_terms)))
+        return column_names or [item.name for item in self.items], self._page(merged)
+
+    def _split_row(self, row):
+        """Tách dòng của shard thành giá trị theo từng cột SELECT (AVG chiếm hai cột) và cột nhóm ẩn"""
+        values = []
+        position = 0
+        for item in self.items:
+            if item.function == "AVG":
+                values.append((row[position], row[position + 1]))
+                position += 2
+            else:
+                values.append(row[position])
+                position += 1
+        return values, tuple(row[position:])
+
+    def _output_names(self, shard_names):
+        """Tên cột như khi chạy trên một database (giữ tên SQLite trả về, trừ cột AVG)"""
+        names = []
+        position = 0
+        for item in self.items:
+            if item.function == "AVG":
+                names.append(item.name)
+                position += 2
+            else:
+                names.append(shard_names[position])
+                position += 1
+        return names
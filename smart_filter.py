@@ -1,37 +1,73 @@
 from better_profanity import profanity
-from langdetect import detect, detect_langs
-from googletrans import Translator
 from textblob import TextBlob  # Thay đổi từ pyspellchecker sang textblob
 import re
+import threading
+import time
+import multiprocessing
+from itertools import islice
+import spell_index
+import lang_id
+import offline_translator
+from config import ONLINE_TRANSLATION_FALLBACK
+from phrase_matcher import PhraseMatcher, is_library_context, benchmark
+
+# Từ tục tĩu tiếng Việt
+VIETNAMESE_BAD_WORDS = [
+    'đồ chó', 'thằng chó', 'con chó', 'đồ khốn', 'thằng khốn',
+    'đồ ngu', 'thằng ngu', 'đồ đần', 'đồ ngốc', 'con điên',
+    'đồ điên', 'thằng điên', 'cút', 'mẹ kiếp', 'con mẹ'
+]
+
+# Regex dùng chung, biên dịch một lần khi import
+WHITESPACE_PATTERN = re.compile(r'\s+')
+NON_WORD_PATTERN = re.compile(r'[^\w]')
+
+# Các bước của clean_text được đo thời gian riêng
+CLEAN_STAGES = ('match', 'speech_profanity', 'language', 'spell', 'domain', 'normalize')
+
+# Bộ lọc từ tục tĩu của better_profanity là trạng thái toàn cục - chỉ nạp một lần
+_profanity_lock = threading.Lock()
+_profanity_loaded = False
+
+
+def _ensure_profanity_loaded():
+    """Nạp danh sách từ tục tĩu (lần gọi đầu tiên)"""
+    global _profanity_loaded
+    if _profanity_loaded:
+        return
+    with _profanity_lock:
+        if not _profanity_loaded:
+            profanity.load_censor_words()
+            profanity.add_censor_words(VIETNAMESE_BAD_WORDS)
+            _profanity_loaded = True
+
 
 class SmartTextFilter:
     """Bộ lọc văn bản thông minh sử dụng TextBlob"""
     
-    def __init__(self):
-        # Khởi tạo bộ lọc từ tục tĩu
-        profanity.load_censor_words()
+    def __init__(self, verbose=True):
+        """
+        Khởi tạo SmartTextFilter
         
-        # Thêm từ tục tĩu tiếng Việt
-        vietnamese_bad_words = [
-            'đồ chó', 'thằng chó', 'con chó', 'đồ khốn', 'thằng khốn',
-            'đồ ngu', 'thằng ngu', 'đồ đần', 'đồ ngốc', 'con điên',
-            'đồ điên', 'thằng điên', 'cút', 'mẹ kiếp', 'con mẹ'
-        ]
-        profanity.add_censor_words(vietnamese_bad_words)
+        Args:
+            verbose (bool): In log debug từng bước ra stdout
+        """
+        self.verbose = verbose
         
-        # Khởi tạo translator
-        self.translator = Translator()
+        # Tài nguyên nặng (translator, model TextBlob, danh sách từ tục tĩu) được tạo khi dùng lần đầu
+        self._resource_lock = threading.Lock()
+        self._translator = None
+        self._textblob_available = None
+        self._spell_index = None
+        self._spell_index_loaded = False
+        self._matcher = None
+        self._offline_translator = None
         
-        # Kiểm tra TextBlob
-        try:
-            # Test TextBlob
-            test_blob = TextBlob("test")
-            test_blob.correct()
-            print("[SMART FILTER] TextBlob initialized successfully ✓")
-            self.textblob_available = True
-        except Exception as e:
-            print(f"[SMART FILTER] TextBlob error: {e}")
-            self.textblob_available = False
+        # Thống kê thời gian xử lý mỗi lần gọi clean_text (bộ lọc dùng chung giữa các thread)
+        self._stats_lock = threading.Lock()
+        self.timing_stats = {'calls': 0, 'total_seconds': 0.0, 'max_seconds': 0.0}
+        # Tổng thời gian theo từng bước của clean_text
+        self.stage_seconds = dict.fromkeys(CLEAN_STAGES, 0.0)
         
         # Từ điển sửa lỗi nhận diện giọng nói (thêm trước khi spell check)
         self.speech_corrections = {
@@ -126,62 +162,239 @@ class SmartTextFilter:
             'techology': 'technology',
         }
     
+    @property
+    def translator(self):
+        """Translator online (googletrans) được tạo khi cần dịch lần đầu"""
+        if self._translator is None:
+            with self._resource_lock:
+                if self._translator is None:
+                    from googletrans import Translator
+                    self._translator = Translator()
+        return self._translator
+    
+    @property
+    def offline_translator(self):
+        """Bộ dịch offline từ domain_mapping và thuật ngữ của catalog"""
+        if self._offline_translator is None:
+            with self._resource_lock:
+                if self._offline_translator is None:
+                    self._offline_translator = offline_translator.build_translator(self.domain_mapping)
+        return self._offline_translator
+    
+    @property
+    def matcher(self):
+        """Automaton gộp mọi cụm từ cần xử lý, biên dịch một lần khi dùng lần đầu"""
+        if self._matcher is None:
+            with self._resource_lock:
+                if self._matcher is None:
+                    self._matcher = self._build_matcher()
+        return self._matcher
+    
+    def _build_matcher(self):
+        """Tạo automaton từ các từ điển của bộ lọc"""
+        matcher = PhraseMatcher()
+        matcher.add_speech_corrections(self.speech_corrections)
+        matcher.add_domain_mapping(self.domain_mapping)
+        
+        # Từ tục tĩu: tiếng Việt + danh sách của better_profanity
+        _ensure_profanity_loaded()
+        matcher.add_profanity(VIETNAMESE_BAD_WORDS)
+        try:
+            matcher.add_profanity(str(word) for word in profanity.CENSOR_WORDSET)
+        except Exception as e:
+            self._log(f"[SMART FILTER] Profanity word list error: {e}")
+        
+        # Nhãn ngữ cảnh thư viện (tương đương library_patterns)
+        matcher.add_tags('verb', ['find', 'search', 'look for'])
+        matcher.add_tags('book', ['book', 'books'])
+        matcher.add_tags('prep', ['about', 'on', 'for'])
+        matcher.add_tags('place', ['library', 'thư viện', 'borrow', 'mượn', 'thuê'])
+        matcher.add_tags('intent', ['want', 'need'])
+        matcher.add_tags('topic', ['book', 'learn', 'study'])
+        matcher.add_tags('kw:book', ['book', 'books'])
+        for keyword in ['library', 'sách', 'thư viện', 'tìm', 'find']:
+            matcher.add_tags(f'kw:{keyword}', [keyword])
+        
+        return matcher.compile()
+    
+    @property
+    def spell_index(self):
+        """Chỉ mục SymSpell từ vốn từ catalog (đọc từ file hoặc xây dựng khi dùng lần đầu)"""
+        if not self._spell_index_loaded:
+            with self._resource_lock:
+                if not self._spell_index_loaded:
+                    extra_words = (
+                        list(self.tech_keywords)
+                        + list(self.manual_corrections.values())
+                        + list(self.domain_mapping)
+                    )
+                    try:
+                        self._spell_index = spell_index.load_or_build(extra_words=extra_words)
+                        self._log(f"[SMART FILTER] Spell index ready: {len(self._spell_index.words)} words ✓")
+                    except Exception as e:
+                        self._log(f"[SMART FILTER] Spell index error: {e}")
+                        self._spell_index = None
+                    self._spell_index_loaded = True
+        return self._spell_index
+    
+    @property
+    def textblob_available(self):
+        """Kiểm tra TextBlob (nạp model chính tả) khi cần spell check lần đầu"""
+        if self._textblob_available is None:
+            with self._resource_lock:
+                if self._textblob_available is None:
+                    try:
+                        # Test TextBlob
+                        test_blob = TextBlob("test")
+                        test_blob.correct()
+                        self._log("[SMART FILTER] TextBlob initialized successfully ✓")
+                        self._textblob_available = True
+                    except Exception as e:
+                        self._log(f"[SMART FILTER] TextBlob error: {e}")
+                        self._textblob_available = False
+        return self._textblob_available
+    
+    def warm_up(self):
+        """Nạp sẵn automaton và chỉ mục chính tả (tránh độ trễ ở lần gọi clean_text đầu tiên)"""
+        self.matcher
+        self.spell_index
+        return self
+    
+    def _log(self, message):
+        """In log debug (chỉ khi verbose)"""
+        if self.verbose:
+            print(message)
+    
     def clean_text(self, text):
         """Làm sạch văn bản một cách thông minh"""
         if not text:
             return text
         
+        stages = dict.fromkeys(CLEAN_STAGES, 0.0)
+        started = time.perf_counter()
+        try:
+            return self._clean_text(text, stages)
+        finally:
+            self._record_timing(time.perf_counter() - started, stages)
+    
+    def _record_timing(self, elapsed, stages):
+        """Ghi nhận thời gian một lần gọi clean_text"""
+        with self._stats_lock:
+            stats = self.timing_stats
+            stats['calls'] += 1
+            stats['total_seconds'] += elapsed
+            stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+            for stage, seconds in stages.items():
+                self.stage_seconds[stage] += seconds
+    
+    def get_timing_stats(self):
+        """
+        Lấy thống kê thời gian xử lý
+        
+        Returns:
+            dict: calls, average_us, max_us, stages_us (thời gian trung bình mỗi bước)
+        """
+        with self._stats_lock:
+            calls = self.timing_stats['calls']
+            return {
+                'calls': calls,
+                'average_us': self.timing_stats['total_seconds'] / calls * 1e6 if calls else 0.0,
+                'max_us': self.timing_stats['max_seconds'] * 1e6,
+                'stages_us': {
+                    stage: seconds / calls * 1e6 if calls else 0.0
+                    for stage, seconds in self.stage_seconds.items()
+                },
+            }
+    
+    def _clean_text(self, text, stages):
+        """Các bước làm sạch văn bản (thời gian từng bước cộng vào stages)"""
         original_text = text
-        print(f"[SMART FILTER] Input: '{original_text}'")
+        self._log(f"[SMART FILTER] Input: '{original_text}'")
+        clock = time.perf_counter
         
-        # Bước 1: Sửa lỗi nhận diện giọng nói trước
-        cleaned_text = self._fix_speech_recognition(text)
-        print(f"[SMART FILTER] After speech fix: '{cleaned_text}'")
+        # Bước 1: Một lượt duyệt duy nhất tìm mọi cụm từ (giọng nói, tục tĩu, domain, ngữ cảnh)
+        started = clock()
+        segments = self.matcher.segments(text)
+        now = clock()
+        stages['match'] += now - started
         
-        # Bước 2: Phát hiện ngôn ngữ
-        detected_lang = self._detect_language(cleaned_text)
-        print(f"[SMART FILTER] Detected language: {detected_lang}")
+        # Bước 2: Sửa lỗi nhận diện giọng nói và lọc từ tục tĩu trên kết quả đã khớp
+        started = now
+        cleaned_text = self._render(segments, speech=True, profanity=True)
+        now = clock()
+        stages['speech_profanity'] += now - started
+        self._log(f"[SMART FILTER] After speech fix + profanity filter: '{cleaned_text}'")
         
-        # Bước 3: Lọc từ tục tĩu
-        cleaned_text = self._filter_profanity(cleaned_text)
-        print(f"[SMART FILTER] After profanity filter: '{cleaned_text}'")
+        # Bước 3: Phát hiện ngôn ngữ
+        started = now
+        detected_lang = self._detect_language(cleaned_text)
+        now = clock()
+        stages['language'] += now - started
+        self._log(f"[SMART FILTER] Detected language: {detected_lang}")
         
-        # Bước 4: Sửa lỗi chính tả nếu là tiếng Anh
         if detected_lang == 'en':
-            cleaned_text = self._spell_check_with_textblob(cleaned_text)
-            print(f"[SMART FILTER] After spell check: '{cleaned_text}'")
-        
-        # Bước 5: Ánh xạ domain-specific (chỉ khi chắc chắn)
-        if detected_lang == 'en' and self._is_library_context(cleaned_text):
-            cleaned_text = self._domain_mapping_func(cleaned_text)
-            print(f"[SMART FILTER] After domain mapping: '{cleaned_text}'")
+            # Bước 4: Sửa lỗi chính tả nếu là tiếng Anh
+            started = now
+            spelled_text = self._spell_check(cleaned_text)
+            self._log(f"[SMART FILTER] After spell check: '{spelled_text}'")
+            
+            # Chỉ duyệt lại khi spell check đã đổi từ (có thể tạo ra từ domain mới)
+            rescanned = spelled_text != cleaned_text
+            if rescanned:
+                segments = self.matcher.segments(spelled_text)
+            cleaned_text = spelled_text
+            now = clock()
+            stages['spell'] += now - started
+            
+            # Bước 5: Ánh xạ domain-specific (chỉ khi chắc chắn)
+            started = now
+            if is_library_context(segments, self.matcher.info_for):
+                cleaned_text = self._render(
+                    segments, speech=not rescanned, profanity=not rescanned, domain=True
+                )
+                self._log(f"[SMART FILTER] After domain mapping: '{cleaned_text}'")
+            now = clock()
+            stages['domain'] += now - started
         
         # Bước 6: Chuẩn hóa cuối
+        started = now
         final_text = self._normalize(cleaned_text)
-        print(f"[SMART FILTER] Final result: '{final_text}'")
+        stages['normalize'] += clock() - started
+        self._log(f"[SMART FILTER] Final result: '{final_text}'")
         
         return final_text
     
+    def _render(self, segments, speech=False, profanity=False, domain=False):
+        """
+        Ghép lại văn bản từ các đoạn đã khớp, áp dụng các phép thay thế được chọn
+        
+        Args:
+            segments (list): Kết quả PhraseMatcher.segments
+            speech (bool): Sửa lỗi nhận diện giọng nói
+            profanity (bool): Thay từ tục tĩu bằng '***'
+            domain (bool): Ánh xạ domain thư viện
+        """
+        parts = []
+        for fragment, info in segments:
+            if info is not None:
+                # Sửa lỗi giọng nói trước: 'sex' -> 'sách' như pipeline gốc (sửa rồi mới lọc tục tĩu)
+                if speech and info.speech:
+                    fragment = info.speech
+                elif profanity and info.profanity:
+                    fragment = '***'
+                elif domain and info.domain:
+                    fragment = info.domain
+            parts.append(fragment)
+        return ''.join(parts)
+    
     def _fix_speech_recognition(self, text):
         """Sửa lỗi nhận diện giọng nói phổ biến"""
-        words = text.split()
-        corrected_words = []
-        
-        for word in words:
-            word_lower = word.lower().strip('.,!?')
-            
-            # Sửa lỗi nhận diện giọng nói
-            if word_lower in self.speech_corrections:
-                corrected_words.append(self.speech_corrections[word_lower])
-            else:
-                corrected_words.append(word)
-        
-        return ' '.join(corrected_words)
+        return self._render(self.matcher.segments(text), speech=True)
     
     def _detect_language(self, text):
-        """Phát hiện ngôn ngữ"""
+        """Phát hiện ngôn ngữ (đường nhanh cục bộ, ghi nhớ theo chuỗi; langdetect khi không rõ)"""
         try:
-            return detect(text)
+            return lang_id.detect_language(text)
         except:
             # Fallback: kiểm tra theo từ khóa
             text_lower = text.lower()
@@ -190,13 +403,30 @@ class SmartTextFilter:
             return 'en' if english_count >= 1 else 'vi'
     
     def _filter_profanity(self, text):
-        """Lọc từ tục tĩu bằng thư viện"""
+        """Lọc từ tục tĩu (danh sách của better_profanity + tiếng Việt)"""
         try:
-            return profanity.censor(text, '***')
+            return self._render(self.matcher.segments(text), profanity=True)
         except Exception as e:
-            print(f"[SMART FILTER] Profanity filter error: {e}")
+            self._log(f"[SMART FILTER] Profanity filter error: {e}")
             return text
     
+    def _spell_check(self, text):
+        """Sửa lỗi chính tả cả câu bằng chỉ mục SymSpell, TextBlob làm dự phòng"""
+        index = self.spell_index
+        if index is None:
+            return self._spell_check_with_textblob(text)
+        
+        protected = {word for keyword in self.tech_keywords for word in keyword.split()}
+        # Không sửa ngược từ tiếng Việt có dấu (kể cả từ vừa được sửa lỗi giọng nói, vd 'cần' -> 'can')
+        protected.update(
+            spell_index.normalize_word(token) for token in spell_index.WORD_PATTERN.findall(text)
+            if not token.isascii()
+        )
+        corrected, changes = index.correct_text(text, protected=protected, overrides=self.manual_corrections)
+        for original, replacement in changes.items():
+            self._log(f"[SYMSPELL] '{original}' -> '{replacement}'")
+        return corrected
+    
     def _spell_check_with_textblob(self, text):
         """Sửa lỗi chính tả cho tiếng Anh bằng TextBlob"""
         words = text.split()
@@ -218,14 +448,14 @@ class SmartTextFilter:
             if word_lower in self.manual_corrections:
                 corrected = self.manual_corrections[word_lower]
                 corrected_words.append(self._preserve_case(word, corrected))
-                print(f"[MANUAL SPELL] '{word}' -> '{corrected}'")
+                self._log(f"[MANUAL SPELL] '{word}' -> '{corrected}'")
                 continue
             
             # Sử dụng TextBlob
             if self.textblob_available:
                 try:
                     # Tách dấu câu
-                    clean_word = re.sub(r'[^\w]', '', word)
+                    clean_word = NON_WORD_PATTERN.sub('', word)
                     if len(clean_word) > 2:  # Chỉ spell check từ dài hơn 2 ký tự
                         blob = TextBlob(clean_word.lower())
                         corrected = str(blob.correct())
@@ -239,14 +469,14 @@ class SmartTextFilter:
                                 final_corrected += word[-1]
                             
                             corrected_words.append(final_corrected)
-                            print(f"[TEXTBLOB] '{word}' -> '{final_corrected}'")
+                            self._log(f"[TEXTBLOB] '{word}' -> '{final_corrected}'")
                         else:
                             corrected_words.append(word)
                     else:
                         corrected_words.append(word)
                         
                 except Exception as e:
-                    print(f"[TEXTBLOB] Error with '{word}': {e}")
+                    self._log(f"[TEXTBLOB] Error with '{word}': {e}")
                     corrected_words.append(word)
             else:
                 corrected_words.append(word)
@@ -265,42 +495,16 @@ class SmartTextFilter:
     
     def _domain_mapping_func(self, text):
         """Ánh xạ từ theo domain thư viện"""
-        words = text.split()
-        mapped_words = []
-        
-        for word in words:
-            word_lower = word.lower().strip('.,!?')
-            
-            # Giữ nguyên từ kỹ thuật
-            if word_lower in self.tech_keywords:
-                mapped_words.append(word)
-            # Ánh xạ từ cơ bản
-            elif word_lower in self.domain_mapping:
-                mapped_words.append(self.domain_mapping[word_lower])
-            else:
-                mapped_words.append(word)
-        
-        return ' '.join(mapped_words)
+        return self._render(self.matcher.segments(text), domain=True)
     
     def _is_library_context(self, text):
         """Kiểm tra có phải ngữ cảnh thư viện không"""
-        text_lower = text.lower()
-        
-        # Kiểm tra các pattern thư viện
-        for pattern in self.library_patterns:
-            if re.search(pattern, text_lower):
-                return True
-        
-        # Kiểm tra từ khóa thư viện
-        library_keywords = ['book', 'library', 'sách', 'thư viện', 'tìm', 'find']
-        book_context_count = sum(1 for keyword in library_keywords if keyword in text_lower)
-        
-        return book_context_count >= 2  # Cần ít nhất 2 từ khóa để chắc chắn
+        return is_library_context(self.matcher.segments(text), self.matcher.info_for)
     
     def _normalize(self, text):
         """Chuẩn hóa văn bản cuối"""
         # Xóa khoảng trắng thừa
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = WHITESPACE_PATTERN.sub(' ', text).strip()
         
         # Viết hoa chữ cái đầu
         if text:
@@ -309,13 +513,19 @@ class SmartTextFilter:
         return text
     
     def translate_to_vietnamese(self, text):
-        """Dịch sang tiếng Việt (khi cần thiết)"""
+        """Dịch sang tiếng Việt (khi cần thiết) - offline, googletrans chỉ là tùy chọn dự phòng"""
         try:
             if self._detect_language(text) == 'en':
-                result = self.translator.translate(text, src='en', dest='vi')
-                return result.text
+                translated, untranslated = self.offline_translator.translate(text)
+                if untranslated and ONLINE_TRANSLATION_FALLBACK:
+                    try:
+                        result = self.translator.translate(text, src='en', dest='vi')
+                        return result.text
+                    except Exception as e:
+                        self._log(f"[TRANSLATOR] Online fallback error: {e}")
+                return translated
         except Exception as e:
-            print(f"[TRANSLATOR] Error: {e}")
+            self._log(f"[TRANSLATOR] Error: {e}")
             pass
         return text
     
@@ -325,6 +535,16 @@ class SmartTextFilter:
     
     def get_spelling_suggestions(self, word):
         """Lấy gợi ý spell check cho một từ"""
+        word_lower = word.lower()
+        if word_lower in self.manual_corrections:
+            return [self.manual_corrections[word_lower]]
+        
+        index = self.spell_index
+        if index is not None:
+            if word_lower in index.words:
+                return []
+            return index.suggestions(word_lower)
+        
         if self.textblob_available:
             try:
                 blob = TextBlob(word.lower())
@@ -341,11 +561,102 @@ class SmartTextFilter:
         
         return []
 
+# Instance dùng chung, tạo khi gọi lần đầu
+_shared_filter = None
+_shared_filter_lock = threading.Lock()
+
+
+def get_smart_filter():
+    """Lấy SmartTextFilter dùng chung (thread-safe, khởi tạo lười)"""
+    global _shared_filter
+    if _shared_filter is None:
+        with _shared_filter_lock:
+            if _shared_filter is None:
+                _shared_filter = SmartTextFilter(verbose=False)
+    return _shared_filter
+
+
 # Hàm tiện ích
 def clean_speech_text(text):
     """Hàm tiện ích để làm sạch văn bản"""
-    filter_instance = SmartTextFilter()
-    return filter_instance.clean_text(text)
+    return get_smart_filter().clean_text(text)
+
+
+# Bộ lọc riêng của mỗi process trong pool xử lý hàng loạt
+_worker_filter = None
+
+
+def _init_batch_worker():
+    """Khởi tạo bộ lọc im lặng và nạp sẵn tài nguyên trong process con"""
+    global _worker_filter
+    _worker_filter = SmartTextFilter(verbose=False).warm_up()
+
+
+def _clean_chunk(chunk):
+    """
+    Làm sạch một khối chuỗi trong process con
+    
+    Returns:
+        tuple: (danh sách kết quả, {bước: số giây}, tổng số giây)
+    """
+    worker = _worker_filter
+    worker.stage_seconds = dict.fromkeys(CLEAN_STAGES, 0.0)
+    started = time.perf_counter()
+    results = [worker.clean_text(text) for text in chunk]
+    return results, worker.stage_seconds, time.perf_counter() - started
+
+
+def _chunks(iterable, size):
+    """Chia iterable thành các list có tối đa `size` phần tử (không nạp hết vào bộ nhớ)"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def clean_batch(texts, processes=None, chunksize=256, timings=None):
+    """
+    Làm sạch hàng loạt chuỗi (ví dụ phát lại log câu yêu cầu) bằng pool process
+    
+    Chuỗi được gửi đi theo từng khối, kết quả trả về theo đúng thứ tự đầu vào
+    ngay khi từng khối xong; không in gì ra stdout.
+    
+    Args:
+        texts (iterable): Các chuỗi cần làm sạch (có thể là generator đọc từ file)
+        processes (int): Số process, mặc định bằng số core; 1 để chạy ngay trong process hiện tại
+        chunksize (int): Số chuỗi mỗi lần gửi cho process con
+        timings (dict): Nếu có, được cộng dồn 'calls', 'total_seconds' và số giây của từng bước
+    
+    Yields:
+        str: Văn bản đã làm sạch
+    """
+    processes = processes or multiprocessing.cpu_count()
+    if timings is not None:
+        timings.setdefault('calls', 0)
+        timings.setdefault('total_seconds', 0.0)
+        for stage in CLEAN_STAGES:
+            timings.setdefault(stage, 0.0)
+    
+    def collect(chunk_results):
+        for results, stage_seconds, elapsed in chunk_results:
+            if timings is not None:
+                timings['calls'] += len(results)
+                timings['total_seconds'] += elapsed
+                for stage, seconds in stage_seconds.items():
+                    timings[stage] += seconds
+            yield from results
+    
+    if processes == 1:
+        _init_batch_worker()
+        yield from collect(map(_clean_chunk, _chunks(texts, chunksize)))
+        return
+    
+    # Xây dựng/lưu chỉ mục chính tả một lần trước, để các process con chỉ cần đọc file
+    SmartTextFilter(verbose=False).warm_up()
+    with multiprocessing.Pool(processes, initializer=_init_batch_worker) as pool:
+        yield from collect(pool.imap(_clean_chunk, _chunks(texts, chunksize)))
 
 # Test
 if __name__ == "__main__":
@@ -376,4 +687,24 @@ if __name__ == "__main__":
         print(f"Output: '{result}'")
         print(f"Language: {filter_obj._detect_language(test)}")
         print(f"Appropriate: {filter_obj.is_appropriate(test)}")
-        print()
\ No newline at end of file
+        print()
+    stats = filter_obj.get_timing_stats()
+    print(f"Timing: {stats['calls']} calls, avg {stats['average_us']:.1f} µs, max {stats['max_us']:.1f} µs")
+    print("Stages: " + ", ".join(f"{stage} {us:.1f} µs" for stage, us in stats['stages_us'].items()))
+    
+    # Benchmark thông lượng (tắt log debug khi đo)
+    import contextlib
+    import io
+    with contextlib.redirect_stdout(io.StringIO()):
+        matcher_rate = benchmark(filter_obj.matcher.segments, test_cases)
+        clean_rate = benchmark(filter_obj.clean_text, test_cases, rounds=20)
+    print(f"Matcher throughput: {matcher_rate:,.0f} strings/s")
+    print(f"clean_text throughput: {clean_rate:,.0f} strings/s")
+    
+    # Xử lý hàng loạt bằng pool process
+    batch_texts = test_cases * 2000
+    batch_timings = {}
+    started = time.perf_counter()
+    batch_results = list(clean_batch(batch_texts, timings=batch_timings))
+    elapsed = time.perf_counter() - started
+    print(f"clean_batch throughput: {len(batch_results) / elapsed:,.0f} strings/s")
@@ -0,0 +1,178 @@
+"""
+Module chạy song song nhiều bộ nhận diện giọng nói (backend × ngôn ngữ) với một hạn chót chung
+Lấy kết quả đủ tin cậy đầu tiên theo thứ tự ưu tiên, hủy các tác vụ còn lại
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from cancellation import NEVER_CANCELLED
+from config import SPEECH_RACE_DEADLINE, SPEECH_MIN_CONFIDENCE, SPEECH_LANGUAGES
+
+logger = logging.getLogger(__name__)
+
+
+class RecognizerBackend:
+    """Giao diện backend nhận diện: recognize(audio, language) -> (text, confidence)"""
+
+    name = "backend"
+
+    def recognize(self, audio, language):
+        """
+        Nhận diện một đoạn âm thanh
+
+        Args:
+            audio: Dữ liệu âm thanh (speech_recognition.AudioData)
+            language (str): Mã ngôn ngữ, ví dụ 'vi-VN'
+
+        Returns:
+            tuple: (text, confidence) - confidence trong [0, 1]; text rỗng nếu không nhận diện được
+        """
+        raise NotImplementedError
+
+
+class GoogleBackend(RecognizerBackend):
+    """Google Web Speech API qua speech_recognition"""
+
+    name = "google"
+
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+
+    def recognize(self, audio, language):
+        # show_all=True trả về cả độ tin cậy thay vì chỉ transcript
+        response = self.recognizer.recognize_google(audio, language=language, show_all=True)
+        if not response or not response.get("alternative"):
+            return "", 0.0
+        best = response["alternative"][0]
+        # Google chỉ trả confidence cho kết quả cuối; thiếu thì coi như đủ tin cậy
+        return best.get("transcript", ""), float(best.get("confidence", 1.0))
+
+
+class CallableBackend(RecognizerBackend):
+    """Bọc một hàm (audio, language) -> (text, confidence), dùng cho backend cục bộ hoặc khi test"""
+
+    def __init__(self, name, func):
+        self.name = name
+        self.func = func
+
+    def recognize(self, audio, language):
+        return self.func(audio, language)
+
+
+class SpeechRace:
+    """Chạy song song các cặp (backend, ngôn ngữ), trả kết quả tốt nhất trước hạn chót"""
+
+    def __init__(self, backends, languages=None, deadline=SPEECH_RACE_DEADLINE,
+                 min_confidence=SPEECH_MIN_CONFIDENCE, max_workers=None):
+        """
+        Khởi tạo SpeechRace
+
+        Args:
+            backends (list): Các RecognizerBackend theo thứ tự ưu tiên
+            languages (list): Các mã ngôn ngữ theo thứ tự ưu tiên
+            deadline (float): Thời gian chờ tối đa (giây) cho cả cuộc đua
+            min_confidence (float): Độ tin cậy tối thiểu để chấp nhận ngay
+            max_workers (int): Số thread, mặc định bằng số tác vụ
+        """
+        self.backends = list(backends)
+        self.languages = list(languages or SPEECH_LANGUAGES)
+        self.deadline = deadline
+        self.min_confidence = min_confidence
+        tasks = len(self.backends) * len(self.languages)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or tasks or 1, thread_name_prefix="speech-race")
+
+    def _attempt(self, backend, language, audio, cancelled):
+        if cancelled.is_set():
+            return "", 0.0
+        started = time.perf_counter()
+        text, confidence = backend.recognize(audio, language)
+        logger.info(
+            f"[{backend.name}/{language}] {time.perf_counter() - started:.2f}s "
+            f"conf={confidence:.2f}: '{text}'"
+        )
+        return (text or "").strip(), confidence
+
+    def run(self, audio, token=None):
+        """
+        Chạy cuộc đua
+
+        Kết quả đủ tin cậy được chấp nhận ngay khi mọi tác vụ ưu tiên cao hơn đã xong
+        (thất bại hoặc kém tin cậy hơn), nên tiếng Việt vẫn được ưu tiên nhưng không phải chờ tuần tự
+
+        Args:
+            audio: Dữ liệu âm thanh
+            token (CancellationToken): Token hủy, dừng chờ ngay khi bị hủy
+
+        Returns:
+            tuple: (text, confidence, 'backend/language'), text rỗng nếu không có kết quả
+
+        Raises:
+            CancelledError: Nếu token bị hủy
+        """
+        token = token or NEVER_CANCELLED
+        cancelled = threading.Event()
+        # Thứ tự ưu tiên: ngôn ngữ trước, rồi backend
+        tasks = [(backend, language) for language in self.languages for backend in self.backends]
+        futures = {
+            self.executor.submit(self._attempt, backend, language, audio, cancelled): priority
+            for priority, (backend, language) in enumerate(tasks)
+        }
+
+        results = {}
+        pending = set(futures)
+        deadline = time.monotonic() + self.deadline
+        # Future hoàn thành khi token bị hủy, để wait() trả về ngay
+        woken = Future()
+        with token.on_cancel(lambda: woken.set_result(None)):
+            try:
+                while pending:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        logger.warning("Hết thời gian chờ nhận diện giọng nói")
+                        break
+                    done, pending = wait(pending | {woken}, timeout=remaining, return_when=FIRST_COMPLETED)
+                    pending.discard(woken)
+                    token.raise_if_cancelled()
+                    for future in done - {woken}:
+                        priority = futures[future]
+                        try:
+                            results[priority] = future.result()
+                        except Exception as e:
+                            backend, language = tasks[priority]
+                            logger.info(f"[{backend.name}/{language}] lỗi: {e}")
+                            results[priority] = ("", 0.0)
+
+                    winner = self._confident_winner(results, len(tasks))
+                    if winner is not None:
+                        text, confidence = results[winner]
+                        backend, language = tasks[winner]
+                        return text, confidence, f"{backend.name}/{language}"
+            finally:
+                # Hủy các tác vụ chưa chạy; tác vụ đang gọi mạng sẽ bị bỏ qua kết quả
+                cancelled.set()
+                for future in pending:
+                    future.cancel()
+
+        # Không có kết quả đủ tin cậy: lấy kết quả tốt nhất đã có
+        candidates = [(confidence, -priority) for priority, (text, confidence) in results.items() if text]
+        if not candidates:
+            return "", 0.0, ""
+        _, negative_priority = max(candidates)
+        text, confidence = results[-negative_priority]
+        backend, language = tasks[-negative_priority]
+        return text, confidence, f"{backend.name}/{language}"
+
+    def _confident_winner(self, results, task_count):
+        """Tác vụ ưu tiên cao nhất có kết quả đủ tin cậy, nếu mọi tác vụ đứng trước đã xong"""
+        for priority in range(task_count):
+            if priority not in results:
+                return None
+            text, confidence = results[priority]
+            if text and confidence >= self.min_confidence:
+                return priority
+        return None
+
+    def close(self):
+        self.executor.shutdown(wait=False)
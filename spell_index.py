@@ -0,0 +1,319 @@
+"""
+Module sửa lỗi chính tả kiểu SymSpell (symmetric delete)
+Từ điển được xây dựng từ vốn từ của catalog sách (tiếng Việt + tiếng Anh) và lưu ra file
+"""
+
+import os
+import pickle
+import logging
+import re
+import sqlite3
+import hashlib
+import unicodedata
+from collections import Counter
+from config import DATABASE_PATH, SPELL_INDEX_PATH, SPELL_MAX_EDIT_DISTANCE, SPELL_PREFIX_LENGTH
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+TOKEN_PATTERN = re.compile(r"(\w+)", re.UNICODE)
+LOOKUP_CACHE_SIZE = 10000
+
+# Từ tiếng Anh thông dụng trong câu yêu cầu - không được "sửa" thành từ của catalog
+COMMON_ENGLISH_WORDS = """
+a an the and or of on in at to for from with about by as is are was were be been
+i you he she we they me my your our their it this that these those what which who
+how where when why find search look looking want need get give show tell help
+book books library read learn study about new old best good some any all more most
+please can could would should will do does did have has had not no yes like
+beginner beginners advanced introduction guide tutorial reference practice
+""".split()
+
+
+def normalize_word(word):
+    """Chuẩn hóa từ: chữ thường, dạng Unicode NFC"""
+    return unicodedata.normalize("NFC", word).lower()
+
+
+def edit_distance(source, target, max_distance):
+    """
+    Khoảng cách Damerau-Levenshtein (optimal string alignment), dừng sớm khi vượt ngưỡng
+
+    Returns:
+        int: Khoảng cách, hoặc max_distance + 1 nếu vượt ngưỡng
+    """
+    if abs(len(source) - len(target)) > max_distance:
+        return max_distance + 1
+
+    previous_previous = None
+    previous = list(range(len(target) + 1))
+    for i in range(1, len(source) + 1):
+        current = [i] + [0] * len(target)
+        row_min = current[0]
+        for j in range(1, len(target) + 1):
+            cost = 0 if source[i - 1] == target[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and source[i - 1] == target[j - 2] and source[i - 2] == target[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+            row_min = min(row_min, current[j])
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class SymSpellIndex:
+    """Chỉ mục symmetric delete để tra cứu từ gần đúng"""
+
+    def __init__(self, max_edit_distance=SPELL_MAX_EDIT_DISTANCE, prefix_length=SPELL_PREFIX_LENGTH):
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.words = {}
+        self.deletes = {}
+        self.signature = None
+        self._cache = {}
+
+    def _edits(self, word, distance, results):
+        """Sinh tất cả chuỗi xóa tối đa `distance` ký tự"""
+        if distance >= self.max_edit_distance or len(word) <= 1:
+            return results
+        for i in range(len(word)):
+            deleted = word[:i] + word[i + 1:]
+            if deleted not in results:
+                results.add(deleted)
+                self._edits(deleted, distance + 1, results)
+        return results
+
+    def _deletes_of(self, word):
+        prefix = word[:self.prefix_length]
+        return self._edits(prefix, 0, {prefix})
+
+    def build(self, vocabulary):
+        """
+        Xây dựng chỉ mục từ vốn từ
+
+        Args:
+            vocabulary (dict): {từ: tần suất}
+        """
+        self.words = {}
+        self.deletes = {}
+        self._cache = {}
+        for word, frequency in vocabulary.items():
+            word = normalize_word(word)
+            if not word:
+                continue
+            if word in self.words:
+                self.words[word] += frequency
+                continue
+            self.words[word] = frequency
+            for deleted in self._deletes_of(word):
+                self.deletes.setdefault(deleted, []).append(word)
+
+    def _max_distance_for(self, word):
+        """Từ ngắn chỉ cho phép sửa 1 ký tự để tránh sửa nhầm"""
+        return min(self.max_edit_distance, 1 if len(word) <= 4 else 2)
+
+    def lookup(self, word):
+        """
+        Tìm từ đúng gần nhất
+
+        Args:
+            word (str): Từ cần kiểm tra
+
+        Returns:
+            tuple: (từ gợi ý, khoảng cách) hoặc (None, None) nếu không có gợi ý
+        """
+        word = normalize_word(word)
+        if word in self.words:
+            return word, 0
+        if word in self._cache:
+            return self._cache[word]
+
+        max_distance = self._max_distance_for(word)
+        best = (None, None)
+        best_key = None
+        checked = set()
+        for deleted in self._deletes_of(word):
+            for suggestion in self.deletes.get(deleted, ()):
+                if suggestion in checked:
+                    continue
+                checked.add(suggestion)
+                distance = edit_distance(word, suggestion, max_distance)
+                if distance > max_distance:
+                    continue
+                key = (distance, -self.words[suggestion])
+                if best_key is None or key < best_key:
+                    best, best_key = (suggestion, distance), key
+
+        if len(self._cache) >= LOOKUP_CACHE_SIZE:
+            self._cache.clear()
+        self._cache[word] = best
+        return best
+
+    def suggestions(self, word, limit=3):
+        """Danh sách các từ gợi ý tốt nhất (theo khoảng cách rồi tần suất)"""
+        word = normalize_word(word)
+        max_distance = self._max_distance_for(word)
+        found = {}
+        for deleted in self._deletes_of(word):
+            for suggestion in self.deletes.get(deleted, ()):
+                if suggestion not in found:
+                    distance = edit_distance(word, suggestion, max_distance)
+                    if distance <= max_distance:
+                        found[suggestion] = distance
+        ranked = sorted(found.items(), key=lambda item: (item[1], -self.words[item[0]]))
+        return [suggestion for suggestion, _ in ranked[:limit]]
+
+    def correct_text(self, text, protected=(), overrides=None, min_length=3):
+        """
+        Sửa lỗi chính tả cả câu trong một lượt (mỗi từ khác nhau chỉ tra cứu một lần)
+
+        Args:
+            text (str): Câu cần sửa
+            protected (set): Các từ giữ nguyên
+            overrides (dict): Bảng sửa thủ công, ưu tiên hơn chỉ mục
+            min_length (int): Bỏ qua từ ngắn hơn (có thể là viết tắt)
+
+        Returns:
+            tuple: (câu đã sửa, dict {từ gốc: từ đã sửa})
+        """
+        overrides = overrides or {}
+        corrections = {}
+        for token in set(WORD_PATTERN.findall(text)):
+            lower = normalize_word(token)
+            if lower in protected or len(lower) < min_length or lower.isdigit():
+                continue
+            if lower in overrides:
+                corrections[token] = overrides[lower]
+                continue
+            suggestion, distance = self.lookup(lower)
+            if suggestion and distance:
+                corrections[token] = suggestion
+
+        if not corrections:
+            return text, {}
+
+        parts = TOKEN_PATTERN.split(text)
+        for i in range(1, len(parts), 2):
+            if parts[i] in corrections:
+                parts[i] = _preserve_case(parts[i], corrections[parts[i]])
+        return "".join(parts), corrections
+
+    def save(self, path):
+        """Lưu chỉ mục ra file"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump({
+                "version": INDEX_VERSION,
+                "signature": self.signature,
+                "max_edit_distance": self.max_edit_distance,
+                "prefix_length": self.prefix_length,
+                "words": self.words,
+                "deletes": self.deletes,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Đọc chỉ mục từ file, None nếu không đọc được"""
+        try:
+            with open(path, "rb") as f:
+                data = pickle.load(f)
+            if data.get("version") != INDEX_VERSION:
+                return None
+            index = cls(data["max_edit_distance"], data["prefix_length"])
+            index.words = data["words"]
+            index.deletes = data["deletes"]
+            index.signature = data["signature"]
+            return index
+        except (OSError, pickle.PickleError, EOFError, KeyError):
+            return None
+
+
+def _preserve_case(original, corrected):
+    """Giữ kiểu chữ hoa/thường của từ gốc"""
+    if original.isupper() and len(original) > 1:
+        return corrected.upper()
+    if original[:1].isupper():
+        return corrected[:1].upper() + corrected[1:]
+    return corrected
+
+
+def build_vocabulary(database_path, extra_words=()):
+    """
+    Thu thập vốn từ từ catalog sách và các từ điển bổ sung
+
+    Args:
+        database_path (str): Đường dẫn database SQLite
+        extra_words (iterable): Từ/cụm từ bổ sung (tech_keywords, manual_corrections...)
+
+    Returns:
+        Counter: {từ: tần suất}
+    """
+    vocabulary = Counter()
+    conn = sqlite3.connect(database_path)
+    try:
+        cursor = conn.execute("SELECT title, author, keywords, subject, department FROM books")
+        for row in cursor:
+            for value in row:
+                if value:
+                    vocabulary.update(normalize_word(word) for word in WORD_PATTERN.findall(str(value)))
+    finally:
+        conn.close()
+
+    for phrase in list(extra_words) + COMMON_ENGLISH_WORDS:
+        vocabulary.update(normalize_word(word) for word in WORD_PATTERN.findall(phrase))
+
+    # Bỏ số thuần (năm, số trang) khỏi từ điển chính tả
+    return Counter({word: count for word, count in vocabulary.items() if not word.isdigit()})
+
+
+def _signature(database_path, extra_words):
+    """Dấu vân tay nguồn dữ liệu để biết khi nào cần xây dựng lại"""
+    digest = hashlib.sha1()
+    try:
+        stat = os.stat(database_path)
+        digest.update(f"{os.path.abspath(database_path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    except OSError:
+        digest.update(str(database_path).encode())
+    for word in sorted(extra_words):
+        digest.update(word.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_or_build(database_path=None, extra_words=(), index_path=None):
+    """
+    Đọc chỉ mục đã lưu hoặc xây dựng mới nếu catalog/từ điển thay đổi
+
+    Args:
+        database_path (str): Đường dẫn database SQLite
+        extra_words (iterable): Từ bổ sung
+        index_path (str): File lưu chỉ mục
+
+    Returns:
+        SymSpellIndex: Chỉ mục sẵn sàng tra cứu
+    """
+    database_path = database_path or DATABASE_PATH
+    index_path = index_path or SPELL_INDEX_PATH
+    extra_words = list(extra_words)
+    signature = _signature(database_path, extra_words)
+
+    index = SymSpellIndex.load(index_path)
+    if index and index.signature == signature:
+        logger.info(f"Đã tải chỉ mục chính tả: {len(index.words)} từ")
+        return index
+
+    index = SymSpellIndex()
+    index.build(build_vocabulary(database_path, extra_words))
+    index.signature = signature
+    try:
+        index.save(index_path)
+    except OSError as e:
+        logger.warning(f"Không thể lưu chỉ mục chính tả: {e}")
+    logger.info(f"Đã xây dựng chỉ mục chính tả: {len(index.words)} từ")
+    return index
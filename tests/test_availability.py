@@ -0,0 +1,53 @@
+import sqlite3
+
+import pytest
+
+from availability import ensure_availability_table, attach_availability, checkout, rewrite_availability_predicates
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE books (id INTEGER PRIMARY KEY, title TEXT, availability TEXT)")
+    conn.executemany(
+        "INSERT INTO books (id, title, availability) VALUES (?, ?, ?)",
+        [(1, "Giải tích", "1/1"), (2, "Đại số", "3/3")]
+    )
+    ensure_availability_table(conn)
+    yield conn
+    conn.close()
+
+
+def _current(conn, book_id):
+    return attach_availability(conn, [{"id": book_id, "availability": None}])[0]["availability"]
+
+
+def test_update_of_catalog_column_syncs_side_table(conn):
+    checkout(conn, 2)
+    assert _current(conn, 2) == "2/3"
+    with conn:
+        conn.execute("UPDATE books SET availability = '5/6' WHERE id = 2")
+    assert _current(conn, 2) == "5/6"
+
+
+def test_predicates_use_current_availability(conn):
+    checkout(conn, 1)
+    for sql in [
+        "SELECT title FROM books WHERE availability NOT LIKE '0/%'",
+        "SELECT b.title FROM books b WHERE b.availability NOT LIKE '0/%'",
+    ]:
+        rewritten = rewrite_availability_predicates(sql)
+        assert [row[0] for row in conn.execute(rewritten)] == ["Đại số"]
+
+    sql = "SELECT id, availability FROM books"
+    assert rewrite_availability_predicates(sql) == sql
+
+
+def test_string_literals_are_not_rewritten(conn):
+    sql = "SELECT title FROM books WHERE title LIKE '%availability%' OR title = 'it''s availability'"
+    assert rewrite_availability_predicates(sql) == sql
+    assert conn.execute(rewrite_availability_predicates(sql)).fetchall() == []
+
+    rewritten = rewrite_availability_predicates("SELECT title FROM books WHERE availability = '3/3' AND title != 'availability'")
+    assert rewritten.endswith("= '3/3' AND title != 'availability'")
+    assert [row[0] for row in conn.execute(rewritten)] == ["Đại số"]
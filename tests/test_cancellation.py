@@ -0,0 +1,57 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from cancellation import CancellationToken, CancelledError, run_cancellable, abortable_http_client
+
+httpx = pytest.importorskip("httpx")
+
+
+@pytest.fixture
+def hanging_server():
+    """Server nhận request nhưng không bao giờ trả lời; closed được đặt khi client đóng kết nối"""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    closed = threading.Event()
+
+    def serve():
+        conn, _ = server.accept()
+        with conn:
+            while conn.recv(65536):
+                pass
+        closed.set()
+
+    threading.Thread(target=serve, daemon=True).start()
+    yield f"http://127.0.0.1:{server.getsockname()[1]}/", closed
+    server.close()
+
+
+def test_cancel_aborts_request(hanging_server):
+    url, closed = hanging_server
+    client, abort = abortable_http_client(timeout=30)
+    token = CancellationToken()
+    threading.Timer(0.2, token.cancel).start()
+
+    started = time.perf_counter()
+    with pytest.raises(CancelledError):
+        run_cancellable(token, client.post, url, json={}, abort=abort)
+    cancelled_at = time.perf_counter()
+
+    # Socket được đóng thật (server nhận FIN) thay vì treo tới timeout 30 giây của request
+    assert closed.wait(1)
+    socket_closed_after = time.perf_counter() - cancelled_at
+    assert cancelled_at - started < 1
+    assert socket_closed_after < 0.05
+    client.close()
+
+
+def test_aborted_thread_cannot_reconnect(hanging_server):
+    url, _ = hanging_server
+    client, abort = abortable_http_client(timeout=30)
+    abort(threading.current_thread())
+    with pytest.raises(httpx.ConnectError):
+        client.get(url)
+    client.close()
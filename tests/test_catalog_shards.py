@@ -0,0 +1,91 @@
+import sqlite3
+
+import pytest
+
+from availability import checkout
+from catalog_shards import ShardedCatalog
+
+BOOK_COLUMNS = [
+    "id", "title", "author", "publisher", "publication_year", "pages", "dimensions",
+    "registration_number", "price", "storage_location", "document_type", "availability",
+    "keywords", "subject", "department", "summary", "url"
+]
+
+SHARD_BOOKS = {
+    "a": [(1, "Lập trình Python", "Nguyễn Văn A", "NXB Trẻ", 2015, "Tin học")],
+    "b": [
+        (1, "Cấu trúc dữ liệu", "Trần B", "NXB Trẻ", 2024, "Tin học"),
+        (2, "Giải tích", "Lê C", "NXB Giáo dục", 2023, "Toán học"),
+        (3, "Đại số", "Lê C", "NXB Giáo dục", 2022, "Toán học"),
+        (4, "Vật lý", "Phạm D", "NXB Giáo dục", 2021, "Vật lý"),
+    ],
+    "c": [(1, "Trí tuệ nhân tạo", "Hoàng E", "NXB Trẻ", 2030, "Tin học")],
+}
+
+
+def _create_shard(path, books):
+    conn = sqlite3.connect(path)
+    conn.execute(f"CREATE TABLE books ({', '.join(BOOK_COLUMNS)})")
+    for book_id, title, author, publisher, year, subject in books:
+        conn.execute(
+            "INSERT INTO books (id, title, author, publisher, publication_year, subject, availability) "
+            "VALUES (?, ?, ?, ?, ?, ?, '2/2')",
+            (book_id, title, author, publisher, year, subject)
+        )
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    paths = []
+    for name, books in SHARD_BOOKS.items():
+        path = str(tmp_path / f"{name}.db")
+        _create_shard(path, books)
+        paths.append(path)
+    catalog = ShardedCatalog(paths)
+    yield catalog
+    catalog.close()
+
+
+def test_count_is_summed_across_shards(catalog):
+    assert catalog.query("SELECT COUNT(*) FROM books") == [{"COUNT(*)": 6}]
+    assert catalog.query("SELECT COUNT(*) AS total FROM books WHERE subject = 'Tin học'") == [{"total": 3}]
+
+
+def test_group_by_is_merged_across_shards(catalog):
+    results = catalog.query(
+        "SELECT publisher, COUNT(*) AS n, AVG(publication_year) AS avg_year FROM books "
+        "GROUP BY publisher ORDER BY avg_year DESC"
+    )
+    assert results == [
+        {"publisher": "NXB Trẻ", "n": 3, "avg_year": 2023.0},
+        {"publisher": "NXB Giáo dục", "n": 3, "avg_year": 2022.0},
+    ]
+
+
+def test_facet_counts_are_summed_across_shards(catalog):
+    results = catalog.query("SELECT value, count FROM book_facets WHERE facet = 'subject'")
+    counts = {row["value"]: row["count"] for row in results}
+    assert counts == {"Tin học": 3, "Toán học": 2, "Vật lý": 1}
+    assert len(results) == len(counts)
+
+
+def test_order_by_limit_is_global(catalog):
+    results = catalog.query("SELECT title, publication_year FROM books ORDER BY publication_year DESC LIMIT 3")
+    assert [row["publication_year"] for row in results] == [2030, 2024, 2023]
+    assert results[0]["shard"] == "c"
+
+
+def test_order_by_unselected_column_with_offset(catalog):
+    results = catalog.query("SELECT title FROM books ORDER BY publication_year LIMIT 2 OFFSET 1")
+    assert [row["title"] for row in results] == ["Vật lý", "Đại số"]
+    assert all("publication_year" not in row and not any(key.startswith("__") for key in row) for row in results)
+
+
+def test_run_on_shard_updates_only_that_shard(catalog):
+    assert catalog.run_on_shard("c", checkout, 1)
+    results = catalog.query("SELECT id, availability FROM books WHERE id = 1 ORDER BY publication_year")
+    assert {row["shard"]: row["availability"] for row in results} == {"a": "2/2", "b": "2/2", "c": "1/2"}
+    with pytest.raises(ValueError):
+        catalog.run_on_shard(None, checkout, 1)
@@ -0,0 +1,32 @@
+from config import DIACRITIC_MIN_CONFIDENCE
+from diacritic_restorer import DiacriticRestorer, SEED_CORPUS, log_query, logged_queries
+
+# Các âm tiết của tên riêng đều phổ biến trong catalog nhưng không bao giờ đứng cạnh nhau
+CATALOG_TEXTS = ["nguyên lý kế toán", "lần thứ nhất", "nhiếp ảnh nghệ thuật"] * 20
+
+
+def _restorer():
+    return DiacriticRestorer().train(SEED_CORPUS.splitlines()).train(CATALOG_TEXTS)
+
+
+def test_proper_noun_is_sent_to_fallback():
+    restored, confidence = _restorer().restore("sach cua tac gia nguyen nhat anh")
+    assert restored.startswith("sách của tác giả")
+    assert confidence < DIACRITIC_MIN_CONFIDENCE
+
+
+def test_common_query_is_restored_locally():
+    restored, confidence = _restorer().restore("tim sach ve lap trinh")
+    assert restored == "tìm sách về lập trình"
+    assert confidence >= DIACRITIC_MIN_CONFIDENCE
+
+
+def test_query_log_is_rotated(tmp_path):
+    log_path = str(tmp_path / "queries.log")
+    for i in range(50):
+        log_query(f"tìm sách số {i}", log_path=log_path, max_bytes=200)
+    assert (tmp_path / "queries.log").stat().st_size < 250
+    assert (tmp_path / "queries.log.1").exists()
+    queries = list(logged_queries(log_path))
+    assert queries[-1] == "tìm sách số 49"
+    assert len(queries) < 50
@@ -0,0 +1,29 @@
+from phrase_matcher import PhraseMatcher, is_library_context
+
+
+def _matcher():
+    matcher = PhraseMatcher()
+    matcher.add_speech_corrections({"sex": "sách", "tim": "tìm"})
+    matcher.add_profanity(["sex"])
+    matcher.add_domain_mapping({"book": "sách", "find": "tìm"})
+    matcher.add_tags("verb", ["find", "look for"])
+    matcher.add_tags("book", ["book", "books"])
+    return matcher.compile()
+
+
+def test_segments_cover_text_and_match_whole_words():
+    segments = _matcher().segments("Find  books, sexy tim")
+    assert "".join(fragment for fragment, _ in segments) == "Find  books, sexy tim"
+    matched = [fragment for fragment, info in segments if info is not None]
+    assert matched == ["Find", "books", "tim"]
+
+
+def test_phrase_keeps_every_role():
+    info = _matcher().segments("sex")[0][1]
+    assert info.speech == "sách" and info.profanity
+
+
+def test_library_context_from_single_pass():
+    matcher = _matcher()
+    assert is_library_context(matcher.segments("find books about java"), matcher.info_for)
+    assert not is_library_context(matcher.segments("books find"), matcher.info_for)
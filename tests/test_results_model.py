@@ -0,0 +1,60 @@
+import sqlite3
+import time
+
+import pytest
+
+pytest.importorskip("PyQt6")
+
+from PyQt6.QtCore import QCoreApplication, Qt
+
+from results_model import DetailLoader, ResultListModel, format_facets
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+@pytest.fixture
+def database(tmp_path):
+    # Ký tự có nghĩa trong URI phải được mã hóa khi mở chỉ đọc
+    directory = tmp_path / "thư mục #1 ?x=y %20"
+    directory.mkdir()
+    path = str(directory / "catalog.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE books (id INTEGER PRIMARY KEY, title TEXT, summary TEXT, url TEXT)")
+    conn.execute("INSERT INTO books VALUES (1, 'Giải tích', 'Tóm tắt giải tích', 'https://example.org/1')")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_loader_opens_path_with_special_characters(database):
+    loader = DetailLoader(database_path=database, shard_paths=[])
+    assert loader.load({"id": 1}) == {"summary": "Tóm tắt giải tích", "url": "https://example.org/1"}
+    loader.close()
+
+
+def test_details_load_off_the_ui_thread(app, database):
+    model = ResultListModel(DetailLoader(database_path=database, shard_paths=[]))
+    model.append_rows([{"id": 1, "title": "Giải tích"}])
+
+    model.toggle_expanded(0)
+    assert 0 in model.loading
+    assert "Đang tải" in model.data(model.index(0), Qt.ItemDataRole.DisplayRole)
+
+    deadline = time.monotonic() + 2
+    while model.loading and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    assert "Tóm tắt giải tích" in model.data(model.index(0), Qt.ItemDataRole.DisplayRole)
+    model.close()
+
+
+def test_format_facets_shows_top_values():
+    text = format_facets({
+        "subject": [("Tin học", 3), ("Toán học", 2), ("Vật lý", 1), ("Hóa học", 1)],
+        "unknown": [("x", 1)],
+    })
+    assert text == "   📂 Chủ đề: Tin học (3), Toán học (2), Vật lý (1), +1"
+    assert format_facets({}) == ""
@@ -0,0 +1,21 @@
+from search_processor import SearchProcessor
+
+
+def _rewrite(sql):
+    return SearchProcessor._select_list_columns(None, sql)
+
+
+def test_select_all_skips_heavy_fields():
+    sql = _rewrite("SELECT * FROM books WHERE LOWER(title) LIKE '%python%' LIMIT 10")
+    assert sql.startswith("SELECT id, title, author,")
+    assert "summary" not in sql and "url" not in sql
+    assert sql.endswith("FROM books WHERE LOWER(title) LIKE '%python%' LIMIT 10")
+
+
+def test_joins_and_explicit_columns_are_kept():
+    for sql in [
+        "SELECT * FROM books b JOIN book_availability a ON a.book_id = b.id",
+        "SELECT title, summary FROM books",
+        "SELECT * FROM book_facets WHERE facet = 'subject'",
+    ]:
+        assert _rewrite(sql) == sql
@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip("better_profanity")
+pytest.importorskip("textblob")
+
+import spell_index
+from smart_filter import SmartTextFilter
+
+
+@pytest.fixture
+def text_filter():
+    text_filter = SmartTextFilter(verbose=False)
+    index = spell_index.SymSpellIndex()
+    index.build({word: 10 for word in ["can", "you", "find", "me", "a", "book", "python"]})
+    text_filter._spell_index = index
+    text_filter._spell_index_loaded = True
+    return text_filter
+
+
+def test_spell_check_keeps_speech_corrections(text_filter):
+    # 'can' -> 'cần' (sửa lỗi giọng nói) không được SymSpell đổi ngược lại thành 'can'
+    assert text_filter.clean_text("can you find me a book") == "Cần you tìm me a sách"
+
+
+def test_spell_check_still_fixes_english_typos(text_filter):
+    assert text_filter.clean_text("find pyhton book") == "Tìm python sách"
+
+
+def test_shared_filter_is_quiet():
+    from smart_filter import get_smart_filter
+    assert get_smart_filter().verbose is False
+
+
+def test_timing_stats_are_counted_across_threads(text_filter):
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(text_filter.clean_text, ["find pyhton book"] * 400))
+    assert text_filter.get_timing_stats()["calls"] == 400
+
+
+def test_speech_correction_wins_over_profanity(text_filter):
+    # 'sex' vừa là lỗi nhận diện của 'sách' vừa có trong danh sách tục tĩu: sửa giọng nói trước
+    assert text_filter.clean_text("sex python") == "Sách python"
+    assert text_filter.clean_text("tim sex about machine learning") == "Tìm sách about machine learning"
+
+
+def test_profanity_is_still_censored(text_filter):
+    assert text_filter.clean_text("fuck python") == "*** python"
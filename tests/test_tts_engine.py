@@ -0,0 +1,25 @@
+import threading
+
+import pytest
+
+from tts_engine import AudioPlayer, create_backend
+
+
+def test_invalid_backend_name_is_rejected():
+    with pytest.raises(ValueError, match="espeak, gtts"):
+        create_backend("festival")
+
+
+def test_player_skips_item_marked_done_before_its_turn():
+    player = AudioPlayer()
+    gate = threading.Event()
+    loaded = []
+    try:
+        player.submit(lambda: gate.wait(2) and loaded.append("first"))
+        second = player.submit(lambda: loaded.append("second"))
+        second.set()
+        gate.set()
+        player.submit(lambda: loaded.append("last")).wait(2)
+    finally:
+        player.stop()
+    assert loaded == ["first", "last"]
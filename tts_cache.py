@@ -0,0 +1,173 @@
+"""
+Module cache TTS trên đĩa, đặt tên theo hash (text, lang, voice), giới hạn dung lượng
+Các câu cố định (lời chào, thông báo) được tổng hợp sẵn khi cài đặt: python tts_engine.py
+"""
+
+import os
+import shutil
+import hashlib
+import logging
+import threading
+from config import TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES, TTS_LANG, TTS_VOICE
+
+logger = logging.getLogger(__name__)
+
+# Câu cố định được tổng hợp sẵn để phát ngay, không cần mạng
+FIXED_PROMPTS = {
+    "greeting": "Đây là hệ thống tìm sách trong thư viện, bạn muốn tìm sách nào?",
+    "listening": "Mời bạn nói yêu cầu tìm sách.",
+    "searching": "Đang tìm kiếm, vui lòng đợi.",
+    "no_results": "Không tìm thấy sách phù hợp với yêu cầu của bạn.",
+    "results_intro": "Đây là kết quả tìm kiếm của bạn.",
+    "not_understood": "Xin lỗi, tôi chưa nghe rõ. Bạn vui lòng nói lại.",
+    "error": "Đã có lỗi xảy ra, vui lòng thử lại.",
+}
+
+# File mp3 có sẵn trong repo (tạo bằng gTTS) dùng để khởi tạo cache cho lời chào
+SEED_FILES = {
+    "greeting": "greeting.mp3",
+}
+
+
+def seed_path(name):
+    """Đường dẫn file mp3 có sẵn cho câu cố định, None nếu không có"""
+    seed = SEED_FILES.get(name)
+    if not seed:
+        return None
+    seed = os.path.join(os.path.dirname(os.path.abspath(__file__)), seed)
+    return seed if os.path.exists(seed) else None
+
+
+def cache_key(text, lang=TTS_LANG, voice=TTS_VOICE):
+    """Khóa cache: hash của (text, lang, voice)"""
+    normalized = " ".join(text.split())
+    return hashlib.sha1(f"{lang}\x00{voice}\x00{normalized}".encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """Kho âm thanh đã tổng hợp, xóa file ít dùng nhất khi vượt dung lượng"""
+
+    def __init__(self, cache_dir=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES):
+        """
+        Khởi tạo TTSCache
+
+        Args:
+            cache_dir (str): Thư mục cache
+            max_bytes (int): Dung lượng tối đa
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.voices = {(TTS_LANG, TTS_VOICE)}  # Các (lang, voice) đã dùng, để giữ lại câu cố định
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key, extension):
+        return os.path.join(self.cache_dir, f"{key}.{extension}")
+
+    def get(self, text, lang=TTS_LANG, voice=TTS_VOICE, extension="mp3"):
+        """
+        Tìm file âm thanh đã có
+
+        Returns:
+            str: Đường dẫn file, None nếu chưa có
+        """
+        path = self._path(cache_key(text, lang, voice), extension)
+        if not os.path.exists(path):
+            return None
+        try:
+            os.utime(path)  # Đánh dấu vừa dùng (cho việc xóa file ít dùng nhất)
+        except OSError:
+            pass
+        return path
+
+    def load(self, text, lang=TTS_LANG, voice=TTS_VOICE, extension="mp3"):
+        """
+        Đọc dữ liệu âm thanh đã có vào bộ nhớ
+
+        Returns:
+            bytes: Dữ liệu, None nếu chưa có
+        """
+        path = self.get(text, lang, voice, extension)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, text, data, lang=TTS_LANG, voice=TTS_VOICE, extension="mp3"):
+        """
+        Lưu dữ liệu âm thanh
+
+        Args:
+            text (str): Văn bản
+            data (bytes): Dữ liệu âm thanh đã mã hóa
+            lang (str): Ngôn ngữ
+            voice (str): Giọng đọc
+            extension (str): Định dạng file
+
+        Returns:
+            str: Đường dẫn file
+        """
+        path = self._path(cache_key(text, lang, voice), extension)
+        self.voices.add((lang, voice))
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        self._evict(keep=path)
+        return path
+
+    def put_file(self, text, source_path, lang=TTS_LANG, voice=TTS_VOICE, extension="mp3"):
+        """Chép một file âm thanh có sẵn vào cache"""
+        path = self._path(cache_key(text, lang, voice), extension)
+        self.voices.add((lang, voice))
+        shutil.copyfile(source_path, path)
+        self._evict(keep=path)
+        return path
+
+    def _evict(self, keep=None):
+        """Xóa các file lâu không dùng nhất cho tới khi dưới giới hạn (giữ lại câu cố định và file `keep`)"""
+        with self.lock:
+            protected = {
+                cache_key(text, lang, voice)
+                for lang, voice in self.voices
+                for text in FIXED_PROMPTS.values()
+            }
+            entries = []
+            total = 0
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                total += stat.st_size
+                if name.split(".")[0] not in protected and path != keep:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+
+# Cache dùng chung, tạo khi gọi lần đầu
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_tts_cache():
+    """Lấy TTSCache dùng chung (thread-safe, khởi tạo lười)"""
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = TTSCache()
+    return _shared_cache
+
@@ -0,0 +1,323 @@
+"""
+Module tổng hợp và phát giọng nói
+Backend TTS có thể thay thế (gTTS cần mạng, espeak-ng chạy offline), âm thanh PCM được cache
+và phát thẳng từ bộ nhớ qua một thread phát duy nhất với hàng đợi (không file tạm, không polling)
+"""
+
+import io
+import wave
+import queue
+import shutil
+import logging
+import threading
+import subprocess
+import numpy as np
+from tts_cache import get_tts_cache, FIXED_PROMPTS, seed_path
+from config import TTS_BACKEND, TTS_LANG, TTS_VOICE, TTS_ESPEAK_VOICE, TTS_ESPEAK_SPEED, TTS_PLAYBACK_CHUNK
+
+logger = logging.getLogger(__name__)
+
+
+def encode_wav(samples, rate):
+    """Đóng gói mẫu int16 mono thành bytes WAV (để lưu cache)"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(np.asarray(samples, dtype=np.int16).tobytes())
+    return buffer.getvalue()
+
+
+def decode_wav(data):
+    """
+    Đọc bytes WAV PCM 16-bit
+
+    Returns:
+        tuple: (np.ndarray int16 mono, rate)
+    """
+    with wave.open(io.BytesIO(data), "rb") as wf:
+        channels = wf.getnchannels()
+        rate = wf.getframerate()
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return samples, rate
+
+
+def decode_mp3(data):
+    """Giải mã mp3 trong bộ nhớ bằng pydub (cần ffmpeg), trả về (mẫu int16 mono, rate)"""
+    from pydub import AudioSegment
+
+    segment = AudioSegment.from_file(io.BytesIO(data), format="mp3").set_channels(1).set_sample_width(2)
+    return np.frombuffer(segment.raw_data, dtype=np.int16), segment.frame_rate
+
+
+class TTSBackend:
+    """Giao diện backend TTS: synthesize(text) -> (mẫu int16 mono, rate)"""
+
+    name = "backend"
+
+    def __init__(self, lang=TTS_LANG, voice=TTS_VOICE):
+        self.lang = lang
+        self.voice = voice
+
+    @property
+    def cache_voice(self):
+        """Định danh giọng đọc trong khóa cache (mỗi backend một bộ cache riêng)"""
+        return f"{self.name}:{self.voice}"
+
+    def synthesize(self, text):
+        """
+        Tổng hợp một câu
+
+        Args:
+            text (str): Văn bản
+
+        Returns:
+            tuple: (np.ndarray int16 mono, rate)
+        """
+        raise NotImplementedError
+
+
+class GTTSBackend(TTSBackend):
+    """Google Translate TTS (cần mạng), mp3 được giải mã trong bộ nhớ"""
+
+    name = "gtts"
+
+    def synthesize(self, text):
+        from gtts import gTTS
+
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=self.lang, tld=self.voice).write_to_fp(buffer)
+        return decode_mp3(buffer.getvalue())
+
+
+class EspeakBackend(TTSBackend):
+    """espeak-ng chạy cục bộ (offline), đọc WAV từ stdout"""
+
+    name = "espeak"
+
+    def __init__(self, lang=TTS_LANG, voice=TTS_ESPEAK_VOICE, speed=TTS_ESPEAK_SPEED):
+        super().__init__(lang, voice)
+        self.speed = speed
+        self.executable = shutil.which("espeak-ng") or shutil.which("espeak")
+
+    @property
+    def available(self):
+        return self.executable is not None
+
+    def synthesize(self, text):
+        if not self.available:
+            raise RuntimeError("Không tìm thấy espeak-ng")
+        result = subprocess.run(
+            [self.executable, "-v", self.voice, "-s", str(self.speed), "--stdout", "-b", "1"],
+            input=text.encode("utf-8"), capture_output=True, check=True, timeout=30
+        )
+        return decode_wav(result.stdout)
+
+
+BACKENDS = {
+    GTTSBackend.name: GTTSBackend,
+    EspeakBackend.name: EspeakBackend,
+}
+
+
+def create_backend(name=TTS_BACKEND):
+    """
+    Tạo backend theo tên cấu hình ('gtts' hoặc 'espeak')
+
+    Returns:
+        TTSBackend: Backend
+
+    Raises:
+        ValueError: Nếu tên backend không hợp lệ (kiểm tra TTS_BACKEND trong config.py)
+    """
+    backend_class = BACKENDS.get(name)
+    if backend_class is None:
+        raise ValueError(f"Backend TTS không hợp lệ: {name!r} (hợp lệ: {', '.join(sorted(BACKENDS))})")
+    return backend_class()
+
+
+def synthesize_cached(backend, text, cache=None):
+    """
+    Tổng hợp (hoặc lấy từ cache) một câu
+
+    Args:
+        backend (TTSBackend): Backend
+        text (str): Văn bản
+        cache (TTSCache): Cache, mặc định dùng cache chung
+
+    Returns:
+        tuple: (np.ndarray int16 mono, rate)
+    """
+    cache = cache or get_tts_cache()
+    data = cache.load(text, backend.lang, backend.cache_voice, extension="wav")
+    if data is not None:
+        return decode_wav(data)
+    samples, rate = backend.synthesize(text)
+    cache.put(text, encode_wav(samples, rate), backend.lang, backend.cache_voice, extension="wav")
+    return samples, rate
+
+
+def prebuild_prompts(backend=None, cache=None):
+    """
+    Tổng hợp sẵn các câu cố định còn thiếu trong cache
+
+    Args:
+        backend (TTSBackend): Backend, mặc định theo cấu hình
+        cache (TTSCache): Cache đích
+
+    Returns:
+        int: Số câu vừa được tổng hợp/chép vào cache
+    """
+    backend = backend or create_backend()
+    cache = cache or get_tts_cache()
+    added = 0
+    for name, text in FIXED_PROMPTS.items():
+        if cache.get(text, backend.lang, backend.cache_voice, extension="wav"):
+            continue
+        try:
+            seed = seed_path(name)
+            if seed and isinstance(backend, GTTSBackend):
+                # File mp3 có sẵn trong repo được tạo bằng gTTS
+                with open(seed, "rb") as f:
+                    samples, rate = decode_mp3(f.read())
+            else:
+                samples, rate = backend.synthesize(text)
+            cache.put(text, encode_wav(samples, rate), backend.lang, backend.cache_voice, extension="wav")
+            added += 1
+            logger.info(f"Đã tổng hợp sẵn câu '{name}' ({backend.name})")
+        except Exception as e:
+            logger.error(f"Không thể tổng hợp câu '{name}': {e}")
+    return added
+
+
+class AudioPlayer:
+    """Một thread phát duy nhất, sống suốt vòng đời ứng dụng, nhận âm thanh qua hàng đợi"""
+
+    def __init__(self, chunk=TTS_PLAYBACK_CHUNK):
+        """
+        Khởi tạo AudioPlayer (thiết bị được mở khi phát lần đầu)
+
+        Args:
+            chunk (int): Số frame mỗi lần ghi ra thiết bị (độ trễ khi dừng)
+        """
+        self.chunk = chunk
+        self.queue = queue.Queue()
+        self._generation = 0  # Tăng mỗi lần stop(): các mục cũ hơn bị bỏ qua
+        self._lock = threading.Lock()
+        self._pyaudio = None
+        self._stream = None
+        self._stream_rate = None
+        self.thread = threading.Thread(target=self._run, name="tts-playback", daemon=True)
+        self.thread.start()
+
+    def submit(self, load):
+        """
+        Đưa một mục vào hàng đợi phát (không chặn)
+
+        Args:
+            load (callable): () -> (mẫu int16, rate), được gọi trên thread phát
+                (cho phép tổng hợp trễ mà không chặn UI)
+
+        Returns:
+            threading.Event: Được set khi mục phát xong, bị dừng hoặc lỗi;
+                người gọi set trước khi tới lượt phát để bỏ riêng mục này
+        """
+        done = threading.Event()
+        with self._lock:
+            self.queue.put((self._generation, load, done))
+        return done
+
+    def play(self, samples, rate):
+        """Phát mẫu PCM đã có (không chặn)"""
+        return self.submit(lambda: (samples, rate))
+
+    def stop(self):
+        """Dừng câu đang phát và bỏ các câu đang chờ"""
+        with self._lock:
+            self._generation += 1
+        while True:
+            try:
+                _, _, done = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            done.set()
+
+    def _run(self):
+        while True:
+            generation, load, done = self.queue.get()
+            try:
+                if load is None:
+                    return
+                if generation == self._generation and not done.is_set():
+                    samples, rate = load()
+                    self._write(samples, rate, generation)
+            except Exception as e:
+                logger.error(f"Lỗi phát âm thanh: {e}")
+            finally:
+                done.set()
+
+    def _open(self, rate):
+        import pyaudio
+
+        if self._pyaudio is None:
+            self._pyaudio = pyaudio.PyAudio()
+        if self._stream is not None and self._stream_rate != rate:
+            self._stream.close()
+            self._stream = None
+        if self._stream is None:
+            self._stream = self._pyaudio.open(format=pyaudio.paInt16, channels=1, rate=rate,
+                                              output=True, frames_per_buffer=self.chunk)
+            self._stream_rate = rate
+
+    def _write(self, samples, rate, generation):
+        """Ghi từng khối ra thiết bị (write chặn tới khi thiết bị nhận), dừng sớm khi stop()"""
+        self._open(rate)
+        data = np.asarray(samples, dtype=np.int16).tobytes()
+        step = self.chunk * 2
+        for start in range(0, len(data), step):
+            if generation != self._generation:
+                return
+            self._stream.write(data[start:start + step])
+
+    def close(self):
+        """Dừng thread phát và giải phóng thiết bị"""
+        self.stop()
+        self.queue.put((self._generation, None, threading.Event()))
+        self.thread.join(2.0)
+        if self._stream is not None:
+            try:
+                self._stream.close()
+            except Exception:
+                pass
+            self._stream = None
+        if self._pyaudio is not None:
+            self._pyaudio.terminate()
+            self._pyaudio = None
+
+
+# Player dùng chung, tạo khi gọi lần đầu
+_shared_player = None
+_shared_player_lock = threading.Lock()
+
+
+def get_audio_player():
+    """Lấy AudioPlayer dùng chung (thread-safe, khởi tạo lười)"""
+    global _shared_player
+    if _shared_player is None:
+        with _shared_player_lock:
+            if _shared_player is None:
+                _shared_player = AudioPlayer()
+    return _shared_player
+
+
+# Tổng hợp sẵn câu cố định khi cài đặt: python tts_engine.py [gtts|espeak]
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    backend = create_backend(sys.argv[1] if len(sys.argv) > 1 else TTS_BACKEND)
+    count = prebuild_prompts(backend)
+    print(f"Đã thêm {count} câu vào cache TTS ({backend.name})")
@@ -1,37 +1,64 @@
-import os
-import time
-import pygame
 import threading
-from gtts import gTTS
-
-# Initialize pygame mixer
-pygame.mixer.init()
+from tts_cache import FIXED_PROMPTS
+from tts_engine import create_backend, synthesize_cached, get_audio_player
+from config import TTS_BACKEND
 
 class TTSManager:
+    _backend = None
+    _backend_lock = threading.Lock()
+    
+    @staticmethod
+    def backend():
+        """Backend TTS theo cấu hình (tạo khi dùng lần đầu)"""
+        if TTSManager._backend is None:
+            with TTSManager._backend_lock:
+                if TTSManager._backend is None:
+                    TTSManager._backend = create_backend(TTS_BACKEND)
+        return TTSManager._backend
+    
     @staticmethod
-    def play_text(text, lang="vi", filename_prefix="temp"):
-        """Play text as speech"""
-        def play_audio():
-            try:
-                tts = gTTS(text=text, lang=lang)
-                filename = f"{filename_prefix}.mp3"
-                tts.save(filename)
-                
-                pygame.mixer.music.load(filename)
-                pygame.mixer.music.play()
-                
-                while pygame.mixer.music.get_busy():
-                    time.sleep(0.1)
-                
-                if os.path.exists(filename):
-                    os.remove(filename)
-            except Exception as e:
-                print(f"Could not play audio: {e}")
+    def synthesize(text):
+        """Tổng hợp giọng nói (hoặc lấy từ cache), trả về (mẫu PCM int16, rate)"""
+        return synthesize_cached(TTSManager.backend(), text)
+    
+    @staticmethod
+    def play_audio(audio, cancelled=None):
+        """
+        Phát âm thanh đã tổng hợp và chờ phát xong (hoặc bị dừng)
         
-        threading.Thread(target=play_audio, daemon=True).start()
+        cancelled (threading.Event) được set trước khi câu tới lượt phát thì câu bị bỏ;
+        câu đang phát dừng qua stop() (ResultReader.cancel gọi stop sau khi set cancelled)
+        """
+        samples, rate = audio
+        if cancelled is not None and cancelled.is_set():
+            return
+        done = get_audio_player().play(samples, rate)
+        if cancelled is not None and cancelled.is_set():
+            # Bị hủy ngay sau khi đưa vào hàng đợi (stop() của lần hủy đã chạy trước): bỏ riêng câu này
+            done.set()
+        done.wait()
+    
+    @staticmethod
+    def stop():
+        """Dừng phát ngay và bỏ các câu đang chờ"""
+        get_audio_player().stop()
+    
+    @staticmethod
+    def close():
+        """Giải phóng thiết bị phát (gọi khi thoát ứng dụng)"""
+        get_audio_player().close()
+    
+    @staticmethod
+    def play_text(text):
+        """Play text as speech (tổng hợp và phát trên thread phát dùng chung, không chặn)"""
+        return get_audio_player().submit(lambda: TTSManager.synthesize(text))
+    
+    @staticmethod
+    def play_prompt(name):
+        """Play a fixed prompt (đã tổng hợp sẵn khi cài đặt)"""
+        return TTSManager.play_text(FIXED_PROMPTS[name])
     
     @staticmethod
     def play_greeting():
         """Play greeting message"""
-        greeting_text = "Đây là hệ thống tìm sách trong thư viện, bạn muốn tìm sách nào?"
-        TTSManager.play_text(greeting_text, filename_prefix="greeting")
\ No newline at end of file
+        return TTSManager.play_prompt("greeting")
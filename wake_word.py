@@ -0,0 +1,329 @@
+"""
+Module phát hiện từ đánh thức ("thư viện ơi") để bắt đầu ghi âm không cần bấm nút
+So khớp mẫu trên đặc trưng MFCC bằng DTW; chỉ tính MFCC khi cổng năng lượng
+phát hiện một đoạn nói có độ dài phù hợp nên gần như không tốn CPU khi im lặng
+"""
+
+import os
+import glob
+import queue
+import wave
+import logging
+import numpy as np
+from PyQt6.QtCore import QThread, pyqtSignal
+from audio_buffer import RingBuffer, rms_level
+from audio_session import get_audio_session
+from config import (
+    AUDIO_RATE,
+    AUDIO_CHUNK,
+    WAKE_WORD_TEMPLATE_DIR,
+    WAKE_WORD_THRESHOLD,
+    WAKE_WORD_ENERGY_THRESHOLD,
+    WAKE_WORD_MIN_SECONDS,
+    WAKE_WORD_MAX_SECONDS,
+    WAKE_WORD_TRAILING_SILENCE_MS
+)
+
+logger = logging.getLogger(__name__)
+
+FEATURE_RATE = 11025  # Giảm tần số lấy mẫu trước khi tính MFCC
+FRAME_MS = 25
+HOP_MS = 10
+MEL_FILTERS = 26
+CEPSTRA = 13
+
+
+def _downsample(samples, rate):
+    """Giảm tần số lấy mẫu bằng trung bình khối (lọc thông thấp thô) rồi lấy mẫu cách quãng"""
+    factor = max(1, int(round(rate / FEATURE_RATE)))
+    samples = samples.astype(np.float32) / 32768.0
+    usable = len(samples) - len(samples) % factor
+    return samples[:usable].reshape(-1, factor).mean(axis=1), rate / factor
+
+
+def _mel_filterbank(rate, n_fft):
+    def to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def to_hz(mel):
+        return 700.0 * (10 ** (mel / 2595.0) - 1.0)
+
+    mel_points = np.linspace(to_mel(60.0), to_mel(rate / 2), MEL_FILTERS + 2)
+    bins = np.floor((n_fft + 1) * to_hz(mel_points) / rate).astype(int)
+    bank = np.zeros((MEL_FILTERS, n_fft // 2 + 1), dtype=np.float32)
+    for m in range(1, MEL_FILTERS + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        for k in range(left, center):
+            bank[m - 1, k] = (k - left) / max(1, center - left)
+        for k in range(center, right):
+            bank[m - 1, k] = (right - k) / max(1, right - center)
+    return bank
+
+
+_filterbank_cache = {}
+
+
+def mfcc(samples, rate=AUDIO_RATE):
+    """
+    Đặc trưng MFCC (bỏ hệ số c0, chuẩn hóa trung bình cepstral)
+
+    Args:
+        samples (np.ndarray): Mẫu int16
+        rate (int): Tần số lấy mẫu
+
+    Returns:
+        np.ndarray: Ma trận (số frame, CEPSTRA - 1)
+    """
+    signal, rate = _downsample(samples, rate)
+    signal = np.append(signal[0:1], signal[1:] - 0.97 * signal[:-1]) if len(signal) else signal
+
+    frame_length = int(rate * FRAME_MS / 1000)
+    hop = int(rate * HOP_MS / 1000)
+    if len(signal) < frame_length:
+        return np.zeros((0, CEPSTRA - 1), dtype=np.float32)
+
+    count = 1 + (len(signal) - frame_length) // hop
+    indices = np.arange(frame_length)[None, :] + hop * np.arange(count)[:, None]
+    frames = signal[indices] * np.hamming(frame_length)
+
+    n_fft = 1 << (frame_length - 1).bit_length()
+    key = (rate, n_fft)
+    if key not in _filterbank_cache:
+        _filterbank_cache[key] = _mel_filterbank(rate, n_fft)
+    power = np.abs(np.fft.rfft(frames, n_fft)) ** 2 / n_fft
+    energies = np.log(power @ _filterbank_cache[key].T + 1e-10)
+
+    # DCT-II
+    n = np.arange(MEL_FILTERS)
+    basis = np.cos(np.pi * np.arange(CEPSTRA)[:, None] * (2 * n[None, :] + 1) / (2 * MEL_FILTERS))
+    cepstra = energies @ basis.T
+    features = cepstra[:, 1:]
+    return (features - features.mean(axis=0)).astype(np.float32)
+
+
+def dtw_distance(a, b):
+    """
+    Khoảng cách DTW chuẩn hóa giữa hai chuỗi đặc trưng
+
+    Dùng bước (1,1), (1,2), (2,1) để độ dốc nằm trong [1/2, 2]; mỗi hàng chỉ phụ thuộc
+    hai hàng trước nên tính được bằng phép toán vector
+
+    Returns:
+        float: Khoảng cách trung bình theo frame (inf nếu không thể căn chỉnh)
+    """
+    n, m = len(a), len(b)
+    if n == 0 or m == 0 or n > 2 * m or m > 2 * n:
+        return float("inf")
+
+    cost = np.sqrt(((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2))
+    inf = np.float32(np.inf)
+    previous2 = np.full(m + 2, inf, dtype=np.float32)
+    previous = np.full(m + 2, inf, dtype=np.float32)
+    previous[1] = 0.0  # Ô khởi đầu (chỉ số lệch 2 để tránh kiểm tra biên)
+    for i in range(n):
+        current = np.full(m + 2, inf, dtype=np.float32)
+        best = np.minimum(previous[1:m + 1], previous[:m])
+        best = np.minimum(best, previous2[1:m + 1])
+        current[2:] = cost[i] + best
+        previous2, previous = previous, current
+    return float(previous[m + 1]) / (n + m)
+
+
+def load_templates(template_dir=None):
+    """
+    Đọc các file WAV mẫu của từ đánh thức
+
+    Returns:
+        list: Danh sách ma trận MFCC
+    """
+    templates = []
+    for path in sorted(glob.glob(os.path.join(template_dir or WAKE_WORD_TEMPLATE_DIR, "*.wav"))):
+        try:
+            with wave.open(path, "rb") as wf:
+                samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+                rate = wf.getframerate()
+            features = mfcc(samples, rate)
+            if len(features):
+                templates.append(features)
+        except (OSError, wave.Error) as e:
+            logger.warning(f"Không đọc được mẫu từ đánh thức {path}: {e}")
+    return templates
+
+
+class WakeWordDetector:
+    """Cổng năng lượng + so khớp DTW với các mẫu đã ghi"""
+
+    def __init__(self, templates, rate=AUDIO_RATE, threshold=WAKE_WORD_THRESHOLD,
+                 energy_threshold=WAKE_WORD_ENERGY_THRESHOLD):
+        """
+        Khởi tạo WakeWordDetector
+
+        Args:
+            templates (list): Ma trận MFCC của các mẫu
+            rate (int): Tần số lấy mẫu của luồng âm thanh
+            threshold (float): Khoảng cách DTW tối đa để chấp nhận
+            energy_threshold (float): Mức RMS tối thiểu được coi là có tiếng nói
+        """
+        self.templates = templates
+        self.rate = rate
+        self.threshold = threshold
+        self.energy_threshold = energy_threshold
+        self.segment = RingBuffer(int(rate * WAKE_WORD_MAX_SECONDS))
+        self.trailing_chunks = max(1, rate * WAKE_WORD_TRAILING_SILENCE_MS // (1000 * AUDIO_CHUNK))
+        self.silent_chunks = 0
+        self.too_long = False
+
+    def reset(self):
+        self.segment.clear()
+        self.silent_chunks = 0
+        self.too_long = False
+
+    def process(self, chunk):
+        """
+        Xử lý một khối mẫu
+
+        Args:
+            chunk (np.ndarray): Mẫu int16
+
+        Returns:
+            float: Khoảng cách DTW khi phát hiện từ đánh thức, None nếu không
+        """
+        if rms_level(chunk) >= self.energy_threshold:
+            self.silent_chunks = 0
+            if self.segment.full:
+                self.too_long = True  # Câu nói dài hơn từ đánh thức - bỏ qua cả đoạn
+            else:
+                self.segment.write(chunk)
+            return None
+
+        if self.segment.size == 0:
+            return None
+
+        # Đang trong đoạn nói: giữ cả khoảng lặng ngắn giữa các âm tiết
+        self.silent_chunks += 1
+        if not self.segment.full:
+            self.segment.write(chunk)
+        if self.silent_chunks < self.trailing_chunks:
+            return None
+
+        # Bỏ khoảng lặng cuối để đoạn nói được cắt giống như khi ghi mẫu (trim_silence)
+        samples = self.segment.view()[:max(0, self.segment.size - self.silent_chunks * len(chunk))]
+        duration = len(samples) / self.rate
+        too_long = self.too_long
+        self.reset()
+        if too_long or duration < WAKE_WORD_MIN_SECONDS:
+            return None
+
+        features = mfcc(samples, self.rate)
+        distance = min((dtw_distance(features, template) for template in self.templates), default=float("inf"))
+        if distance <= self.threshold:
+            return distance
+        return None
+
+
+class WakeWordListener(QThread):
+    """Thread nghe liên tục trên phiên âm thanh dùng chung và báo khi nghe thấy từ đánh thức"""
+    detected = pyqtSignal(float)
+
+    def __init__(self, template_dir=None):
+        super().__init__()
+        self.template_dir = template_dir
+        self.session = get_audio_session()
+        self.chunks = queue.Queue(maxsize=256)
+        self.running = False
+        self.paused = False
+        self.detector = None
+
+    def _listener(self, chunk):
+        # Gọi từ thread của PortAudio: chỉ đưa vào hàng đợi, bỏ khối khi bị dồn
+        try:
+            self.chunks.put_nowait(chunk)
+        except queue.Full:
+            pass
+
+    def run(self):
+        templates = load_templates(self.template_dir)
+        if not templates:
+            logger.warning("Chưa có mẫu từ đánh thức, tắt chế độ nghe liên tục")
+            return
+        self.detector = WakeWordDetector(templates, rate=self.session.rate)
+        logger.info(f"Đang nghe từ đánh thức ({len(templates)} mẫu)")
+
+        self.running = True
+        if not self.paused:
+            self.session.subscribe(self._listener)
+        try:
+            while self.running:
+                try:
+                    chunk = self.chunks.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+                if self.paused:
+                    continue
+                distance = self.detector.process(chunk)
+                if distance is not None:
+                    logger.info(f"Phát hiện từ đánh thức (khoảng cách {distance:.2f})")
+                    self.detected.emit(distance)
+        finally:
+            self.session.unsubscribe(self._listener)
+
+    def set_paused(self, paused):
+        """Tạm dừng khi đang ghi âm/xử lý, tiếp tục khi quay lại màn hình ghi âm"""
+        if paused == self.paused:
+            return
+        self.paused = paused
+        if not self.running:
+            return
+        if paused:
+            self.session.unsubscribe(self._listener)
+        else:
+            if self.detector:
+                self.detector.reset()
+            while not self.chunks.empty():
+                self.chunks.get_nowait()
+            self.session.subscribe(self._listener)
+
+    def stop(self):
+        self.running = False
+        self.wait(1000)
+
+
+def trim_silence(samples, rate=AUDIO_RATE, energy_threshold=WAKE_WORD_ENERGY_THRESHOLD):
+    """Cắt khoảng lặng đầu/cuối theo cổng năng lượng (dùng khi ghi mẫu)"""
+    loud = [i for i in range(0, len(samples), AUDIO_CHUNK)
+            if rms_level(samples[i:i + AUDIO_CHUNK]) >= energy_threshold]
+    if not loud:
+        return samples[:0]
+    return samples[loud[0]:loud[-1] + AUDIO_CHUNK]
+
+
+# Ghi mẫu từ đánh thức: python wake_word.py [số mẫu]
+if __name__ == "__main__":
+    import sys
+    import time
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    os.makedirs(WAKE_WORD_TEMPLATE_DIR, exist_ok=True)
+    session = get_audio_session()
+    buffer = RingBuffer(AUDIO_RATE * 3)
+
+    for index in range(count):
+        input(f"[{index + 1}/{count}] Nhấn Enter rồi nói 'thư viện ơi'...")
+        buffer.clear()
+        session.subscribe(buffer.write)
+        time.sleep(2.5)
+        session.unsubscribe(buffer.write)
+
+        samples = trim_silence(buffer.view())
+        if len(samples) < AUDIO_RATE * WAKE_WORD_MIN_SECONDS:
+            print("Không nghe rõ, bỏ qua mẫu này")
+            continue
+        path = os.path.join(WAKE_WORD_TEMPLATE_DIR, f"template_{int(time.time())}_{index}.wav")
+        with wave.open(path, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(session.sample_size)
+            wf.setframerate(AUDIO_RATE)
+            wf.writeframes(samples)
+        print(f"Đã lưu {path} ({len(samples) / AUDIO_RATE:.2f}s)")
+
+    session.close()